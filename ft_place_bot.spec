@@ -6,7 +6,7 @@ a = Analysis(
     pathex=['ft_place_bot'],
     binaries=[],
     datas=[('README.md', '.')],
-    hiddenimports=['ft_place_bot.client.client_api', 'ft_place_bot.config', 'ft_place_bot.core.color_config', 'ft_place_bot.core.image_monitor', 'ft_place_bot.utils.utils'],
+    hiddenimports=['ft_place_bot.client.client_api', 'ft_place_bot.config', 'ft_place_bot.interface', 'ft_place_bot.user_config', 'ft_place_bot.core.color_config', 'ft_place_bot.core.image_monitor', 'ft_place_bot.utils.utils'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,5 @@
+import time
+
+
+# Set on the first import of the package, to report how long the bot took to start
+STARTED_AT = time.perf_counter()
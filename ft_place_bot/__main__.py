@@ -1,18 +1,41 @@
+import asyncio
+import logging
+import os
 import sys
-from typing import List, Set
+import time
+from dataclasses import replace
+from importlib.util import find_spec
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Set, cast
 
-from ft_place_bot.client.client_api import FTPlaceAPI
+from numpy.typing import NDArray
+
+from ft_place_bot import STARTED_AT
+from ft_place_bot.client import AsyncFTPlaceAPI, FTPlaceAPI
 from ft_place_bot.config import APIConfig
-from ft_place_bot.core import ColorConfig, ColorPriority, ColorSet, ImageMonitor
-from ft_place_bot.interface import Interface, PriorityConfig, SimilarColorConfig
-from ft_place_bot.utils import ColorManager, setup_logging
+from ft_place_bot.core import (
+    DEFAULT_METRICS,
+    DEFAULT_PROFILER,
+    AccountPool,
+    AsyncImageMonitor,
+    BoardHistory,
+    ColorConfig,
+    ColorPriority,
+    ColorSet,
+    FTPlaceError,
+    ImageMonitor,
+    serve_metrics,
+)
+from ft_place_bot.settings import BotSettings, headless_settings, is_headless, server_settings
+from ft_place_bot.utils import TargetCache, Template, parse_args, setup_logging
+from ft_place_bot.utils.template import TEMPLATE_EXTENSION
 
 
 def create_color_config(
-    priorities: List[PriorityConfig],
+    priorities: List[Dict[str, Any]],
     ignored_source_colors: Set[int],
     ignored_board_colors: Set[int],
-    similar_colors: List[SimilarColorConfig],
+    similar_colors: List[Dict[str, Any]],
 ) -> ColorConfig:
     return ColorConfig(
         priorities=[
@@ -26,53 +49,167 @@ def create_color_config(
     )
 
 
-def main() -> None:
-    logger = setup_logging()
-
-    access_token, refresh_token = Interface.get_tokens()
-    img_path = Interface.get_image_path()
-    origin_x, origin_y = Interface.get_origin()
-    priorities, ignored_source_colors, ignored_board_colors, similar_colors = Interface.configure_colors()
-
-    api_config = APIConfig(
-        base_url="https://ftplace.42lwatch.ch",
-        refresh_token=refresh_token,
+def interactive_settings(server: Dict[str, Any]) -> BotSettings:
+    """Asks for the settings, loading the saved configuration once for every prompt"""
+    # Only the interactive mode needs the prompts and the pydantic configuration model
+    from ft_place_bot.interface import Interface  # noqa: PLC0415
+    from ft_place_bot.user_config import UserConfiguration  # noqa: PLC0415
+
+    config = UserConfiguration.load()
+    access_token, refresh_token = Interface.get_tokens(config)
+    img_path = Interface.get_image_path(config)
+    template_origin = None
+    if Path(img_path).suffix.lower() == TEMPLATE_EXTENSION:
+        template = Template.load(img_path)
+        template_origin = (template.origin_x, template.origin_y)
+    origin_x, origin_y = Interface.get_origin(config, template_origin)
+    priorities, ignored_source_colors, ignored_board_colors, similar_colors = Interface.configure_colors(config)
+    return BotSettings(
+        image_path=img_path,
+        origin_x=origin_x,
+        origin_y=origin_y,
         access_token=access_token,
-        retry_attempts=3,
-        check_interval=1.0,
+        refresh_token=refresh_token,
+        color_priorities=cast(List[Dict[str, Any]], priorities),
+        ignored_source_colors=ignored_source_colors,
+        ignored_board_colors=ignored_board_colors,
+        similar_colors=cast(List[Dict[str, Any]], similar_colors),
+        extra_accounts=config.extra_accounts,
+        **server,
     )
 
+
+def load_settings(argv: List[str], environ: Mapping[str, str]) -> BotSettings:
+    args = parse_args(argv)
+    if is_headless(args, environ):
+        return headless_settings(args, environ)
+    return interactive_settings(server_settings(args, environ))
+
+
+def persist_tokens(previous_refresh_token: str, access_token: str, refresh_token: str) -> None:
+    """Saves rotated tokens to the configuration holding the previous ones, so that a restart does not use them"""
+    from ft_place_bot.user_config import UserConfiguration  # noqa: PLC0415
+
+    logger = logging.getLogger(__name__)
     try:
-        api = FTPlaceAPI(api_config)
+        if UserConfiguration.persist_tokens(previous_refresh_token, access_token, refresh_token):
+            logger.info("Saved the refreshed tokens to %s", UserConfiguration.path())
+    except (OSError, ValueError) as e:
+        logger.warning("Unable to save the refreshed tokens: %s", str(e))
 
-        logger.info("Checking connection...")
-        profile = api.get_profile()
-        if not profile:
-            raise ValueError("Unable to retrieve user profile")
-        logger.info("Connected as: %s", profile.username)
 
-        color_config = create_color_config(priorities, ignored_source_colors, ignored_board_colors, similar_colors)
+async def run_async_monitor(monitor: ImageMonitor, api_configs: List[APIConfig]) -> None:
+    """Runs the accounts from one event loop, over pooled asynchronous clients"""
+    apis = [AsyncFTPlaceAPI(api_config) for api_config in api_configs]
+    for async_api in apis:
+        async_api.tokens.listeners.append(persist_tokens)
+    try:
+        await AsyncImageMonitor(monitor, apis).run()
+    finally:
+        await asyncio.gather(*(api.close() for api in apis))
 
-        logger.info("Loading image: %s", img_path)
+
+def run_pool(monitor: ImageMonitor, apis: List[FTPlaceAPI]) -> None:
+    """Places pixels with several accounts, from one event loop when aiohttp is installed"""
+    if find_spec("aiohttp") is not None:
+        asyncio.run(run_async_monitor(monitor, [api.config for api in apis]))
+        return
+    for api in apis:
+        api.start_token_refresh()
+    AccountPool(monitor, apis).run()
+
+
+def run(settings: BotSettings, logger: logging.Logger, timings: Dict[str, float]) -> None:
+    api_config = APIConfig(
+        base_url=settings.base_url,
+        refresh_token=settings.refresh_token,
+        access_token=settings.access_token,
+        retry_attempts=3,
+        check_interval=1.0,
+    )
+    if settings.metrics_port is not None:
+        serve_metrics(DEFAULT_METRICS, settings.metrics_port)
+    # Profiling captures start on SIGUSR1 or when the control file appears
+    DEFAULT_PROFILER.install_signal()
+    api = FTPlaceAPI(api_config)
+    api.tokens.listeners.append(persist_tokens)
+
+    logger.info("Checking connection...")
+    profile = api.get_profile()
+    if not profile:
+        raise ValueError("Unable to retrieve user profile")
+    logger.info("Connected as: %s", profile.username)
+
+    color_config = create_color_config(
+        settings.color_priorities,
+        settings.ignored_source_colors,
+        settings.ignored_board_colors,
+        settings.similar_colors,
+    )
+
+    img_path = settings.image_path
+    logger.info("Loading image: %s", img_path)
+    target_colors: NDArray[Any]
+    origin_x, origin_y = settings.origin_x, settings.origin_y
+    if Path(img_path).suffix.lower() in {TEMPLATE_EXTENSION, ".json"}:
+        template = Template.open(img_path)
+        target_colors = template.target_colors
+        # Unless given explicitly, the origin is the one stored in the template
+        origin_x = template.origin_x if origin_x is None else origin_x
+        origin_y = template.origin_y if origin_y is None else origin_y
+    else:
         board_data = api.get_board()
         if not board_data:
             raise ValueError("Unable to retrieve board data")
+        target_colors = TargetCache().get_or_convert(img_path, board_data)
+    logger.info("Image successfully converted")
+
+    timings["ready"] = time.perf_counter()
+    logger.info(
+        "Cold start: %.0f ms (imports %.0f ms, settings %.0f ms, connection and image %.0f ms)",
+        (timings["ready"] - STARTED_AT) * 1000,
+        (timings["main"] - STARTED_AT) * 1000,
+        (timings["settings"] - timings["main"]) * 1000,
+        (timings["ready"] - timings["settings"]) * 1000,
+    )
 
-        image_data = ColorManager.load_image(img_path)
-        if image_data is None:
-            raise ValueError("Unable to load image: %s" % img_path)
+    if origin_x is None or origin_y is None:
+        raise ValueError("Missing origin: only template files hold their own")
+    logger.info("Starting maintenance at position (%d, %d)", origin_x, origin_y)
+    monitor = ImageMonitor(api, api_config, color_config)
+    if settings.history_path:
+        monitor.history = BoardHistory(Path(settings.history_path), max_bytes=settings.history_size << 20)
+        logger.info("Recording the board history to %s", settings.history_path)
+    if settings.heat_weight is not None:
+        monitor.heat_weight = settings.heat_weight
+    if settings.extra_accounts:
+        apis = [api] + [
+            FTPlaceAPI(replace(api_config, access_token=tokens["access_token"], refresh_token=tokens["refresh_token"]))
+            for tokens in settings.extra_accounts
+        ]
+        for extra_api in apis[1:]:
+            extra_api.tokens.listeners.append(persist_tokens)
+        logger.info("Placing pixels with %d accounts", len(apis))
+        monitor.add_target(target_colors, origin_x, origin_y)
+        run_pool(monitor, apis)
+    else:
+        api.start_token_refresh()
+        monitor.monitor_and_maintain(target_colors=target_colors, origin_x=origin_x, origin_y=origin_y)
 
-        target_colors = ColorManager.convert_to_ftplace_colors(image_data, board_data)
-        logger.info("Image successfully converted")
 
-        logger.info("Starting maintenance at position (%d, %d)", origin_x, origin_y)
-        monitor = ImageMonitor(api, api_config, color_config)
-        monitor.monitor_and_maintain(target_colors=target_colors, origin_x=origin_x, origin_y=origin_y)
+def main() -> None:
+    timings = {"main": time.perf_counter()}
+    logger = setup_logging()
+
+    try:
+        settings = load_settings(sys.argv[1:], os.environ)
+        timings["settings"] = time.perf_counter()
+        run(settings, logger, timings)
 
     except KeyboardInterrupt:
         logger.info("\nUser requested stop")
         sys.exit(0)
-    except (OSError, ValueError) as e:
+    except (OSError, ValueError, FTPlaceError) as e:
         logger.error("Critical error: %s", str(e))
         sys.exit(1)
 
@@ -1,4 +1,6 @@
+from ft_place_bot.client.async_client_api import AsyncFTPlaceAPI
 from ft_place_bot.client.client_api import FTPlaceAPI
+from ft_place_bot.client.tokens import TokenManager
 
 
-__all__ = ["FTPlaceAPI"]
+__all__ = ["FTPlaceAPI", "AsyncFTPlaceAPI", "TokenManager"]
@@ -0,0 +1,303 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from types import ModuleType, TracebackType
+from typing import Any, Dict, Mapping, Optional, Tuple, Type
+
+from requests.exceptions import HTTPError, RequestException
+from urllib3.util import Retry
+
+from ft_place_bot.client.board_decoder import BoardDecoder, BoardSnapshotCache
+from ft_place_bot.client.client_api import extract_tokens
+from ft_place_bot.client.tokens import TokenManager
+from ft_place_bot.config import APIConfig, APIEndpoints, HTTPStatus
+from ft_place_bot.core import (
+    DEFAULT_METRICS,
+    AuthenticationError,
+    BoardDecodeError,
+    BoardRegion,
+    BoardSnapshot,
+    BotMetrics,
+    FTPlaceError,
+    Pixel,
+    PlacementResult,
+    TokenError,
+    UserProfile,
+)
+from ft_place_bot.core.models import extract_timers
+
+
+# Connections kept open to the server, shared by every request of the client
+DEFAULT_CONNECTION_LIMIT = 8
+DEFAULT_TIMEOUT = 30.0
+# Server errors retried with an exponential backoff, like the Retry strategy of the synchronous client.
+# Only idempotent requests are retried, a placement that failed after being applied must not be sent twice.
+RETRY_STATUSES = frozenset({500, 502, 503, 504})
+RETRY_METHODS = Retry.DEFAULT_ALLOWED_METHODS
+RETRY_BACKOFF = 0.5
+
+
+def _import_aiohttp() -> ModuleType:
+    try:
+        import aiohttp  # type: ignore[import-not-found, unused-ignore]  # noqa: PLC0415
+    except ImportError as e:
+        raise FTPlaceError("The asynchronous client needs aiohttp, install it with: pip install aiohttp") from e
+    return aiohttp
+
+
+@dataclass
+class AsyncResponse:
+    """Response read in full, so that it outlives the connection it came from"""
+
+    status_code: int
+    headers: Mapping[str, str]
+    set_cookie: str
+    content: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(errors="replace")
+
+
+class AsyncFTPlaceAPI:
+    """asyncio counterpart of FTPlaceAPI, over a pooled aiohttp session.
+
+    The session is opened on first use and closed by close() or when leaving the async context manager.
+    Tokens are sent explicitly with each request and replaced on a token expired response, which
+    keep_tokens_fresh() gets as soon as they expire, like the synchronous client does.
+    """
+
+    def __init__(
+        self, config: APIConfig, connection_limit: int = DEFAULT_CONNECTION_LIMIT, metrics: BotMetrics = DEFAULT_METRICS
+    ) -> None:
+        self.config = config
+        self.metrics = metrics
+        self.tokens = TokenManager(config)
+        self.logger = logging.getLogger(__name__)
+        self.max_token_retries = 3
+        self.connection_limit = connection_limit
+        self.board_decoder = BoardDecoder()
+        self.board_cache = BoardSnapshotCache(self.board_decoder)
+        self._aiohttp = _import_aiohttp()
+        self._session: Optional[Any] = None
+        # Created on first use, so that it belongs to the running event loop
+        self._token_lock: Optional[asyncio.Lock] = None
+
+    async def __aenter__(self) -> "AsyncFTPlaceAPI":  # noqa: PYI034
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self) -> Any:
+        if self._session is None or self._session.closed:
+            self._session = self._aiohttp.ClientSession(
+                connector=self._aiohttp.TCPConnector(limit=self.connection_limit),
+                cookie_jar=self._aiohttp.DummyCookieJar(),
+                timeout=self._aiohttp.ClientTimeout(total=DEFAULT_TIMEOUT),
+            )
+        return self._session
+
+    def _cookie_header(self) -> str:
+        return f"token={self.config.access_token}; refresh={self.config.refresh_token}"
+
+    def _update_session_tokens(self, access_token: str, refresh_token: str) -> None:
+        self.tokens.rotate(access_token, refresh_token)
+
+    def _get_token_lock(self) -> asyncio.Lock:
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        return self._token_lock
+
+    async def _send(
+        self, method: str, url: str, headers: Optional[Dict[str, str]] = None, **kwargs: Any
+    ) -> AsyncResponse:
+        session = self._get_session()
+        for attempt in range(self.config.retry_attempts + 1):
+            sent_at = time.time()
+            try:
+                async with session.request(
+                    method, url, headers={**(headers or {}), "Cookie": self._cookie_header()}, **kwargs
+                ) as raw:
+                    response = AsyncResponse(
+                        status_code=raw.status,
+                        headers=raw.headers,
+                        set_cookie=", ".join(raw.headers.getall("Set-Cookie", [])),
+                        content=await raw.read(),
+                    )
+            except (self._aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise RequestException(f"{method} {url} failed: {str(e)}") from e
+            self.tokens.clock.observe(response.headers.get("Date"), sent_at, time.time())
+            if (
+                response.status_code not in RETRY_STATUSES
+                or method.upper() not in RETRY_METHODS
+                or attempt == self.config.retry_attempts
+            ):
+                return response
+            self.metrics.retries.inc()
+            await asyncio.sleep(RETRY_BACKOFF * 2**attempt)
+        raise RequestException(f"{method} {url} failed")
+
+    def handle_response(self, response: AsyncResponse, retry_count: int = 0) -> Tuple[AsyncResponse, bool]:
+        if response.status_code == HTTPStatus.TOKEN_EXPIRED.value:
+            if retry_count >= self.max_token_retries:
+                raise AuthenticationError("Max token refresh attempts reached")
+            # Extract new tokens from Set-Cookie headers
+            new_access, new_refresh = extract_tokens(response.set_cookie)
+            if new_access and new_refresh:
+                self._update_session_tokens(new_access, new_refresh)
+                self.metrics.token_refreshes.inc()
+                return response, True  # Indicate that request should be retried
+            raise AuthenticationError("Failed to get new tokens from response")
+
+        if response.status_code >= HTTPStatus.BAD_REQUEST.value:
+            raise HTTPError(f"{response.status_code} Error: {response.text[:200]}")
+        return response, False
+
+    async def _make_request(self, method: str, url: str, **kwargs: Any) -> AsyncResponse:
+        if not self.tokens.expiring():
+            return await self._request(method, url, **kwargs)
+        async with self._get_token_lock():
+            return await self._request(method, url, **kwargs)
+
+    async def _request(self, method: str, url: str, **kwargs: Any) -> AsyncResponse:
+        for retry_count in range(self.max_token_retries):
+            response = await self._send(method, url, **kwargs)
+            response, needs_retry = self.handle_response(response, retry_count)
+            if not needs_retry:
+                return response
+        raise AuthenticationError("Max token refresh attempts reached")
+
+    async def _fetch_profile(self) -> UserProfile:
+        response = await self._request("GET", f"{self.config.base_url}{APIEndpoints.PROFILE.value}")
+        profile = UserProfile.from_api_response(response.json())
+        self.tokens.observe_profile(profile)
+        return profile
+
+    async def refresh_tokens(self) -> bool:
+        """Gets the tokens rotated when the access token expired, or reads their expiry when unknown.
+
+        Returns whether they were rotated.
+        """
+        async with self._get_token_lock():
+            if not self.tokens.expired():
+                return False
+            access_token = self.config.access_token
+            try:
+                await self._fetch_profile()
+            except (RequestException, TokenError, AuthenticationError, ValueError) as e:
+                self.logger.error("Failed to refresh the tokens: %s", str(e))
+            if self.config.access_token == access_token:
+                if self.tokens.expired():
+                    # Not expired for the server yet, no expiry in the profile, or the request failed
+                    self.tokens.refresh_failed()
+                return False
+            self.logger.info("Tokens refreshed ahead of the next request")
+            return True
+
+    async def keep_tokens_fresh(self) -> None:
+        """Refreshes the tokens as soon as they expire, so that no placement waits for it. Runs until cancelled"""
+        while True:
+            await asyncio.sleep(self.tokens.refresh_in())
+            await self.refresh_tokens()
+
+    async def get_profile(self) -> Optional[UserProfile]:
+        """Reads the profile, None when the request fails. Lost tokens raise AuthenticationError"""
+        try:
+            if not self.tokens.expiring():
+                return await self._fetch_profile()
+            async with self._get_token_lock():
+                return await self._fetch_profile()
+
+        except (RequestException, TokenError, ValueError) as e:
+            self.logger.error("Failed to get profile: %s", str(e))
+            return None
+
+    async def get_board(self) -> Optional[Any]:
+        """Reads the board as JSON, None when the request fails. Lost tokens raise AuthenticationError"""
+        try:
+            response = await self._make_request(
+                "GET", f"{self.config.base_url}{APIEndpoints.BOARD.value}", params={"type": "board"}
+            )
+            return response.json()
+        except (RequestException, TokenError, ValueError) as e:
+            self.logger.error("Failed to get board: %s", str(e))
+            return None
+
+    async def get_board_snapshot(self, region: Optional[BoardRegion] = None) -> Optional[BoardSnapshot]:
+        """Fetches the board, skipping the decode when it did not change. Lost tokens raise AuthenticationError"""
+        try:
+            with self.metrics.board_fetch_seconds.time():
+                response = await self._make_request(
+                    "GET",
+                    f"{self.config.base_url}{APIEndpoints.BOARD.value}",
+                    params={"type": "board"},
+                    headers=self.board_cache.request_headers(region),
+                )
+            received_at = time.monotonic()
+            start = time.perf_counter()
+            snapshot = self.board_cache.snapshot(
+                response.status_code, response.headers, response.content, region, received_at
+            )
+            if snapshot.changed:
+                self.metrics.board_decode_seconds.observe(time.perf_counter() - start)
+            return snapshot
+        except (RequestException, TokenError, BoardDecodeError) as e:
+            self.logger.error("Failed to get board: %s", str(e))
+            return None
+
+    async def set_pixel(self, pixel: Pixel) -> PlacementResult:
+        """Places a pixel, refreshing the tokens when needed. Being too early is reported, not raised"""
+        if not self.tokens.expiring():
+            return await self._set_pixel(pixel)
+        async with self._get_token_lock():
+            return await self._set_pixel(pixel)
+
+    async def _set_pixel(self, pixel: Pixel) -> PlacementResult:
+        for retry_count in range(self.max_token_retries):
+            sent_at = time.time()
+            try:
+                response = await self._send(
+                    "POST", f"{self.config.base_url}{APIEndpoints.SET_PIXEL.value}", json=pixel.to_dict()
+                )
+            except RequestException:
+                self.metrics.record_placement(None)
+                raise
+            self.metrics.record_placement(response.status_code)
+            if response.status_code == HTTPStatus.TOO_EARLY.value:
+                return self.placement_result(response, sent_at)
+            response, needs_retry = self.handle_response(response, retry_count)
+            if not needs_retry:
+                return self.placement_result(response, sent_at)
+        raise AuthenticationError("Max token refresh attempts reached")
+
+    @staticmethod
+    def placement_result(response: AsyncResponse, sent_at: float) -> PlacementResult:
+        received_at = time.time()
+        try:
+            timers = extract_timers(response.json())
+        except ValueError:
+            timers = []
+        return PlacementResult(
+            status_code=response.status_code,
+            success=HTTPStatus.is_success(response.status_code),
+            timers=timers,
+            server_date=response.headers.get("Date"),
+            sent_at=sent_at,
+            received_at=received_at,
+        )
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import re
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from ft_place_bot.config import HTTPStatus
+from ft_place_bot.core import BoardDecodeError, BoardRegion, BoardSnapshot
+
+
+try:  # Optional faster JSON backend, only used by the fallback path
+    import orjson  # type: ignore[import-not-found, unused-ignore]
+
+    _json_loads: Callable[[bytes], Any] = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+
+_BOARD_START = re.compile(rb'"board"\s*:\s*\[')
+_BOARD_END = re.compile(rb"\}\s*\]\s*\]")
+_ROW_START = re.compile(rb"\[\s*\{")
+_NEXT_ROW = re.compile(rb"\s*\[\s*\{")
+_ROW_END = re.compile(rb"\}\s*\](\s*,)?")
+_COLOR_ID = re.compile(rb'"color_id"\s*:\s*(\d+)')
+_MAX_COLOR_ID = 255
+# Response headers identifying a board version, with the request header sending them back
+BOARD_VALIDATOR_HEADERS = (("ETag", "If-None-Match"), ("Last-Modified", "If-Modified-Since"))
+_BOARD_NDIM = 2
+
+
+class BoardDecoder:
+    """Decodes the /api/get payload straight into a compact color id array.
+
+    The board is read with a few regex scans over the raw bytes instead of building one dict per cell.
+    Payloads the fast path does not understand are decoded through the JSON parser instead.
+    When a region is given, rows outside of it are skipped without being parsed and the returned array only
+    covers the region (clipped to the board), with [0, 0] being the cell at (region.x, region.y).
+    The returned array is a buffer reused across calls: copy it if it has to outlive the next decode.
+    """
+
+    def __init__(self) -> None:
+        self._buffer: Optional[np.ndarray[Any, np.dtype[np.uint8]]] = None
+
+    def decode(self, payload: bytes, region: Optional[BoardRegion] = None) -> np.ndarray[Any, np.dtype[np.uint8]]:
+        board: np.ndarray[Any, Any]
+        try:
+            board = self._decode_fast(payload, region)
+        except BoardDecodeError:
+            board = self._decode_json(payload)
+            if region is not None:
+                board = board[region.x : region.x + region.width, region.y : region.y + region.height]
+        return self._store(board)
+
+    def _store(self, board: np.ndarray[Any, Any]) -> np.ndarray[Any, np.dtype[np.uint8]]:
+        if self._buffer is None or self._buffer.shape != board.shape:
+            self._buffer = np.empty(board.shape, dtype=np.uint8)
+        np.copyto(self._buffer, board, casting="unsafe")
+        return self._buffer
+
+    @staticmethod
+    def _board_span(payload: bytes) -> slice:
+        start = _BOARD_START.search(payload)
+        if start is None:
+            raise BoardDecodeError("No board in payload")
+        end = _BOARD_END.search(payload, start.end())
+        if end is None:
+            raise BoardDecodeError("Unterminated board in payload")
+        return slice(start.end() - 1, end.end())
+
+    @staticmethod
+    def _row_columns(payload: bytes, position: int) -> Tuple[int, int]:
+        """Returns the number of color ids in the row starting at or after position, and where the row ends"""
+        row_start = _ROW_START.search(payload, position)
+        row_end = _ROW_END.search(payload, row_start.end()) if row_start else None
+        if row_start is None or row_end is None:
+            raise BoardDecodeError("Unexpected row layout in board")
+        return len(_COLOR_ID.findall(payload, row_start.start(), row_end.end())), row_end.end()
+
+    @staticmethod
+    def _check_outside_strings(payload: bytes, positions: List[int]) -> None:
+        """Checks that the scans matched outside of strings, at the given increasing positions.
+
+        The scans take every bracket and brace for structure, so a string holding one could shift the rows.
+        Without escapes, quotes open and close strings in turn: a position is outside of strings when an even number
+        of quotes comes before it. Payloads with escapes go to the JSON parser, an escaped quote could hide a key.
+        """
+        if payload.find(b"\\", 0, positions[-1]) != -1:
+            raise BoardDecodeError("Escaped characters in board")
+        quotes = previous = 0
+        for position in positions:
+            quotes += payload.count(b'"', previous, position)
+            if quotes % 2:
+                raise BoardDecodeError("Board strings hold JSON delimiters")
+            previous = position
+
+    @staticmethod
+    def _parse_ids(ids: List[bytes], rows: int, columns: int) -> np.ndarray[Any, np.dtype[np.uint16]]:
+        if rows == 0 or columns == 0 or len(ids) != rows * columns:
+            raise BoardDecodeError("Board is not rectangular")
+        values = np.fromstring(b",".join(ids), dtype=np.uint16, sep=",")
+        if values.size != len(ids) or (values.size and int(values.max()) > _MAX_COLOR_ID):
+            raise BoardDecodeError("Invalid color ids in board")
+        return values.reshape(rows, columns)
+
+    def _decode_fast(self, payload: bytes, region: Optional[BoardRegion]) -> np.ndarray[Any, np.dtype[np.uint16]]:
+        if region is None:
+            span = self._board_span(payload)
+            row_starts = [row.start() for row in _ROW_START.finditer(payload, span.start, span.stop)]
+            columns, first_row_end = self._row_columns(payload, span.start)
+            self._check_outside_strings(payload, sorted([span.start, *row_starts, first_row_end, span.stop]))
+            return self._parse_ids(_COLOR_ID.findall(payload, span.start, span.stop), len(row_starts), columns)
+
+        first_row = last_row = None
+        rows = 0
+        board_start = _BOARD_START.search(payload)
+        if board_start is None:
+            raise BoardDecodeError("No board in payload")
+        position = board_start.end()
+        columns, _ = self._row_columns(payload, position)
+        # The first row is walked below, which checks where it ends
+        boundaries = [board_start.start()]
+        # Walk the rows one by one and stop right after the region, the rest of the board is never scanned
+        while rows < region.x + region.width:
+            row_start = _NEXT_ROW.match(payload, position)
+            row_end = _ROW_END.search(payload, row_start.end()) if row_start else None
+            if row_start is None or row_end is None:
+                raise BoardDecodeError("Unexpected row layout in board")
+            if rows == region.x:
+                first_row = row_start.start()
+            last_row = row_end.end()
+            boundaries.extend((row_start.start(), last_row))
+            rows += 1
+            if row_end.group(1) is None:
+                break
+            position = row_end.end()
+
+        self._check_outside_strings(payload, boundaries)
+        if first_row is None or last_row is None:
+            # Past the last row, empty like the JSON path slicing the board
+            board = np.empty((0, columns), dtype=np.uint16)
+        else:
+            board = self._parse_ids(_COLOR_ID.findall(payload, first_row, last_row), rows - region.x, columns)
+        return board[:, region.y : region.y + region.height]
+
+    @staticmethod
+    def _decode_json(payload: bytes) -> np.ndarray[Any, np.dtype[np.uint8]]:
+        try:
+            board_data = _json_loads(payload)
+            board = np.array([[cell["color_id"] for cell in row] for row in board_data["board"]], dtype=np.uint8)
+        except (KeyError, OverflowError, TypeError, ValueError) as err:
+            raise BoardDecodeError("Invalid board data") from err
+        if board.ndim != _BOARD_NDIM:
+            raise BoardDecodeError("Board is not rectangular")
+        return board
+
+
+class BoardSnapshotCache:
+    """Remembers the last board fetched, to skip decoding the next one when it did not change.
+
+    Conditional request headers are sent when the server gave an ETag or Last-Modified, otherwise the raw payload
+    is hashed and compared with the previous one.
+    """
+
+    def __init__(self, decoder: BoardDecoder) -> None:
+        self.decoder = decoder
+        self._validators: Dict[str, str] = {}
+        self._digest: Optional[bytes] = None
+        self._region: Optional[BoardRegion] = None
+        self._board: Optional[np.ndarray[Any, np.dtype[np.uint8]]] = None
+
+    def _cached(self, region: Optional[BoardRegion]) -> Optional[np.ndarray[Any, np.dtype[np.uint8]]]:
+        return self._board if region == self._region else None
+
+    def request_headers(self, region: Optional[BoardRegion]) -> Dict[str, str]:
+        """Returns the headers of a conditional request for the board"""
+        return dict(self._validators) if self._cached(region) is not None else {}
+
+    def snapshot(
+        self,
+        status_code: int,
+        headers: Mapping[str, str],
+        content: bytes,
+        region: Optional[BoardRegion],
+        received_at: Optional[float] = None,
+    ) -> BoardSnapshot:
+        """Returns the board of a response, decoding it only if it changed.
+
+        received_at is the time.monotonic() value at which the response arrived, now by default.
+        """
+        received_at = time.monotonic() if received_at is None else received_at
+        cached = self._cached(region)
+        if cached is not None and status_code == HTTPStatus.NOT_MODIFIED.value:
+            return BoardSnapshot(board=cached, changed=False, received_at=received_at)
+
+        digest = hashlib.blake2b(content, digest_size=16).digest()
+        validators = {
+            request_header: headers[response_header]
+            for response_header, request_header in BOARD_VALIDATOR_HEADERS
+            if response_header in headers
+        }
+        if cached is not None and digest == self._digest:
+            self._validators = validators
+            return BoardSnapshot(board=cached, changed=False, received_at=received_at)
+
+        board = self.decoder.decode(content, region)
+        self._board, self._region, self._digest = board, region, digest
+        self._validators = validators
+        return BoardSnapshot(board=board, changed=True, received_at=received_at)
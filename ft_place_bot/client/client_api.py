@@ -1,27 +1,59 @@
 import logging
-import sys
+import threading
+import time
 from typing import Any, Optional, Tuple
 
+import numpy as np
 import requests
 from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 from urllib3.util import Retry
 
+from ft_place_bot.client.board_decoder import BoardDecoder, BoardSnapshotCache
+from ft_place_bot.client.tokens import TokenManager
 from ft_place_bot.config import APIConfig, APIEndpoints, HTTPStatus
-from ft_place_bot.core import TokenError, UserProfile
+from ft_place_bot.core import (
+    DEFAULT_METRICS,
+    DEFAULT_PROFILER,
+    AuthenticationError,
+    BoardDecodeError,
+    BoardRegion,
+    BoardSnapshot,
+    BotMetrics,
+    Pixel,
+    PlacementResult,
+    TokenError,
+    UserProfile,
+)
+from ft_place_bot.core.models import extract_timers
 
 
-class AuthenticationError(Exception):
-    pass
+def extract_tokens(set_cookie: str) -> Tuple[Optional[str], Optional[str]]:
+    """Returns the (access, refresh) tokens set by a Set-Cookie header holding comma separated cookies"""
+    new_access = None
+    new_refresh = None
+
+    cookies = set_cookie.split(", ")
+    for cookie in cookies:
+        if cookie.startswith("token="):
+            new_access = cookie.split(";")[0][6:]
+        elif cookie.startswith("refresh="):
+            new_refresh = cookie.split(";")[0][8:]
+    return new_access, new_refresh
 
 
 class FTPlaceAPI:
-    def __init__(self, config: APIConfig):
+    def __init__(self, config: APIConfig, metrics: BotMetrics = DEFAULT_METRICS):
         self.config = config
+        self.metrics = metrics
+        self.profiler = DEFAULT_PROFILER
+        self.tokens = TokenManager(config)
         self.logger = self._setup_logger()
         self.max_token_retries = 3
         self.session: Optional[requests.Session] = None
         self.session = self._setup_session()
+        self.board_decoder = BoardDecoder()
+        self.board_cache = BoardSnapshotCache(self.board_decoder)
 
     def _setup_session(self) -> requests.Session:
         session = requests.Session()
@@ -42,20 +74,10 @@ class FTPlaceAPI:
             raise RuntimeError("Session not initialized")
         self.session.cookies.set("token", access_token)
         self.session.cookies.set("refresh", refresh_token)
-        self.config.access_token = access_token
-        self.config.refresh_token = refresh_token
+        self.tokens.rotate(access_token, refresh_token)
 
     def _extract_tokens_from_headers(self, headers: Any) -> Tuple[Optional[str], Optional[str]]:
-        new_access = None
-        new_refresh = None
-
-        cookies = headers.get("Set-Cookie", "").split(", ")
-        for cookie in cookies:
-            if cookie.startswith("token="):
-                new_access = cookie.split(";")[0][6:]
-            elif cookie.startswith("refresh="):
-                new_refresh = cookie.split(";")[0][8:]
-        return new_access, new_refresh
+        return extract_tokens(headers.get("Set-Cookie", ""))
 
     def _setup_logger(self) -> logging.Logger:
         logger = logging.getLogger(__name__)
@@ -64,6 +86,8 @@ class FTPlaceAPI:
             handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
             logger.addHandler(handler)
             logger.setLevel(logging.INFO)
+            # Its own handler prints the records, the root one would print them again
+            logger.propagate = False
         return logger
 
     def handle_response(self, response: requests.Response, retry_count: int = 0) -> Tuple[requests.Response, bool]:
@@ -74,18 +98,36 @@ class FTPlaceAPI:
             new_access, new_refresh = self._extract_tokens_from_headers(response.headers)
             if new_access and new_refresh:
                 self._update_session_tokens(new_access, new_refresh)
+                self.metrics.token_refreshes.inc()
                 return response, True  # Indicate that request should be retried
             raise AuthenticationError("Failed to get new tokens from response")
 
         response.raise_for_status()
         return response, False
 
+    def _count_retries(self, response: requests.Response) -> requests.Response:
+        """Counts the attempts the retry strategy made before this response, and reads the server clock off it"""
+        retries = getattr(response.raw, "retries", None)
+        if retries is not None and retries.history:
+            self.metrics.retries.inc(len(retries.history))
+        received_at = time.time()
+        self.tokens.clock.observe(
+            response.headers.get("Date"), received_at - response.elapsed.total_seconds(), received_at
+        )
+        return response
+
     def _make_request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        if not self.tokens.expiring():
+            return self._request(method, url, **kwargs)
+        with self.tokens.lock:
+            return self._request(method, url, **kwargs)
+
+    def _request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
         if self.session is None:
             raise RuntimeError("Session not initialized")
         retry_count = 0
         while retry_count < self.max_token_retries:
-            response = self.session.request(method, url, **kwargs)
+            response = self._count_retries(self.session.request(method, url, **kwargs))
             try:
                 response, needs_retry = self.handle_response(response, retry_count)
                 if not needs_retry:
@@ -98,27 +140,136 @@ class FTPlaceAPI:
 
         raise AuthenticationError("Max token refresh attempts reached")
 
+    def _fetch_profile(self) -> UserProfile:
+        response = self._make_request("GET", f"{self.config.base_url}{APIEndpoints.PROFILE.value}")
+        profile = UserProfile.from_api_response(response.json())
+        self.tokens.observe_profile(profile)
+        return profile
+
+    def refresh_tokens(self) -> bool:
+        """Gets the tokens rotated when the access token expired, or reads their expiry when unknown.
+
+        Returns whether they were rotated.
+        """
+        with self.tokens.lock:
+            if not self.tokens.expired():
+                return False
+            access_token = self.config.access_token
+            try:
+                self._fetch_profile()
+            except (RequestException, TokenError, AuthenticationError, ValueError) as e:
+                self.logger.error("Failed to refresh the tokens: %s", str(e))
+            if self.config.access_token == access_token:
+                if self.tokens.expired():
+                    # Not expired for the server yet, no expiry in the profile, or the request failed
+                    self.tokens.refresh_failed()
+                return False
+            self.logger.info("Tokens refreshed ahead of the next request")
+            return True
+
+    def start_token_refresh(self) -> threading.Thread:
+        """Refreshes the tokens from a daemon thread as soon as they expire, so that no placement waits for it"""
+
+        def refresh_loop() -> None:
+            while True:
+                time.sleep(self.tokens.refresh_in())
+                self.refresh_tokens()
+
+        thread = threading.Thread(target=refresh_loop, name="token-refresh", daemon=True)
+        thread.start()
+        return thread
+
     def get_profile(self) -> Optional[UserProfile]:
+        """Reads the profile, None when the request fails. Lost tokens raise AuthenticationError"""
         try:
-            response = self._make_request("GET", f"{self.config.base_url}{APIEndpoints.PROFILE.value}")
-            return UserProfile.from_api_response(response.json())
+            return self._fetch_profile()
 
-        except AuthenticationError:
-            self.logger.critical("Authentication failed - unable to refresh tokens. Exiting program...")
-            sys.exit(1)
         except (RequestException, TokenError, ValueError) as e:
             self.logger.error("Failed to get profile: %s", str(e))
             return None
 
+    def set_pixel(self, pixel: Pixel) -> PlacementResult:
+        """Places a pixel, refreshing the tokens when needed. Being too early is reported, not raised"""
+        if not self.tokens.expiring():
+            return self._set_pixel(pixel)
+        with self.tokens.lock:
+            return self._set_pixel(pixel)
+
+    def _set_pixel(self, pixel: Pixel) -> PlacementResult:
+        if self.session is None:
+            raise RuntimeError("Session not initialized")
+        for retry_count in range(self.max_token_retries):
+            try:
+                with self.profiler.span("post"):
+                    response = self.session.post(
+                        f"{self.config.base_url}{APIEndpoints.SET_PIXEL.value}", json=pixel.to_dict()
+                    )
+            except RequestException:
+                self.metrics.record_placement(None)
+                raise
+            self.metrics.record_placement(self._count_retries(response).status_code)
+            if response.status_code == HTTPStatus.TOO_EARLY.value:
+                return self.placement_result(response)
+            response, needs_retry = self.handle_response(response, retry_count)
+            if not needs_retry:
+                return self.placement_result(response)
+        raise AuthenticationError("Max token refresh attempts reached")
+
+    @staticmethod
+    def placement_result(response: requests.Response) -> PlacementResult:
+        received_at = time.time()
+        try:
+            timers = extract_timers(response.json())
+        except ValueError:
+            timers = []
+        return PlacementResult(
+            status_code=response.status_code,
+            success=HTTPStatus.is_success(response.status_code),
+            timers=timers,
+            server_date=response.headers.get("Date"),
+            sent_at=received_at - response.elapsed.total_seconds(),
+            received_at=received_at,
+        )
+
     def get_board(self) -> Optional[Any]:
+        """Reads the board as JSON, None when the request fails. Lost tokens raise AuthenticationError"""
         try:
             response = self._make_request(
                 "GET", f"{self.config.base_url}{APIEndpoints.BOARD.value}", params={"type": "board"}
             )
             return response.json()
-        except AuthenticationError:
-            self.logger.critical("Authentication failed - unable to refresh tokens. Exiting program...")
-            sys.exit(1)
         except (RequestException, TokenError, ValueError) as e:
             self.logger.error("Failed to get board: %s", str(e))
             return None
+
+    def get_board_array(self, region: Optional[BoardRegion] = None) -> Optional[np.ndarray[Any, np.dtype[np.uint8]]]:
+        """Fetches the board (or only a region of it) as an array of color ids, reusing the decoder buffer"""
+        snapshot = self.get_board_snapshot(region)
+        return snapshot.board if snapshot is not None else None
+
+    def get_board_snapshot(self, region: Optional[BoardRegion] = None) -> Optional[BoardSnapshot]:
+        """Fetches the board, skipping the decode when it did not change since the previous fetch.
+
+        Conditional request headers are sent when the server gave an ETag or Last-Modified, otherwise the
+        raw payload is hashed and compared with the previous one. Lost tokens raise AuthenticationError.
+        """
+        try:
+            with self.profiler.span("fetch"), self.metrics.board_fetch_seconds.time():
+                response = self._make_request(
+                    "GET",
+                    f"{self.config.base_url}{APIEndpoints.BOARD.value}",
+                    params={"type": "board"},
+                    headers=self.board_cache.request_headers(region),
+                )
+            received_at = time.monotonic()
+            start = time.perf_counter()
+            with self.profiler.span("decode"):
+                snapshot = self.board_cache.snapshot(
+                    response.status_code, response.headers, response.content, region, received_at
+                )
+            if snapshot.changed:
+                self.metrics.board_decode_seconds.observe(time.perf_counter() - start)
+            return snapshot
+        except (RequestException, TokenError, BoardDecodeError) as e:
+            self.logger.error("Failed to get board: %s", str(e))
+            return None
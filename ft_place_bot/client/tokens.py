@@ -0,0 +1,79 @@
+import math
+import threading
+import time
+from typing import Callable, List, Optional
+
+from ft_place_bot.config import APIConfig
+from ft_place_bot.core import ClockOffset, UserProfile
+
+
+# Seconds past the moment the server clock surely reached the expiry of the access token before refreshing it
+REFRESH_DELAY = 0.05
+# Seconds before the expiry from which requests go one at a time, only one of them getting the tokens rotated
+EXPIRY_MARGIN = 1.0
+# Seconds before trying again when a refresh got no new tokens, or when the expiry could not be read
+REFRESH_RETRY_DELAY = 10.0
+
+# Called on each rotation with the previous refresh token and the new access and refresh tokens
+TokenListener = Callable[[str, str, str], None]
+
+
+class TokenManager:
+    """Tokens of one session, and when its access token expires.
+
+    The server only hands out new tokens in the token expired response to a request made with an expired access
+    token. Knowing the expiry (exp of the profile, on the server clock estimated from the Date headers), the
+    client can make that request itself right after it, off the hot path, rather than wasting the next placement
+    on it. While the expiry is unknown, at startup or after a rotation before the lifetime is, the refresher reads
+    a profile to learn it. From EXPIRY_MARGIN seconds before the expiry, requests hold lock so that concurrent ones
+    do not race to rotate the same tokens. The listeners are called with every rotation, to persist the new tokens.
+    """
+
+    def __init__(self, config: APIConfig, refresh_delay: float = REFRESH_DELAY) -> None:
+        self.config = config
+        self.refresh_delay = refresh_delay
+        self.clock = ClockOffset()
+        self.lock = threading.RLock()
+        self.listeners: List[TokenListener] = []
+        # Server timestamp at which the access token expires and lifetime of the tokens (seconds), None when unknown
+        self.expires_at: Optional[float] = None
+        self.lifetime: Optional[float] = None
+        self._retry_at = 0.0
+
+    def observe_profile(self, profile: UserProfile) -> None:
+        if not profile.exp:
+            return
+        self.expires_at = float(profile.exp)
+        if profile.iat and profile.exp > profile.iat:
+            self.lifetime = float(profile.exp - profile.iat)
+
+    def expiring(self) -> bool:
+        """Whether the access token expired or is about to"""
+        return self.expires_at is not None and self.clock.server_time() >= self.expires_at - EXPIRY_MARGIN
+
+    def refresh_in(self) -> float:
+        """Returns the seconds until the tokens should be refreshed, or the expiry read when it is unknown"""
+        now = time.monotonic()
+        if self.expires_at is None:
+            return max(self._retry_at - now, 0.0)
+        due = self.clock.monotonic_deadline(self.expires_at) + self.refresh_delay - now
+        return max(due, self._retry_at - now, 0.0)
+
+    def expired(self) -> bool:
+        """Whether a profile should be read now, to get the tokens rotated or to learn their expiry"""
+        return self.refresh_in() <= 0
+
+    def rotate(self, access_token: str, refresh_token: str) -> None:
+        """Switches to new tokens, expiring after the lifetime of the previous ones until a profile tells"""
+        with self.lock:
+            previous = self.config.refresh_token
+            self.config.access_token = access_token
+            self.config.refresh_token = refresh_token
+            # Issued now, iat and exp being whole seconds
+            self.expires_at = math.floor(self.clock.server_time()) + self.lifetime if self.lifetime else None
+        for listener in self.listeners:
+            listener(previous, access_token, refresh_token)
+
+    def refresh_failed(self) -> None:
+        """Delays the next refresh after one that got no new tokens, or no expiry"""
+        self._retry_at = time.monotonic() + REFRESH_RETRY_DELAY
@@ -1,9 +1,5 @@
 from dataclasses import dataclass
 from enum import Enum
-from pathlib import Path
-from typing import Any, ClassVar, List, Optional, Set
-
-from pydantic import BaseModel, Field
 
 
 class ColorID(Enum):
@@ -34,6 +30,8 @@ class APIEndpoints(Enum):
 
 
 class HTTPStatus(Enum):
+    NOT_MODIFIED = 304
+    BAD_REQUEST = 400
     TOO_EARLY = 425
     TOKEN_EXPIRED = 426
     SUCCESS_200 = 200
@@ -56,27 +54,3 @@ class APIConfig:
     access_token: str
     retry_attempts: int = 3
     check_interval: float = 1.0
-
-
-class UserConfiguration(BaseModel):
-    access_token: Optional[str] = None
-    refresh_token: Optional[str] = None
-    last_image_path: Optional[str] = None
-    last_origin_x: Optional[int] = None
-    last_origin_y: Optional[int] = None
-    color_priorities: List[dict[str, Any]] = Field(default_factory=list)
-    ignored_source_colors: Set[int] = Field(default_factory=set)
-    ignored_board_colors: Set[int] = Field(default_factory=set)
-    similar_colors: List[dict[str, Any]] = Field(default_factory=list)
-    _config_file: ClassVar[str] = ".ft_place_bot_config.json"
-
-    @classmethod
-    def load(cls) -> "UserConfiguration":
-        config_path = Path.home() / cls._config_file
-        if config_path.exists():
-            return cls.parse_raw(config_path.read_text())
-        return cls()  # Create empty configuration without hardcoded credentials
-
-    def save(self) -> None:
-        config_path = Path.home() / self._config_file
-        config_path.write_text(self.json())
@@ -1,18 +1,60 @@
-from ft_place_bot.core.color_config import ColorConfig, ColorPriority, ColorSet
-from ft_place_bot.core.exceptions import FTPlaceError, RateLimitError, TokenError
-from ft_place_bot.core.image_monitor import ImageMonitor, PixelToFix
-from ft_place_bot.core.models import Pixel, UserProfile
+from ft_place_bot.core.account_pool import AccountPool, PixelReservations, PoolAccount
+from ft_place_bot.core.async_monitor import AsyncImageMonitor
+from ft_place_bot.core.board_diff import BoardDiff, BoardDiffTracker, diff_board
+from ft_place_bot.core.board_history import BoardHistory
+from ft_place_bot.core.color_config import TRANSPARENT_COLOR_ID, ColorConfig, ColorPriority, ColorSet, ColorTables
+from ft_place_bot.core.contested import ContestedPixels
+from ft_place_bot.core.cooldown import ClockOffset, CooldownTracker
+from ft_place_bot.core.exceptions import (
+    AuthenticationError,
+    BoardDecodeError,
+    FTPlaceError,
+    RateLimitError,
+    TokenError,
+)
+from ft_place_bot.core.image_monitor import ImageMonitor
+from ft_place_bot.core.metrics import DEFAULT_METRICS, BotMetrics, serve_metrics
+from ft_place_bot.core.models import BoardRegion, BoardSnapshot, Pixel, PlacementResult, UserProfile
+from ft_place_bot.core.multi_target import MonitoredTarget, TargetComposite
+from ft_place_bot.core.pixel_queue import PixelQueue, PixelToFix
+from ft_place_bot.core.profiling import DEFAULT_PROFILER, Profiler
 
 
 __all__ = [
     "FTPlaceError",
     "TokenError",
+    "AuthenticationError",
     "RateLimitError",
+    "BoardDecodeError",
     "Pixel",
     "UserProfile",
+    "BoardRegion",
+    "BoardSnapshot",
+    "PlacementResult",
     "ColorSet",
     "ColorPriority",
     "ColorConfig",
+    "ColorTables",
+    "TRANSPARENT_COLOR_ID",
+    "BoardDiff",
+    "BoardDiffTracker",
+    "diff_board",
+    "MonitoredTarget",
+    "TargetComposite",
     "PixelToFix",
+    "PixelQueue",
     "ImageMonitor",
+    "AccountPool",
+    "PoolAccount",
+    "PixelReservations",
+    "AsyncImageMonitor",
+    "ClockOffset",
+    "CooldownTracker",
+    "BotMetrics",
+    "DEFAULT_METRICS",
+    "serve_metrics",
+    "Profiler",
+    "DEFAULT_PROFILER",
+    "BoardHistory",
+    "ContestedPixels",
 ]
@@ -0,0 +1,178 @@
+import heapq
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from requests.exceptions import RequestException
+
+from ft_place_bot.config import HTTPStatus
+from ft_place_bot.core.cooldown import CooldownTracker
+from ft_place_bot.core.exceptions import AuthenticationError, TokenError
+from ft_place_bot.core.image_monitor import IDLE_DELAY, TOO_EARLY_DELAY, ImageMonitor
+from ft_place_bot.core.models import Pixel, PlacementResult, UserProfile
+from ft_place_bot.core.pixel_queue import PixelQueue, PixelToFix
+
+
+class PixelReservations:
+    """Pixels handed to an account, kept away from the other accounts for reservation_time seconds"""
+
+    def __init__(self, reservation_time: float) -> None:
+        self.reservation_time = reservation_time
+        self._until: Dict[Tuple[int, int], float] = {}
+
+    def take(self, queue: PixelQueue) -> Optional[PixelToFix]:
+        """Reserves and returns the highest priority pixel that is not reserved yet"""
+        now = time.monotonic()
+        self._until = {position: until for position, until in self._until.items() if until > now}
+        # Even if every reserved pixel comes first, one more is enough to find a free one
+        for pixel in queue.top(len(self._until) + 1):
+            if (pixel.x, pixel.y) not in self._until:
+                self._until[(pixel.x, pixel.y)] = now + self.reservation_time
+                return pixel
+        return None
+
+    def release(self, pixel: PixelToFix) -> None:
+        self._until.pop((pixel.x, pixel.y), None)
+
+
+@dataclass
+class PoolAccount:
+    """Account of the pool, with the monotonic time at which it can place again"""
+
+    name: str
+    api: Any
+    ready_at: float = 0.0
+    placed: int = 0
+    cooldown: CooldownTracker = field(default_factory=CooldownTracker)
+    # Set once its tokens are lost, the account is not used again
+    removed: bool = False
+
+    def observe_profile(self, profile: UserProfile) -> None:
+        """Seeds the cooldown with the pixel buffer and the running timers of the account"""
+        self.cooldown.observe_profile(profile)
+        self.ready_at = self.cooldown.ready_at()
+
+    def observe(self, result: PlacementResult) -> None:
+        """Updates the cooldown with a placement result. A failure without timers is tried again later"""
+        self.cooldown.observe_placement(result)
+        self.ready_at = self.cooldown.ready_at()
+        if not result.success and not result.timers:
+            self.ready_at = time.monotonic() + IDLE_DELAY
+        elif result.status_code == HTTPStatus.TOO_EARLY.value:
+            # Timers already run out by our clock would retry at once
+            self.ready_at = max(self.ready_at, time.monotonic() + TOO_EARLY_DELAY)
+
+
+class AccountPool:
+    """Places pixels with several accounts sharing one board snapshot.
+
+    Each account reads its profile first, then places all of its banked pixels, the highest priority ones, as soon
+    as its own cooldown ends. A pixel handed to an account is reserved for reservation_time seconds so that no
+    other account targets it in the meantime, and placed pixels leave the queue of the snapshot.
+    The board is fetched again once the snapshot is older than board_max_age seconds.
+    """
+
+    def __init__(
+        self, monitor: ImageMonitor, apis: List[Any], reservation_time: float = 30.0, board_max_age: float = 2.0
+    ) -> None:
+        if not apis:
+            raise ValueError("The account pool needs at least one account")
+        self.monitor = monitor
+        self.accounts = [PoolAccount(name=f"account {index + 1}", api=api) for index, api in enumerate(apis)]
+        self.board_max_age = board_max_age
+        self.logger = logging.getLogger(__name__)
+        self.reservations = PixelReservations(reservation_time)
+        self._board_time: Optional[float] = None
+
+    def _remove(self, account: PoolAccount, error: Exception) -> None:
+        if account.removed:
+            return
+        account.removed = True
+        self.logger.error("%s removed from the pool: %s", account.name, str(error))
+
+    def _refresh_board(self) -> None:
+        """Fetches the board with the client of the monitor, moving to the next account when its tokens are lost"""
+        while True:
+            try:
+                self.monitor.refresh()
+                return
+            except AuthenticationError as e:
+                for account in self.accounts:
+                    if account.api is self.monitor.api and not account.removed:
+                        self._remove(account, e)
+                usable = [account for account in self.accounts if not account.removed]
+                if not usable:
+                    raise
+                self.monitor.api = usable[0].api
+
+    def _pixels_to_fix(self) -> PixelQueue:
+        now = time.monotonic()
+        if self._board_time is None or now - self._board_time > self.board_max_age:
+            self._refresh_board()
+            self._board_time = now
+        return self.monitor.queue
+
+    def next_pixel(self) -> Optional[PixelToFix]:
+        """Reserves and returns the highest priority pixel no other account is working on"""
+        return self.reservations.take(self._pixels_to_fix())
+
+    def _place(self, account: PoolAccount) -> None:
+        """Places the pixels banked by an account back-to-back, like ImageMonitor._place_burst"""
+        for _ in range(max(1, account.cooldown.available_pixels())):
+            if not self._place_one(account):
+                return
+
+    def _place_one(self, account: PoolAccount) -> bool:
+        pixel = self.next_pixel()
+        if pixel is None:
+            account.ready_at = time.monotonic() + IDLE_DELAY
+            return False
+        result = account.api.set_pixel(Pixel(x=pixel.x, y=pixel.y, color=pixel.target_color))
+        account.observe(result)
+        if result.success:
+            account.placed += 1
+            self.monitor.mark_placed(pixel)
+            self.logger.info("Pixel successfully placed at (%d, %d) by %s", pixel.x, pixel.y, account.name)
+            return True
+        self.reservations.release(pixel)
+        if result.status_code == HTTPStatus.TOO_EARLY.value:
+            self.logger.info(
+                "%s: next pixel available in %.1f seconds", account.name, account.ready_at - time.monotonic()
+            )
+        else:
+            self.logger.error("%s: unexpected error %d", account.name, result.status_code)
+        return False
+
+    def run(self) -> None:
+        """Dispatches pixels to the accounts until all of them are unusable"""
+        self.monitor.start()
+        for account in self.accounts:
+            try:
+                profile = account.api.get_profile()
+            except AuthenticationError as e:
+                self._remove(account, e)
+                continue
+            if profile:
+                account.observe_profile(profile)
+        queue = [(account.ready_at, index) for index, account in enumerate(self.accounts) if not account.removed]
+        heapq.heapify(queue)
+        while queue:
+            ready_at, index = heapq.heappop(queue)
+            account = self.accounts[index]
+            if account.removed:
+                continue
+            delay = ready_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                with self.monitor.profiler.cycle():
+                    self._place(account)
+            except (TokenError, AuthenticationError) as e:
+                self._remove(account, e)
+                continue
+            except (OSError, RequestException, ValueError) as e:
+                self.logger.error("%s: error placing pixel: %s", account.name, str(e))
+                account.ready_at = time.monotonic() + self.monitor.config.check_interval
+            heapq.heappush(queue, (account.ready_at, index))
+        self.logger.critical("No usable account left in the pool")
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import time
+from typing import Any, List
+
+from requests.exceptions import RequestException
+
+from ft_place_bot.config import HTTPStatus
+from ft_place_bot.core.account_pool import PixelReservations, PoolAccount
+from ft_place_bot.core.exceptions import AuthenticationError, TokenError
+from ft_place_bot.core.image_monitor import IDLE_DELAY, ImageMonitor
+from ft_place_bot.core.models import Pixel
+
+
+class AsyncImageMonitor:
+    """Maintains the targets of a monitor from one event loop, with asynchronous API clients.
+
+    One task keeps the board fresh while each account has its own task waiting for its cooldown and placing its
+    banked pixels, the highest priority ones nobody else reserved, so fetches, placements and timers of every
+    account overlap. Each account reads its profile first, for its pixel buffer, timers and token expiry.
+    The board is fetched again when older than board_max_age seconds, placed pixels leaving its queue meanwhile.
+    """
+
+    def __init__(
+        self, monitor: ImageMonitor, apis: List[Any], reservation_time: float = 30.0, board_max_age: float = 2.0
+    ) -> None:
+        if not apis:
+            raise ValueError("The async monitor needs at least one account")
+        self.monitor = monitor
+        self.accounts = [PoolAccount(name=f"account {index + 1}", api=api) for index, api in enumerate(apis)]
+        self.reservations = PixelReservations(reservation_time)
+        self.board_max_age = board_max_age
+        self.logger = logging.getLogger(__name__)
+
+    def _remove(self, account: PoolAccount, error: Exception) -> None:
+        if account.removed:
+            return
+        account.removed = True
+        self.logger.error("%s removed from the pool: %s", account.name, str(error))
+
+    async def _refresh_board(self) -> None:
+        """Fetches the board with the first account that has a working client"""
+        region = self.monitor.region
+        for account in self.accounts:
+            if account.removed:
+                continue
+            try:
+                snapshot = await account.api.get_board_snapshot(region)
+            except AuthenticationError as e:
+                self._remove(account, e)
+                continue
+            if snapshot is not None:
+                self.monitor.apply_snapshot(snapshot)
+                return
+        raise ValueError("Unable to get the board")
+
+    async def _board_loop(self, board_ready: asyncio.Event) -> None:
+        while not all(account.removed for account in self.accounts):
+            try:
+                await self._refresh_board()
+                board_ready.set()
+            except (OSError, RequestException, ValueError) as e:
+                self.logger.error("Error fetching the board: %s", str(e))
+                await asyncio.sleep(self.monitor.config.check_interval)
+                continue
+            await asyncio.sleep(self.board_max_age)
+        # Wakes up the account loops still waiting for a first board, so that they end as well
+        board_ready.set()
+
+    async def _place(self, account: PoolAccount) -> None:
+        """Places the pixels banked by an account back-to-back"""
+        for _ in range(max(1, account.cooldown.available_pixels())):
+            if not await self._place_one(account):
+                return
+
+    async def _place_one(self, account: PoolAccount) -> bool:
+        pixel = self.reservations.take(self.monitor.queue)
+        if pixel is None:
+            account.ready_at = time.monotonic() + IDLE_DELAY
+            return False
+        result = await account.api.set_pixel(Pixel(x=pixel.x, y=pixel.y, color=pixel.target_color))
+        account.observe(result)
+        if result.success:
+            account.placed += 1
+            self.monitor.mark_placed(pixel)
+            self.logger.info("Pixel successfully placed at (%d, %d) by %s", pixel.x, pixel.y, account.name)
+            return True
+        self.reservations.release(pixel)
+        if result.status_code == HTTPStatus.TOO_EARLY.value:
+            self.logger.info(
+                "%s: next pixel available in %.1f seconds", account.name, account.ready_at - time.monotonic()
+            )
+        else:
+            self.logger.error("%s: unexpected error %d", account.name, result.status_code)
+        return False
+
+    async def _read_profile(self, account: PoolAccount) -> None:
+        profile = await account.api.get_profile()
+        if profile:
+            account.observe_profile(profile)
+
+    async def _account_loop(self, account: PoolAccount, board_ready: asyncio.Event) -> None:
+        try:
+            await self._read_profile(account)
+        except AuthenticationError as e:
+            self._remove(account, e)
+            return
+        while True:
+            delay = account.ready_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await board_ready.wait()
+            if account.removed:
+                return
+            try:
+                await self._place(account)
+            except (TokenError, AuthenticationError) as e:
+                self._remove(account, e)
+                return
+            except (OSError, RequestException, ValueError) as e:
+                self.logger.error("%s: error placing pixel: %s", account.name, str(e))
+                account.ready_at = time.monotonic() + self.monitor.config.check_interval
+
+    async def run(self) -> None:
+        """Places pixels until every account is unusable"""
+        self.monitor.start()
+        board_ready = asyncio.Event()
+        tasks = [asyncio.ensure_future(self._board_loop(board_ready))]
+        # Tokens are refreshed in the background as soon as they expire rather than by the next placement
+        tasks.extend(asyncio.ensure_future(account.api.keep_tokens_fresh()) for account in self.accounts)
+        try:
+            await asyncio.gather(*(self._account_loop(account, board_ready) for account in self.accounts))
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self.logger.critical("No usable account left")
@@ -0,0 +1,313 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ft_place_bot.core.color_config import ColorTables
+from ft_place_bot.core.models import BoardRegion
+
+
+# Side of the square tiles BoardDiffTracker splits a target into, a multiple of 8 so that tiles hash by 8 byte words
+DEFAULT_TILE_SIZE = 64
+# Seed of the checksum multipliers, fixed so that the checksums of two snapshots are comparable
+_CHECKSUM_SEED = 0x7113
+
+
+@dataclass
+class BoardDiff:
+    """Result of comparing a board against a target image"""
+
+    total_pixels: int
+    correct_pixels: int
+    incorrect_pixels: int
+    x: np.ndarray[Any, np.dtype[np.intp]]
+    y: np.ndarray[Any, np.dtype[np.intp]]
+    current_color: np.ndarray[Any, Any]
+    target_color: np.ndarray[Any, Any]
+    priority: np.ndarray[Any, np.dtype[np.int16]]
+    # Precedence of the target each pixel belongs to when several targets are maintained, higher goes first
+    weight: Optional[np.ndarray[Any, np.dtype[np.float64]]] = None
+    # Flat index of the BoardDiffTracker tile holding each pixel, when the diff comes from a tracker
+    tile: Optional[np.ndarray[Any, np.dtype[np.intp]]] = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns the completion stats of the target"""
+        completion_percentage = (self.correct_pixels / self.total_pixels * 100) if self.total_pixels > 0 else 0
+        return {
+            "total_pixels": self.total_pixels,
+            "correct_pixels": self.correct_pixels,
+            "incorrect_pixels": self.incorrect_pixels,
+            "completion_percentage": round(completion_percentage, 2),
+        }
+
+
+def overlap_slices(
+    target_shape: Tuple[int, ...], board_shape: Tuple[int, ...], origin_x: int, origin_y: int
+) -> Tuple[slice, slice, slice, slice]:
+    """Returns the (target_x, target_y, board_x, board_y) slices of the area where the target lies on the board"""
+    x0, y0 = max(0, -origin_x), max(0, -origin_y)
+    x1 = max(x0, min(target_shape[0], board_shape[0] - origin_x))
+    y1 = max(y0, min(target_shape[1], board_shape[1] - origin_y))
+    return (
+        slice(x0, x1),
+        slice(y0, y1),
+        slice(origin_x + x0, origin_x + x1),
+        slice(origin_y + y0, origin_y + y1),
+    )
+
+
+def diff_board(
+    board: np.ndarray[Any, Any],
+    target_colors: np.ndarray[Any, Any],
+    origin_x: int,
+    origin_y: int,
+    tables: ColorTables,
+) -> BoardDiff:
+    """Compares the board to the target in a single vectorized pass"""
+    target_x, target_y, board_x, board_y = overlap_slices(target_colors.shape, board.shape, origin_x, origin_y)
+    target = target_colors[target_x, target_y]
+    window = board[board_x, board_y]
+
+    countable = ~tables.ignore_source[target] & ~tables.ignore_board[window]
+    mismatch = countable & (tables.main_color[target] != tables.main_color[window])
+
+    total_pixels = int(np.count_nonzero(countable))
+    incorrect_pixels = int(np.count_nonzero(mismatch))
+    xs, ys = np.nonzero(mismatch)
+    target_color = target[xs, ys]
+    return BoardDiff(
+        total_pixels=total_pixels,
+        correct_pixels=total_pixels - incorrect_pixels,
+        incorrect_pixels=incorrect_pixels,
+        x=xs + board_x.start,
+        y=ys + board_y.start,
+        current_color=window[xs, ys],
+        target_color=target_color,
+        priority=tables.priority[target_color],
+    )
+
+
+def _round_up(value: int, multiple: int) -> int:
+    return -(-value // multiple) * multiple
+
+
+class BoardDiffTracker:
+    """Keeps the diff of a target up to date across consecutive board snapshots.
+
+    The target is split into square tiles of tile_size cells, each with a checksum of its board content and its
+    pixel counts. A new snapshot only gets its changed tiles re-diffed, and the pixels to fix are only looked for
+    in the tiles that have some, so the work follows the damaged area rather than the target size.
+
+    table_offsets (shaped like the target) is added to the color ids of both the target and the board before the
+    table lookups, so that each pixel can use its own block of concatenated tables. The target then holds the
+    offset color ids, and the reported target colors are the plain ones.
+    """
+
+    tile_size = DEFAULT_TILE_SIZE
+
+    def __init__(
+        self,
+        target_colors: np.ndarray[Any, Any],
+        origin_x: int,
+        origin_y: int,
+        tables: ColorTables,
+        table_offsets: Optional[np.ndarray[Any, Any]] = None,
+    ) -> None:
+        self.target_colors = target_colors
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        self.tables = tables
+        self.table_offsets = table_offsets
+        self.total_pixels = 0
+        self.incorrect_pixels = 0
+        # Countable and incorrect pixels of each tile
+        self.tile_total: np.ndarray[Any, np.dtype[np.int64]] = np.zeros((0, 0), dtype=np.int64)
+        self.tile_incorrect: np.ndarray[Any, np.dtype[np.int64]] = np.zeros((0, 0), dtype=np.int64)
+        self._board_shape: Optional[Tuple[int, ...]] = None
+        self._region: Optional[BoardRegion] = None
+        self._shape = (0, 0)
+        # Per cell state, padded with ignored cells up to a whole number of tiles
+        self._window: Optional[np.ndarray[Any, Any]] = None
+        self._incoming: np.ndarray[Any, Any] = np.empty((0, 0), dtype=np.uint8)
+        self._target: np.ndarray[Any, Any] = np.empty((0, 0), dtype=target_colors.dtype)
+        self._table_offsets: np.ndarray[Any, Any] = np.zeros((0, 0), dtype=np.int32)
+        self._countable = np.empty((0, 0), dtype=np.bool_)
+        self._mismatch = np.empty((0, 0), dtype=np.bool_)
+        self._checksums: np.ndarray[Any, np.dtype[np.uint64]] = np.zeros((0, 0), dtype=np.uint64)
+        self._multipliers: np.ndarray[Any, np.dtype[np.uint64]] = np.ones((0, 0), dtype=np.uint64)
+        self._offset = (0, 0)
+        self._result: Optional[BoardDiff] = None
+        # Tiles whose content changed with the last update, None when it recomputed everything
+        self.changed_tiles: Optional[np.ndarray[Any, np.dtype[np.bool_]]] = None
+
+    def reset(self) -> None:
+        """Forgets the previous snapshot so the next update recomputes everything"""
+        self._board_shape = None
+        self._region = None
+        self._window = None
+        self._result = None
+        self.changed_tiles = None
+
+    @property
+    def tiles(self) -> Tuple[int, int]:
+        """Number of tiles along x and y"""
+        return self.tile_total.shape[0], self.tile_total.shape[1]
+
+    def _tile_view(self, cells: np.ndarray[Any, Any]) -> np.ndarray[Any, Any]:
+        """Views padded per cell state as (tile x, tile y, x in tile, y in tile)"""
+        tiles_x, tiles_y = self.tiles
+        tile_width = cells.shape[1] // max(tiles_y, 1)
+        view: np.ndarray[Any, Any] = cells.reshape(tiles_x, self.tile_size, tiles_y, tile_width).swapaxes(1, 2)
+        return view
+
+    def _tile_checksums(self, window: np.ndarray[Any, Any]) -> np.ndarray[Any, np.dtype[np.uint64]]:
+        """Hashes each tile of a padded window, 8 bytes at a time, with a multiplier depending on the position"""
+        if window.size == 0:
+            return np.zeros(self.tiles, dtype=np.uint64)
+        words = self._tile_view(window.view(np.uint64)) * self._multipliers
+        words ^= words >> np.uint64(29)
+        checksums: np.ndarray[Any, np.dtype[np.uint64]] = words.sum(axis=(2, 3), dtype=np.uint64)
+        return checksums
+
+    def _count_tiles(self, tiles: Any = Ellipsis) -> None:
+        self.tile_total[tiles] = self._tile_view(self._countable)[tiles].sum(axis=(-2, -1))
+        self.tile_incorrect[tiles] = self._tile_view(self._mismatch)[tiles].sum(axis=(-2, -1))
+        self.total_pixels = int(self.tile_total.sum())
+        self.incorrect_pixels = int(self.tile_incorrect.sum())
+
+    def _classify(
+        self, target: np.ndarray[Any, Any], window: np.ndarray[Any, Any], table_offsets: Optional[np.ndarray[Any, Any]]
+    ) -> Tuple[np.ndarray[Any, np.dtype[np.bool_]], np.ndarray[Any, np.dtype[np.bool_]]]:
+        board_keys = window if table_offsets is None else window + table_offsets
+        countable = ~self.tables.ignore_source[target] & ~self.tables.ignore_board[board_keys]
+        mismatch = countable & (self.tables.main_color[target] != self.tables.main_color[board_keys])
+        return countable, mismatch
+
+    def _offsets_at(self, index: Any) -> Optional[np.ndarray[Any, Any]]:
+        return self._table_offsets[index] if self.table_offsets is not None else None
+
+    def _full_update(self, board: np.ndarray[Any, Any], region: Optional[BoardRegion]) -> None:
+        if self.tile_size <= 0 or self.tile_size % 8:
+            raise ValueError("Tile size must be a positive multiple of 8")
+        board_offset = (region.x, region.y) if region is not None else (0, 0)
+        target_x, target_y, board_x, board_y = overlap_slices(
+            self.target_colors.shape, board.shape, self.origin_x - board_offset[0], self.origin_y - board_offset[1]
+        )
+        self._board_shape = board.shape
+        self._region = region
+        self._offset = (board_x.start, board_y.start)
+        self._shape = (board_x.stop - board_x.start, board_y.stop - board_y.start)
+        padded = (_round_up(self._shape[0], self.tile_size), _round_up(self._shape[1], self.tile_size))
+        cells = (slice(0, self._shape[0]), slice(0, self._shape[1]))
+
+        self._target = np.zeros(padded, dtype=self.target_colors.dtype)
+        self._target[cells] = self.target_colors[target_x, target_y]
+        self._window = np.zeros(padded, dtype=board.dtype)
+        self._window[cells] = board[board_x, board_y]
+        self._incoming = np.zeros(padded, dtype=board.dtype)
+        if self.table_offsets is not None:
+            self._table_offsets = np.zeros(padded, dtype=self.table_offsets.dtype)
+            self._table_offsets[cells] = self.table_offsets[target_x, target_y]
+        self._countable = np.zeros(padded, dtype=np.bool_)
+        self._mismatch = np.zeros(padded, dtype=np.bool_)
+        self._countable[cells], self._mismatch[cells] = self._classify(
+            self._target[cells], self._window[cells], self._offsets_at(cells)
+        )
+
+        tiles = (padded[0] // self.tile_size, padded[1] // self.tile_size)
+        self.tile_total = np.zeros(tiles, dtype=np.int64)
+        self.tile_incorrect = np.zeros(tiles, dtype=np.int64)
+        self._count_tiles()
+        words_per_row = self.tile_size * board.dtype.itemsize // 8
+        rng = np.random.default_rng(_CHECKSUM_SEED)
+        self._multipliers = rng.integers(0, 1 << 63, size=(self.tile_size, words_per_row), dtype=np.uint64)
+        self._multipliers = self._multipliers * np.uint64(2) + np.uint64(1)  # Odd, so no bit of a word is lost
+        self._checksums = self._tile_checksums(self._window)
+
+    def _partial_update(self, window: np.ndarray[Any, Any], changed: Tuple[np.ndarray[Any, Any], ...]) -> None:
+        if self._window is None:
+            raise RuntimeError("Tracker has no previous snapshot")
+        self._countable[changed], self._mismatch[changed] = self._classify(
+            self._target[changed], window[changed], self._offsets_at(changed)
+        )
+        self._window[changed] = window[changed]
+
+    def update(self, board: np.ndarray[Any, Any], region: Optional[BoardRegion] = None) -> BoardDiff:
+        """Applies a new board snapshot, only re-checking the tiles that changed since the previous one.
+
+        The board can be cropped to a region, in which case board[0, 0] is the cell at (region.x, region.y).
+        """
+        if self._window is None or board.shape != self._board_shape or region != self._region:
+            self._full_update(board, region)
+            self._result = None
+            self.changed_tiles = None
+        else:
+            board_x = slice(self._offset[0], self._offset[0] + self._shape[0])
+            board_y = slice(self._offset[1], self._offset[1] + self._shape[1])
+            self._incoming[: self._shape[0], : self._shape[1]] = board[board_x, board_y]
+            checksums = self._tile_checksums(self._incoming)
+            self.changed_tiles = checksums != self._checksums
+            tiles_x, tiles_y = np.nonzero(self.changed_tiles)
+            if tiles_x.size:
+                old = self._tile_view(self._window)[tiles_x, tiles_y]
+                new = self._tile_view(self._incoming)[tiles_x, tiles_y]
+                tile, cell_x, cell_y = np.nonzero(old != new)
+                changed = (tiles_x[tile] * self.tile_size + cell_x, tiles_y[tile] * self.tile_size + cell_y)
+                self._partial_update(self._incoming, changed)
+                self._checksums[tiles_x, tiles_y] = checksums[tiles_x, tiles_y]
+                self._count_tiles((tiles_x, tiles_y))
+                self._result = None
+
+        if self._result is None:
+            self._result = self._build_result()
+        return self._result
+
+    def _board_origin(self) -> Tuple[int, int]:
+        """Board coordinates of the first cell of the window"""
+        board_offset = (self._region.x, self._region.y) if self._region is not None else (0, 0)
+        return self._offset[0] + board_offset[0], self._offset[1] + board_offset[1]
+
+    def _build_result(self) -> BoardDiff:
+        if self._window is None:
+            raise RuntimeError("Tracker has no previous snapshot")
+        # Only the tiles holding incorrect pixels are searched
+        tiles_x, tiles_y = np.nonzero(self.tile_incorrect)
+        tile, cell_x, cell_y = np.nonzero(self._tile_view(self._mismatch)[tiles_x, tiles_y])
+        xs = tiles_x[tile] * self.tile_size + cell_x
+        ys = tiles_y[tile] * self.tile_size + cell_y
+        target_keys = self._target[xs, ys]
+        table_offsets = self._offsets_at((xs, ys))
+        target_color = target_keys if table_offsets is None else target_keys - table_offsets
+        origin_x, origin_y = self._board_origin()
+        return BoardDiff(
+            total_pixels=self.total_pixels,
+            correct_pixels=self.total_pixels - self.incorrect_pixels,
+            incorrect_pixels=self.incorrect_pixels,
+            x=xs + origin_x,
+            y=ys + origin_y,
+            current_color=self._window[xs, ys],
+            target_color=target_color,
+            priority=self.tables.priority[target_keys],
+            tile=tiles_x[tile] * self.tiles[1] + tiles_y[tile],
+        )
+
+    def tile_stats(self) -> List[Dict[str, Any]]:
+        """Returns the completion stats of the tiles with pixels to fix, most damaged first"""
+        origin_x, origin_y = self._board_origin()
+        stats = []
+        for tile_x, tile_y in zip(*np.nonzero(self.tile_incorrect)):
+            x, y = int(tile_x) * self.tile_size, int(tile_y) * self.tile_size
+            total = int(self.tile_total[tile_x, tile_y])
+            incorrect = int(self.tile_incorrect[tile_x, tile_y])
+            stats.append(
+                {
+                    "x": origin_x + x,
+                    "y": origin_y + y,
+                    "width": min(self.tile_size, self._shape[0] - x),
+                    "height": min(self.tile_size, self._shape[1] - y),
+                    "total_pixels": total,
+                    "incorrect_pixels": incorrect,
+                    "completion_percentage": round((total - incorrect) / total * 100, 2),
+                }
+            )
+        return sorted(stats, key=lambda tile: -tile["incorrect_pixels"])
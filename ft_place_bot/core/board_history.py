@@ -0,0 +1,251 @@
+import mmap
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator, List, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from ft_place_bot.core.exceptions import FTPlaceError
+from ft_place_bot.core.models import BoardRegion
+
+
+HISTORY_MAGIC = b"FTBH"
+HISTORY_VERSION = 1
+# magic, version, frame capacity, data capacity, first sequence number, frame count, next data offset
+HISTORY_HEADER = struct.Struct("<4sHIQQQQ")
+INDEX_FILE = "index.bin"
+DATA_FILE = "frames.bin"
+INDEX_DTYPE = np.dtype(
+    [
+        ("timestamp", "<f8"),
+        ("offset", "<u8"),
+        ("length", "<u4"),
+        ("kind", "u1"),
+        ("x", "<i4"),
+        ("y", "<i4"),
+        ("width", "<u4"),
+        ("height", "<u4"),
+    ]
+)
+DEFAULT_MAX_FRAMES = 1 << 16
+DEFAULT_MAX_BYTES = 64 << 20
+# Frames between two keyframes, bounding the deltas replayed to rebuild a frame
+DEFAULT_KEYFRAME_INTERVAL = 64
+# Changed fraction of the board above which a delta is stored as a compressed XOR rather than sparse changes
+SPARSE_DELTA_RATIO = 1 / 8
+
+KEYFRAME = 0
+SPARSE_DELTA = 1
+XOR_DELTA = 2
+
+Board = NDArray[np.uint8]
+
+
+class BoardHistory:
+    """Fetched boards stored on disk as compressed keyframes and deltas against the previous frame.
+
+    The history lives in a directory holding a memory-mapped index of the frames (timestamp, region, location of
+    the record) and a data file both used as ring buffers, the oldest frames being evicted once either one is full.
+    Eviction always stops on a keyframe so that every remaining frame can be rebuilt. Opening an existing directory
+    keeps its capacities and resumes recording after its last frame.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_frames: int = DEFAULT_MAX_FRAMES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL,
+    ) -> None:
+        self.directory = Path(directory)
+        self.keyframe_interval = keyframe_interval
+        self.directory.mkdir(parents=True, exist_ok=True)
+        index_path = self.directory / INDEX_FILE
+        if not index_path.exists():
+            self._create(index_path, max_frames, max_bytes)
+        self._index_file = index_path.open("r+b")
+        self._index_map = mmap.mmap(self._index_file.fileno(), 0)
+        magic, version, self.max_frames, self.max_bytes, *_ = HISTORY_HEADER.unpack_from(self._index_map)
+        if magic != HISTORY_MAGIC or version != HISTORY_VERSION:
+            raise FTPlaceError(f"Not a board history: {self.directory}")
+        self._entries: NDArray[Any] = np.frombuffer(
+            self._index_map, dtype=INDEX_DTYPE, count=self.max_frames, offset=HISTORY_HEADER.size
+        )
+        self._data: BinaryIO = (self.directory / DATA_FILE).open("r+b")
+        self._last: Optional[Board] = None
+        self._last_region: Optional[BoardRegion] = None
+        self._since_keyframe = 0
+
+    @staticmethod
+    def _create(index_path: Path, max_frames: int, max_bytes: int) -> None:
+        header = HISTORY_HEADER.pack(HISTORY_MAGIC, HISTORY_VERSION, max_frames, max_bytes, 0, 0, 0)
+        with index_path.open("wb") as f:
+            f.write(header)
+            f.truncate(HISTORY_HEADER.size + max_frames * INDEX_DTYPE.itemsize)
+        with (index_path.parent / DATA_FILE).open("wb") as f:
+            f.truncate(max_bytes)
+
+    def close(self) -> None:
+        self._entries = np.empty(0, dtype=INDEX_DTYPE)
+        self._index_map.close()
+        self._index_file.close()
+        self._data.close()
+
+    def _header(self) -> Tuple[int, int, int]:
+        """Returns the (first sequence number, frame count, next data offset)"""
+        first, count, data_head = HISTORY_HEADER.unpack_from(self._index_map)[4:]
+        return first, count, data_head
+
+    def _set_header(self, first: int, count: int, data_head: int) -> None:
+        HISTORY_HEADER.pack_into(
+            self._index_map, 0, HISTORY_MAGIC, HISTORY_VERSION, self.max_frames, self.max_bytes, first, count, data_head
+        )
+
+    def __len__(self) -> int:
+        return self._header()[1]
+
+    def _slots(self) -> NDArray[np.intp]:
+        first, count, _ = self._header()
+        slots: NDArray[np.intp] = (first + np.arange(count)) % self.max_frames
+        return slots
+
+    def timestamps(self) -> NDArray[np.float64]:
+        """Returns the timestamps of the stored frames, oldest first"""
+        timestamps: NDArray[np.float64] = self._entries["timestamp"][self._slots()]
+        return timestamps
+
+    @staticmethod
+    def _encode(board: Board, previous: Optional[Board]) -> Tuple[int, bytes]:
+        if previous is None:
+            return KEYFRAME, zlib.compress(board.tobytes())
+        changed = np.flatnonzero(board.reshape(-1) != previous.reshape(-1))
+        if changed.size <= board.size * SPARSE_DELTA_RATIO:
+            # Gaps between changed cells are small numbers, which compress well
+            gaps = np.diff(changed, prepend=0).astype(np.uint32)
+            payload = struct.pack("<I", changed.size) + gaps.tobytes() + board.reshape(-1)[changed].tobytes()
+            return SPARSE_DELTA, zlib.compress(payload)
+        return XOR_DELTA, zlib.compress(np.bitwise_xor(board, previous).tobytes())
+
+    @staticmethod
+    def _decode(kind: int, record: bytes, shape: Tuple[int, int], previous: Optional[Board]) -> Board:
+        payload = zlib.decompress(record)
+        board: Board
+        if kind == KEYFRAME:
+            board = np.frombuffer(payload, dtype=np.uint8).reshape(shape).copy()
+            return board
+        if previous is None or previous.shape != shape:
+            raise FTPlaceError("Board history delta without its previous frame")
+        if kind == XOR_DELTA:
+            board = np.bitwise_xor(previous, np.frombuffer(payload, dtype=np.uint8).reshape(shape))
+            return board
+        (count,) = struct.unpack_from("<I", payload)
+        gaps = np.frombuffer(payload, dtype=np.uint32, count=count, offset=4)
+        values = np.frombuffer(payload, dtype=np.uint8, count=count, offset=4 + 4 * count)
+        board = previous.copy()
+        board.reshape(-1)[np.cumsum(gaps, dtype=np.intp)] = values
+        return board
+
+    def _evict_oldest(self) -> None:
+        """Drops the oldest frame, then the deltas depending on it"""
+        first, count, data_head = self._header()
+        first, count = first + 1, count - 1
+        while count and self._entries["kind"][first % self.max_frames] != KEYFRAME:
+            first, count = first + 1, count - 1
+        self._set_header(first, count, data_head)
+
+    def _make_room(self, length: int) -> int:
+        """Evicts the frames in the way of a new record, returns the offset to write it at"""
+        if length > self.max_bytes:
+            raise FTPlaceError(f"Board frame of {length} bytes does not fit in the history")
+        while len(self) >= self.max_frames:
+            self._evict_oldest()
+        head = start = self._header()[2]
+        if head + length > self.max_bytes:
+            start = 0
+            # Records past the head were written before the previous wrap, they are the oldest ones
+            while len(self) and self._oldest_offset() >= head:
+                self._evict_oldest()
+        while len(self):
+            oldest_start = self._oldest_offset()
+            oldest_end = oldest_start + int(self._entries["length"][self._header()[0] % self.max_frames])
+            if oldest_end <= start or oldest_start >= start + length:
+                break
+            self._evict_oldest()
+        return start
+
+    def _oldest_offset(self) -> int:
+        return int(self._entries["offset"][self._header()[0] % self.max_frames])
+
+    def append(self, board: Board, region: BoardRegion, timestamp: float) -> None:
+        """Records a board fetched over region at the given POSIX timestamp"""
+        board = np.ascontiguousarray(board, dtype=np.uint8)
+        previous = self._last if len(self) else None
+        if previous is not None and (
+            self._last_region != region
+            or previous.shape != board.shape
+            or self._since_keyframe >= self.keyframe_interval
+        ):
+            previous = None
+        kind, record = self._encode(board, previous)
+        start = self._make_room(len(record))
+        if kind != KEYFRAME and not len(self):
+            # The frames the delta depends on were evicted to make room
+            kind, record = self._encode(board, None)
+            start = self._make_room(len(record))
+        self._data.seek(start)
+        self._data.write(record)
+        self._data.flush()
+
+        first, count, _ = self._header()
+        self._entries[(first + count) % self.max_frames] = (
+            timestamp,
+            start,
+            len(record),
+            kind,
+            region.x,
+            region.y,
+            board.shape[0],
+            board.shape[1],
+        )
+        self._set_header(first, count + 1, start + len(record))
+        self._last = board.copy()
+        self._last_region = region
+        self._since_keyframe = 0 if kind == KEYFRAME else self._since_keyframe + 1
+
+    def _region(self, entry: Any) -> BoardRegion:
+        return BoardRegion(x=int(entry["x"]), y=int(entry["y"]), width=int(entry["width"]), height=int(entry["height"]))
+
+    def _replay(self, slots: NDArray[np.intp]) -> Iterator[Tuple[float, BoardRegion, Board]]:
+        with mmap.mmap(self._data.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            board: Optional[Board] = None
+            for slot in slots.tolist():
+                entry = self._entries[slot]
+                offset, length = int(entry["offset"]), int(entry["length"])
+                board = self._decode(
+                    int(entry["kind"]),
+                    data[offset : offset + length],
+                    (int(entry["width"]), int(entry["height"])),
+                    board,
+                )
+                yield float(entry["timestamp"]), self._region(entry), board
+
+    def __iter__(self) -> Iterator[Tuple[float, BoardRegion, Board]]:
+        """Yields (timestamp, region, board) for every stored frame, oldest first"""
+        return self._replay(self._slots())
+
+    def frame(self, position: int) -> Tuple[float, BoardRegion, Board]:
+        """Returns the frame at a position, 0 being the oldest, replaying the deltas since its keyframe"""
+        slots = self._slots()
+        if not -len(slots) <= position < len(slots):
+            raise IndexError("Board history position out of range")
+        position %= len(slots)
+        keyframes: List[int] = np.flatnonzero(self._entries["kind"][slots[: position + 1]] == KEYFRAME).tolist()
+        *_, last = self._replay(slots[keyframes[-1] : position + 1])
+        return last
+
+    def at(self, timestamp: float) -> Optional[Tuple[float, BoardRegion, Board]]:
+        """Returns the last frame recorded at or before a timestamp, None when older than the whole history"""
+        position = int(np.searchsorted(self.timestamps(), timestamp, side="right")) - 1
+        return self.frame(position) if position >= 0 else None
@@ -1,5 +1,15 @@
 from dataclasses import dataclass
-from typing import List, Optional, Set
+from typing import Any, List, Optional, Set
+
+import numpy as np
+
+
+# Color ids are looked up by direct indexing, so tables cover the whole uint8 range
+LOOKUP_SIZE = 256
+# Priority assigned to colors without a configured (or with a falsy) priority level
+DEFAULT_PRIORITY = 999
+# Color id marking transparent target pixels, which are never checked (FTPlace color ids start at 1)
+TRANSPARENT_COLOR_ID = 0
 
 
 @dataclass
@@ -18,6 +28,29 @@ class ColorPriority:
     color_ids: Set[int]
 
 
+@dataclass
+class ColorTables:
+    """Dense lookup tables compiled from a ColorConfig, indexed by color id"""
+
+    main_color: np.ndarray[Any, np.dtype[np.int16]]
+    priority: np.ndarray[Any, np.dtype[np.int16]]
+    ignore_source: np.ndarray[Any, np.dtype[np.bool_]]
+    ignore_board: np.ndarray[Any, np.dtype[np.bool_]]
+
+    @classmethod
+    def concatenate(cls, tables: List["ColorTables"], size: int = LOOKUP_SIZE) -> "ColorTables":
+        """Chains several tables: block i covers ids [i * size, (i + 1) * size), a last block ignores every color"""
+        ignore_all = np.ones(size, dtype=np.bool_)
+        return cls(
+            main_color=np.concatenate([table.main_color for table in tables] + [np.arange(size, dtype=np.int16)]),
+            priority=np.concatenate(
+                [table.priority for table in tables] + [np.full(size, DEFAULT_PRIORITY, dtype=np.int16)]
+            ),
+            ignore_source=np.concatenate([table.ignore_source for table in tables] + [ignore_all]),
+            ignore_board=np.concatenate([table.ignore_board for table in tables] + [ignore_all]),
+        )
+
+
 @dataclass
 class ColorConfig:
     """Global color configuration"""
@@ -49,6 +82,33 @@ class ColorConfig:
         """Checks if a color should be ignored in the board"""
         return color_id in self.ignored_board_colors
 
+    def compile(self, size: int = LOOKUP_SIZE) -> ColorTables:
+        """Compiles the configuration into lookup tables matching the methods above (transparent pixels aside)"""
+        color_ids = np.arange(size)
+        main_color = color_ids.astype(np.int16)
+        priority = np.full(size, DEFAULT_PRIORITY, dtype=np.int16)
+        ignore_source = np.zeros(size, dtype=np.bool_)
+        ignore_source[TRANSPARENT_COLOR_ID] = True
+        ignore_board = np.zeros(size, dtype=np.bool_)
+        # Walk in reverse so the first matching entry wins, like the linear scans
+        for color_set in reversed(self.color_sets):
+            for color_id in color_set.similar_colors:
+                if 0 <= color_id < size:
+                    main_color[color_id] = color_set.main_color
+        for priority_config in reversed(self.priorities):
+            for color_id in priority_config.color_ids:
+                if 0 <= color_id < size:
+                    priority[color_id] = priority_config.priority_level or DEFAULT_PRIORITY
+        for color_id in self.ignored_source_colors:
+            if 0 <= color_id < size:
+                ignore_source[color_id] = True
+        for color_id in self.ignored_board_colors:
+            if 0 <= color_id < size:
+                ignore_board[color_id] = True
+        return ColorTables(
+            main_color=main_color, priority=priority, ignore_source=ignore_source, ignore_board=ignore_board
+        )
+
 
 # Example configuration:
 if __name__ == "__main__":
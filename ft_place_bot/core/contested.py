@@ -0,0 +1,100 @@
+import math
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from ft_place_bot.core.models import BoardRegion
+
+
+# Seconds for the heat of an overwrite to halve
+DEFAULT_HALF_LIFE = 600.0
+# Penalty, in priority levels, of a pixel per overwrite counted in its heat
+DEFAULT_HEAT_WEIGHT = 0.5
+# Seconds after a placement at which it is checked to still be on the board
+DEFAULT_SURVIVAL_WINDOW = 300.0
+
+
+class ContestedPixels:
+    """Decaying per-pixel count of the overwrites made by others, and survival of our own placements.
+
+    Each board snapshot is compared to the previous one over the monitored region: every changed cell that is not
+    one of our placements adds one to the heat of that cell, and the whole map decays exponentially with half_life
+    seconds, so the heat is roughly the number of recent overwrites and heat / mean_lifetime their rate.
+    Placements are also checked survival_window seconds later, giving the share of them still on the board.
+    """
+
+    def __init__(self, half_life: float = DEFAULT_HALF_LIFE, survival_window: float = DEFAULT_SURVIVAL_WINDOW) -> None:
+        self.half_life = half_life
+        self.survival_window = survival_window
+        self.heat: NDArray[np.float32] = np.zeros((0, 0), dtype=np.float32)
+        self.survived = 0
+        self.evaluated = 0
+        self._region: Optional[BoardRegion] = None
+        self._board: Optional[NDArray[Any]] = None
+        self._time = 0.0
+        # Our placements since the previous snapshot, and the ones waiting for their survival check
+        self._placed: Dict[Tuple[int, int], int] = {}
+        self._pending: Deque[Tuple[float, int, int, int]] = deque()
+
+    @property
+    def mean_lifetime(self) -> float:
+        """Seconds an overwrite counts for on average, heat divided by it is a rate per second"""
+        return self.half_life / math.log(2)
+
+    @property
+    def survival_ratio(self) -> Optional[float]:
+        """Share of the checked placements still correct survival_window seconds after being made"""
+        return self.survived / self.evaluated if self.evaluated else None
+
+    def mark_placed(self, x: int, y: int, color: int, timestamp: float) -> None:
+        """Records a placement of ours, made at the given POSIX timestamp"""
+        self._placed[(x, y)] = color
+        self._pending.append((timestamp, x, y, color))
+
+    def update(self, board: NDArray[Any], region: BoardRegion, timestamp: float) -> Tuple[int, int]:
+        """Updates the heat with a board fetched over region, then checks the placements old enough"""
+        if self._board is None or region != self._region or self._board.shape != board.shape:
+            self.heat = np.zeros(board.shape, dtype=np.float32)
+        else:
+            changed = board != self._board
+            for (x, y), color in self._placed.items():
+                cell = (x - region.x, y - region.y)
+                if 0 <= cell[0] < board.shape[0] and 0 <= cell[1] < board.shape[1] and board[cell] == color:
+                    changed[cell] = False
+            self.heat *= np.float32(0.5 ** (max(0.0, timestamp - self._time) / self.half_life))
+            self.heat += changed
+        self._region, self._board, self._time = region, board.copy(), timestamp
+        self._placed = {}
+        return self.check_survival(timestamp)
+
+    def check_survival(self, timestamp: float) -> Tuple[int, int]:
+        """Checks the placements made survival_window seconds before timestamp against the last board.
+
+        Returns the number of placements checked, and how many of them survived.
+        """
+        board, region = self._board, self._region
+        if board is None or region is None:
+            return 0, 0
+        checked = survived = 0
+        while self._pending and timestamp - self._pending[0][0] >= self.survival_window:
+            _, x, y, color = self._pending.popleft()
+            cell = (x - region.x, y - region.y)
+            if not (0 <= cell[0] < board.shape[0] and 0 <= cell[1] < board.shape[1]):
+                continue
+            checked += 1
+            survived += int(board[cell] == color)
+        self.evaluated += checked
+        self.survived += survived
+        return checked, survived
+
+    def heat_at(self, x: NDArray[np.intp], y: NDArray[np.intp]) -> NDArray[np.float32]:
+        """Returns the heat of the board cells (x, y), 0 outside of the last region"""
+        heat = np.zeros(x.shape, dtype=np.float32)
+        if self._region is None or not self.heat.size:
+            return heat
+        cx, cy = x - self._region.x, y - self._region.y
+        inside = (cx >= 0) & (cx < self.heat.shape[0]) & (cy >= 0) & (cy < self.heat.shape[1])
+        heat[inside] = self.heat[cx[inside], cy[inside]]
+        return heat
@@ -0,0 +1,130 @@
+import math
+import time
+from collections import deque
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Deque, List, Optional, Tuple
+
+from ft_place_bot.config import HTTPStatus
+from ft_place_bot.core.models import PlacementResult, UserProfile
+
+
+# Clock offset samples kept, older ones are dropped so that a drifting clock is followed
+DEFAULT_CLOCK_SAMPLES = 32
+# Resolution of the HTTP Date header, in seconds
+DATE_RESOLUTION = 1.0
+
+
+def parse_timer(timer: str) -> float:
+    """Returns the POSIX timestamp of a server timer (ISO 8601)"""
+    return datetime.fromisoformat(timer.replace("Z", "+00:00")).timestamp()
+
+
+class ClockOffset:
+    """Estimate of the server time minus the local time, from the Date headers of the responses.
+
+    A Date header has a one second resolution, but each response bounds the offset: the server wrote it between
+    the moment the request was sent and the moment the response came back, at a time within the second it names.
+    Intersecting the bounds of the recent responses narrows the offset well below a second.
+    """
+
+    def __init__(self, max_samples: int = DEFAULT_CLOCK_SAMPLES) -> None:
+        self._bounds: Deque[Tuple[float, float]] = deque(maxlen=max_samples)
+
+    def observe(self, date_header: Optional[str], sent_at: float, received_at: float) -> None:
+        """Adds a response, sent_at and received_at being the local time.time() around its request"""
+        if not date_header:
+            return
+        try:
+            server_time = parsedate_to_datetime(date_header).timestamp()
+        except (TypeError, ValueError):
+            return
+        self._bounds.append((server_time - received_at, server_time + DATE_RESOLUTION - sent_at))
+
+    def bounds(self) -> Optional[Tuple[float, float]]:
+        """Returns the (lowest, highest) offset consistent with the recent responses, None without any"""
+        if not self._bounds:
+            return None
+        lower = max(bound[0] for bound in self._bounds)
+        upper = min(bound[1] for bound in self._bounds)
+        if lower > upper:
+            # One of the clocks jumped, only the latest response still holds
+            latest = self._bounds[-1]
+            self._bounds.clear()
+            self._bounds.append(latest)
+            return latest
+        return lower, upper
+
+    @property
+    def offset(self) -> float:
+        bounds = self.bounds()
+        return (bounds[0] + bounds[1]) / 2 if bounds is not None else 0.0
+
+    def server_time(self) -> float:
+        """Returns the estimated server time, as a POSIX timestamp"""
+        return time.time() + self.offset
+
+    def monotonic_deadline(self, server_time: float) -> float:
+        """Returns the time.monotonic() value at which the server clock has surely reached server_time"""
+        bounds = self.bounds()
+        lowest_offset = bounds[0] if bounds is not None else 0.0
+        return time.monotonic() + server_time - lowest_offset - time.time()
+
+
+class CooldownTracker:
+    """Cooldown of one account, tracked locally from the timers the server sends back.
+
+    Fed by profile reads and placement results, so that waiting for the next pixel needs no extra request.
+    Each placement uses one slot of the pixel buffer, whose timer tells when it can be used again.
+    """
+
+    def __init__(self) -> None:
+        self.clock = ClockOffset()
+        self.pixel_buffer: Optional[int] = None
+        # Server timestamps at which the used slots free up, inf when the server did not say
+        self._timers: List[float] = []
+
+    def observe_profile(self, profile: UserProfile) -> None:
+        self.pixel_buffer = profile.pixel_buffer
+        self._timers = [parse_timer(timer) for timer in profile.timers]
+
+    def observe_placement(self, result: PlacementResult) -> None:
+        self.clock.observe(result.server_date, result.sent_at, result.received_at)
+        if result.timers:
+            self._timers = [parse_timer(timer) for timer in result.timers]
+            if result.status_code == HTTPStatus.TOO_EARLY.value:
+                # Too early means every slot is in use, the ones without a timer are assumed to free up first
+                server_time = self.clock.server_time()
+                if self.pixel_buffer is None:
+                    self.pixel_buffer = max(1, self._running(server_time))
+                missing = self.pixel_buffer - self._running(server_time)
+                if missing > 0:
+                    self._timers.extend([min(self._timers)] * missing)
+        elif result.success:
+            self._timers.append(math.inf)
+
+    def _running(self, server_time: float) -> int:
+        return sum(timer > server_time for timer in self._timers)
+
+    def _available(self, server_time: float) -> int:
+        return max(0, (self.pixel_buffer or 1) - self._running(server_time))
+
+    def available_pixels(self) -> int:
+        """Returns how many pixels can be placed back-to-back right now"""
+        return self._available(self.clock.server_time())
+
+    @property
+    def known(self) -> bool:
+        """Whether the end of the cooldown is known, False after placements the server gave no timers for"""
+        return math.inf not in self._timers
+
+    def ready_at(self) -> float:
+        """Returns the time.monotonic() value at which the next pixel can be placed, now when unknown"""
+        # One reading for both checks, a timer running out in between would leave nothing to wait for
+        server_time = self.clock.server_time()
+        if self._available(server_time) > 0:
+            return time.monotonic()
+        next_timer = min(timer for timer in self._timers if timer > server_time)
+        if math.isinf(next_timer):
+            return time.monotonic()
+        return self.clock.monotonic_deadline(next_timer)
@@ -6,5 +6,13 @@ class TokenError(FTPlaceError):
     """Raised when there's an issue with authentication tokens"""
 
 
+class AuthenticationError(FTPlaceError):
+    """Raised when the tokens cannot be refreshed anymore"""
+
+
 class RateLimitError(FTPlaceError):
     """Raised when hitting rate limits"""
+
+
+class BoardDecodeError(FTPlaceError):
+    """Raised when the board payload cannot be decoded"""
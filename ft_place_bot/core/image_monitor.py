@@ -1,203 +1,317 @@
 import logging
-import secrets
 import time
-from dataclasses import dataclass
-from datetime import datetime, timezone
-from typing import Any, Dict, List
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 from requests.exceptions import RequestException
 
 from ft_place_bot.config import HTTPStatus
+from ft_place_bot.core.board_diff import BoardDiff, BoardDiffTracker, diff_board
+from ft_place_bot.core.board_history import BoardHistory
 from ft_place_bot.core.color_config import ColorConfig
+from ft_place_bot.core.contested import DEFAULT_HEAT_WEIGHT, ContestedPixels
+from ft_place_bot.core.cooldown import CooldownTracker
 from ft_place_bot.core.exceptions import TokenError
+from ft_place_bot.core.metrics import DEFAULT_METRICS, BotMetrics
+from ft_place_bot.core.models import BoardRegion, BoardSnapshot, Pixel
+from ft_place_bot.core.multi_target import MonitoredTarget, TargetComposite
+from ft_place_bot.core.pixel_queue import PixelQueue, PixelToFix
+from ft_place_bot.core.profiling import DEFAULT_PROFILER
+from ft_place_bot.core.timing import LatencyStats, sleep_until
 
 
-@dataclass
-class PixelToFix:
-    x: int
-    y: int
-    current_color: int
-    target_color: int
-    priority: int
+MAX_BOARD_RETRIES = 3
+# Delay before trying again when the image is correct or a placement failed without a cooldown
+IDLE_DELAY = 5.0
+# Least delay before trying again after a too early response, even when its timers have already run out
+TOO_EARLY_DELAY = 1.0
+# Extra seconds, on top of the duration of the previous refresh, by which the board is refreshed before a cooldown ends
+PREFETCH_MARGIN = 0.2
+DEFAULT_BOARD_MAX_AGE = 2.0
+# Placements between two logs of the cooldown expiry to placement latency
+LATENCY_LOG_INTERVAL = 10
 
 
 class ImageMonitor:
-    def __init__(self, api: Any, config: Any, color_config: ColorConfig) -> None:
+    def __init__(
+        self,
+        api: Any,
+        config: Any,
+        color_config: ColorConfig,
+        board_max_age: float = DEFAULT_BOARD_MAX_AGE,
+        metrics: BotMetrics = DEFAULT_METRICS,
+    ) -> None:
         self.api = api
         self.config = config
         self.color_config = color_config
+        self.color_tables = color_config.compile()
+        self.targets: List[MonitoredTarget] = []
+        self.queue = PixelQueue()
+        self._composite: Optional[TargetComposite] = None
+        self._tracker: Optional[BoardDiffTracker] = None
+        self._diff: Optional[BoardDiff] = None
+        # Monotonic time at which the next pixel can be placed, and end of the cooldown being waited for if any
+        self.ready_at = 0.0
+        self._cooldown_end: Optional[float] = None
+        self._refresh_duration = 0.0
+        self.placement_latency = LatencyStats()
+        # Cooldown of the account, and board age (seconds) past which a burst stops to refetch it
+        self.cooldown = CooldownTracker()
+        self.board_max_age = board_max_age
+        self._board_time = 0.0
+        self.metrics = metrics
+        self.profiler = DEFAULT_PROFILER
+        # Records every changed board when set
+        self.history: Optional[BoardHistory] = None
+        # Overwrites by others, ranking contested pixels heat_weight priority levels lower per recent overwrite
+        self.contested = ContestedPixels()
+        self.heat_weight = DEFAULT_HEAT_WEIGHT
         self.logger = logging.getLogger(__name__)
 
-    def _convert_board_color(self, color_id: int) -> int:
-        """Converts a board color considering sets of similar colors"""
-        if self.color_config.should_ignore_board(color_id):
-            return -1
-        return self.color_config.get_main_color(color_id)
-
-    def _convert_target_color(self, color_id: int) -> int:
-        """Converts a target color considering sets of similar colors"""
-        if self.color_config.should_ignore_source(color_id):
-            return -1
-        return self.color_config.get_main_color(color_id)
+    def diff(
+        self, board: np.ndarray[Any, Any], target_colors: np.ndarray[Any, Any], origin_x: int, origin_y: int
+    ) -> BoardDiff:
+        """Compares the board to the target, giving both the stats and the pixels to fix"""
+        return diff_board(board, target_colors, origin_x, origin_y, self.color_tables)
 
     def get_image_stats(
         self, board: np.ndarray[Any, Any], target_colors: np.ndarray[Any, Any], origin_x: int, origin_y: int
     ) -> Dict[str, Any]:
-        image_width, image_height = target_colors.shape
-        correct_pixels = incorrect_pixels = total_countable_pixels = 0
-
-        for x in range(image_width):
-            for y in range(image_height):
-                target_color = self._convert_target_color(target_colors[x][y])
-                if target_color == -1:
-                    continue
-                board_x, board_y = origin_x + x, origin_y + y
-                if 0 <= board_x < board.shape[0] and 0 <= board_y < board.shape[1]:
-                    board_color = self._convert_board_color(board[board_x][board_y])
-                    if board_color == -1:
-                        continue
-
-                    total_countable_pixels += 1
-                    if board_color == target_color:
-                        correct_pixels += 1
-                    else:
-                        incorrect_pixels += 1
-
-        completion_percentage = (correct_pixels / total_countable_pixels * 100) if total_countable_pixels > 0 else 0
-
-        return {
-            "total_pixels": total_countable_pixels,
-            "correct_pixels": correct_pixels,
-            "incorrect_pixels": incorrect_pixels,
-            "completion_percentage": round(completion_percentage, 2),
-        }
+        return self.diff(board, target_colors, origin_x, origin_y).stats()
 
     def _get_pixels_to_fix(
         self, board: np.ndarray[Any, Any], target_colors: np.ndarray[Any, Any], origin_x: int, origin_y: int
     ) -> List[PixelToFix]:
-        image_width, image_height = target_colors.shape
-        pixels_to_fix = []
-
-        for x in range(image_width):
-            for y in range(image_height):
-                target_color = target_colors[x][y]
-                if self.color_config.should_ignore_source(target_color):
-                    continue
-                board_x, board_y = origin_x + x, origin_y + y
-                if not (0 <= board_x < board.shape[0] and 0 <= board_y < board.shape[1]):
-                    continue
-                board_color = board[board_x][board_y]
-                if self.color_config.should_ignore_board(board_color):
-                    continue
-
-                target_main_color = self.color_config.get_main_color(target_color)
-                board_main_color = self.color_config.get_main_color(board_color)
-
-                if board_main_color != target_main_color:
-                    priority = self.color_config.get_priority_level(target_color) or 999
-                    pixels_to_fix.append(
-                        PixelToFix(
-                            x=board_x,
-                            y=board_y,
-                            current_color=board_color,
-                            target_color=target_color,
-                            priority=priority,
-                        )
-                    )
-        # Sort by priority
-        pixels_to_fix.sort(key=lambda pixel: (pixel.priority, secrets.randbelow(1000000)))
-        return pixels_to_fix
+        queue = PixelQueue()
+        queue.update(self.diff(board, target_colors, origin_x, origin_y))
+        return queue.top(len(queue))
 
-    def _handle_pixel_placement(self, pixel: PixelToFix) -> bool:
-        try:
-            response = self.api.session.post(
-                f"{self.api.config.base_url}/api/set",
-                json={"x": int(pixel.x), "y": int(pixel.y), "color": int(pixel.target_color)},
-            )
-            # Handle different response cases
-            if response.status_code == HTTPStatus.TOO_EARLY.value:  # Too early
-                wait_time: float = 0.0
-                user = self.api.get_profile()
-                if not user:
-                    error_data = response.json()
-                    if "timers" in error_data:
-                        next_time = datetime.fromisoformat(error_data["timers"][0].replace("Z", "+00:00"))
-                        wait_time = (next_time - datetime.now(timezone.utc)).total_seconds()
-                else:
-                    next_time = min([datetime.fromisoformat(timer.replace("Z", "+00:00")) for timer in user.timers])
-                    wait_time = (next_time - datetime.now(timezone.utc)).total_seconds()
-
-                if wait_time > 0:
-                    next_time_str = next_time.astimezone().strftime("%H:%M:%S")
-                    self.logger.info("Next pixel available in %.1f seconds | %s", wait_time, next_time_str)
-                    time.sleep(wait_time + 1)
-                else:
-                    time.sleep(5)
-                return False
+    def _wait_after_error(self) -> None:
+        self.ready_at = time.monotonic() + IDLE_DELAY
 
-            try:
-                response, needs_retry = self.api.handle_response(response)
-                # If needs_retry is True, try the request again
-                if needs_retry:
-                    response = self.api.session.post(
-                        f"{self.api.config.base_url}/api/set",
-                        json={"x": int(pixel.x), "y": int(pixel.y), "color": int(pixel.target_color)},
-                    )
-                    response, _ = self.api.handle_response(response)  # Handle response again if needed
-
-                if HTTPStatus.is_success(response.status_code):  # Success
-                    self.logger.info("Pixel successfully placed at (%d, %d)", pixel.x, pixel.y)
-                    return True
-                self.logger.error("Unexpected error: %d - %s", response.status_code, response.text)
-                time.sleep(5)
-                return False
-
-            except TokenError as e:
-                self.logger.error("Token error: %s", str(e))
-                time.sleep(5)
-                return False
+    def _schedule_cooldown(self, *, read_profile: bool, min_delay: float = 0.0) -> None:
+        """Sets ready_at to the end of the cooldown, min_delay seconds away at least, reading the profile if asked"""
+        self.ready_at = self.cooldown.ready_at()
+        if read_profile and self.ready_at <= time.monotonic():
+            user = self.api.get_profile()
+            if user:
+                self.cooldown.observe_profile(user)
+                self.ready_at = self.cooldown.ready_at()
+            if self.ready_at <= time.monotonic():
+                self._wait_after_error()
+                return
+        self.ready_at = max(self.ready_at, time.monotonic() + min_delay)
 
+        wait_time = self.ready_at - time.monotonic()
+        if wait_time > 0:
+            next_time = datetime.now(timezone.utc) + timedelta(seconds=wait_time)
+            next_time_str = next_time.astimezone().strftime("%H:%M:%S")
+            self.logger.info("Next pixel available in %.1f seconds | %s", wait_time, next_time_str)
+            self.metrics.cooldown_wait_seconds.observe(wait_time)
+            self._cooldown_end = self.ready_at
+
+    def _handle_pixel_placement(self, pixel: PixelToFix) -> bool:
+        """Places a pixel, then sets ready_at to the monotonic time at which the next one can be placed"""
+        try:
+            result = self.api.set_pixel(Pixel(x=pixel.x, y=pixel.y, color=pixel.target_color))
+        except TokenError as e:
+            self.logger.error("Token error: %s", str(e))
+            self._wait_after_error()
+            return False
         except (OSError, RequestException, ValueError) as e:
             self.logger.error("Error placing pixel: %s", str(e))
             return False
 
+        self.cooldown.observe_placement(result)
+        if result.success:
+            self.logger.info("Pixel successfully placed at (%d, %d)", pixel.x, pixel.y)
+            return True
+        if result.status_code == HTTPStatus.TOO_EARLY.value:
+            # Only a 425 without timers needs the profile to know how long to wait
+            self._schedule_cooldown(read_profile=not result.timers, min_delay=TOO_EARLY_DELAY)
+            return False
+        self.logger.error("Unexpected error: %d", result.status_code)
+        self._wait_after_error()
+        return False
+
+    def add_target(
+        self,
+        target_colors: np.ndarray[Any, Any],
+        origin_x: int,
+        origin_y: int,
+        color_config: Optional[ColorConfig] = None,
+        weight: float = 1.0,
+    ) -> MonitoredTarget:
+        """Registers a target to maintain, using the monitor color configuration by default"""
+        target = MonitoredTarget(
+            target_colors=target_colors,
+            origin_x=origin_x,
+            origin_y=origin_y,
+            color_config=color_config if color_config is not None else self.color_config,
+            weight=weight,
+        )
+        self.targets.append(target)
+        return target
+
     def monitor_and_maintain(self, target_colors: np.ndarray[Any, Any], origin_x: int, origin_y: int) -> None:
-        max_board_retries = 3
+        self.add_target(target_colors, origin_x, origin_y)
+        self.maintain()
+
+    def start(self) -> Tuple[TargetComposite, BoardDiffTracker]:
+        """Merges the registered targets, the diff then starts over from the next board fetched"""
+        self._composite = TargetComposite(self.targets)
+        self._tracker = self._composite.tracker()
+        self._diff = None
+        self.queue.clear()
+        return self._composite, self._tracker
+
+    def _started(self) -> Tuple[TargetComposite, BoardDiffTracker]:
+        if self._composite is None or self._tracker is None:
+            return self.start()
+        return self._composite, self._tracker
+
+    @property
+    def region(self) -> BoardRegion:
+        """Part of the board covering every registered target"""
+        composite, _ = self._started()
+        return composite.region
+
+    def tile_stats(self) -> List[Dict[str, Any]]:
+        """Returns the completion stats of the damaged tiles of the last board, most damaged first"""
+        _, tracker = self._started()
+        return tracker.tile_stats()
+
+    def refresh(self) -> PixelQueue:
+        """Fetches the board and returns the queue of pixels to fix"""
+        region = self.region
+        for _ in range(MAX_BOARD_RETRIES + 1):
+            snapshot = self.api.get_board_snapshot(region)
+            if snapshot is not None:
+                break
+        else:
+            raise ValueError("Unable to get the board")
+        return self.apply_snapshot(snapshot)
+
+    def apply_snapshot(self, snapshot: BoardSnapshot) -> PixelQueue:
+        """Updates the diff with a board fetched over self.region and returns the queue of pixels to fix"""
+        composite, tracker = self._started()
+        now = time.time()
+        self._board_time = snapshot.received_at
+        if self._diff is not None and not snapshot.changed:
+            # Same board as the previous cycle, the previous diff still holds
+            self.metrics.unchanged_boards.inc()
+            self._record_survival(self.contested.check_survival(now))
+            return self.queue
+        if self.history is not None:
+            self.history.append(snapshot.board, composite.region, now)
+        self._record_survival(self.contested.update(snapshot.board, composite.region, now))
+
+        with self.profiler.span("diff"), self.metrics.diff_seconds.time():
+            self._diff = composite.with_weights(tracker.update(snapshot.board, composite.region))
+        # Get and display stats
+        with self.profiler.span("stats"):
+            stats = self._diff.stats()
+        self.metrics.completion.set(stats["completion_percentage"])
+        self.logger.info(
+            "Image stats: %d/%d correct pixels (%.2f%% completed), %d pixels to fix in %d/%d tiles",
+            stats["correct_pixels"],
+            stats["total_pixels"],
+            stats["completion_percentage"],
+            stats["incorrect_pixels"],
+            int(np.count_nonzero(tracker.tile_incorrect)),
+            tracker.tile_incorrect.size,
+        )
+        # Get pixels to fix
+        with self.profiler.span("select"):
+            penalty = (
+                self.heat_weight * self.contested.heat_at(self._diff.x, self._diff.y) if self.heat_weight else None
+            )
+            self.queue.update(self._diff, penalty, tracker.changed_tiles)
+        self.metrics.queue_depth.set(len(self.queue))
+        return self.queue
+
+    def _record_survival(self, checked: Tuple[int, int]) -> None:
+        count, survived = checked
+        if not count:
+            return
+        contested = self.contested
+        self.metrics.placement_survival.inc(survived, outcome="survived")
+        self.metrics.placement_survival.inc(count - survived, outcome="overwritten")
+        ratio = contested.survival_ratio or 0.0
+        self.metrics.survival_ratio.set(ratio)
+        self.logger.info(
+            "Placements still correct after %.0f minutes: %d/%d (%.1f%%)",
+            contested.survival_window / 60,
+            contested.survived,
+            contested.evaluated,
+            ratio * 100,
+        )
+
+    def mark_placed(self, pixel: PixelToFix) -> None:
+        """Removes a placed pixel from the queue, and remembers it to tell our changes from the overwrites of others"""
+        self.queue.discard(pixel.x, pixel.y)
+        self.metrics.queue_depth.set(len(self.queue))
+        self.contested.mark_placed(pixel.x, pixel.y, pixel.target_color, time.time())
+
+    def _record_placement_latency(self) -> None:
+        if self._cooldown_end is None:
+            return
+        self.placement_latency.record(time.monotonic() - self._cooldown_end)
+        self._cooldown_end = None
+        if self.placement_latency.count % LATENCY_LOG_INTERVAL == 0:
+            latency = self.placement_latency.percentiles()
+            self.logger.info(
+                "Cooldown expiry to placement: p50 %.1f ms, p99 %.1f ms", latency["p50_ms"], latency["p99_ms"]
+            )
+
+    def _place_burst(self, queue: PixelQueue) -> None:
+        """Places the highest priority pixels back-to-back, as many as the pixel buffer allows"""
+        with self.profiler.span("select"):
+            pixels = queue.top(max(1, self.cooldown.available_pixels()))
+        for index, pixel in enumerate(pixels):
+            if index and time.monotonic() - self._board_time > self.board_max_age:
+                return  # Pixels may have been changed by others since, fetch the board again
+            if not self._handle_pixel_placement(pixel):
+                return
+            self.mark_placed(pixel)
+            self._record_placement_latency()
+        if self.cooldown.available_pixels() == 0 and self.cooldown.known:
+            # Buffer drained, no need to fetch the board to be told to wait
+            self._schedule_cooldown(read_profile=False)
+
+    def _cycle(self) -> None:
+        # Refresh early by the time the previous refresh took, plus some margin
+        with self.profiler.span("wait"):
+            sleep_until(self.ready_at - self._refresh_duration - PREFETCH_MARGIN)
+        refresh_start = time.monotonic()
+        queue = self.refresh()
+        self._refresh_duration = time.monotonic() - refresh_start
+        if not queue:
+            self.logger.info("Image correct, checking again in 5 seconds...")
+            self.ready_at = time.monotonic() + IDLE_DELAY
+            self._cooldown_end = None
+            return
+        with self.profiler.span("wait"):
+            sleep_until(self.ready_at)
+        # Process the highest priority pixels
+        self._place_burst(queue)
+
+    def maintain(self) -> None:
+        """Maintains every registered target, fetching and diffing the board once per cycle for all of them.
+
+        While waiting for the cooldown, the board is fetched and diffed shortly before it ends so that the next
+        pixel is already chosen when the cooldown expires, and is posted right at that moment. When the account has
+        several pixels banked, they are all placed from that same board.
+        """
+        self.start()
+        profile = self.api.get_profile()
+        if profile:
+            self.cooldown.observe_profile(profile)
         while True:
             try:
-                board_data = self.api.get_board()
-                if not board_data:
-                    if max_board_retries > 0:
-                        max_board_retries -= 1
-                        continue
-                    raise ValueError("Unable to get the board")
-                if "board" not in board_data:
-                    if max_board_retries > 0:
-                        max_board_retries -= 1
-                        continue
-                    raise ValueError("Invalid board data")
-                max_board_retries = 3
-
-                board = np.array([[cell["color_id"] for cell in row] for row in board_data["board"]])
-                # Get and display stats
-                stats = self.get_image_stats(board, target_colors, origin_x, origin_y)
-                self.logger.info(
-                    "Image stats: %d/%d correct pixels (%.2f%% completed), %d pixels to fix",
-                    stats["correct_pixels"],
-                    stats["total_pixels"],
-                    stats["completion_percentage"],
-                    stats["incorrect_pixels"],
-                )
-                # Get pixels to fix
-                pixels_to_fix = self._get_pixels_to_fix(board, target_colors, origin_x, origin_y)
-                if not pixels_to_fix:
-                    self.logger.info("Image correct, checking again in 5 seconds...")
-                    time.sleep(5)
-                    continue
-                # Process the highest priority pixel
-                self._handle_pixel_placement(pixels_to_fix[0])
-
+                with self.profiler.cycle():
+                    self._cycle()
             except (OSError, RequestException, ValueError) as e:
                 self.logger.error("Error in main loop: %s", str(e))
                 time.sleep(self.config.check_interval)
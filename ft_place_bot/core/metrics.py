@@ -0,0 +1,205 @@
+import logging
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ft_place_bot.config import HTTPStatus
+
+
+# Upper bounds (seconds) of the histogram buckets, from a fast decode to a slow fetch
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds (seconds) of the cooldown wait buckets
+WAIT_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class Metric(ABC):
+    """Named metric with optional labels, rendered in the Prometheus text format"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Returns the sample lines of the metric, one per label set"""
+
+    def render(self) -> str:
+        header = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(header + self.samples())
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """Histogram of unlabelled observations, with cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0.0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[index] += 1
+                    break
+            self._sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observes the duration of the with block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{_format_value(bound)}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_format_value(total)}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+
+class BotMetrics:
+    """Metrics of the API clients and the monitor, shared by default so that one endpoint exposes all of them"""
+
+    def __init__(self) -> None:
+        self.board_fetch_seconds = Histogram("ftplace_board_fetch_seconds", "Time spent fetching the board")
+        self.board_decode_seconds = Histogram("ftplace_board_decode_seconds", "Time spent decoding changed boards")
+        self.diff_seconds = Histogram("ftplace_diff_seconds", "Time spent diffing the board against the targets")
+        self.unchanged_boards = Counter(
+            "ftplace_unchanged_boards_total", "Boards fetched unchanged, neither decoded nor diffed"
+        )
+        self.cooldown_wait_seconds = Histogram(
+            "ftplace_cooldown_wait_seconds", "Cooldown waits scheduled after placements", WAIT_BUCKETS
+        )
+        self.placements = Counter("ftplace_placements_total", "Placement responses by outcome", ["outcome"])
+        self.token_refreshes = Counter("ftplace_token_refreshes_total", "Tokens refreshed after a token expired")
+        self.retries = Counter("ftplace_retries_total", "Requests retried after a server or connection error")
+        self.completion = Gauge("ftplace_completion_percentage", "Correct pixels of the targets, in percent")
+        self.queue_depth = Gauge("ftplace_queue_depth", "Pixels waiting to be fixed")
+        self.placement_survival = Counter(
+            "ftplace_placement_survival_total", "Placements checked some minutes later, by outcome", ["outcome"]
+        )
+        self.survival_ratio = Gauge("ftplace_placement_survival_ratio", "Share of the checked placements still correct")
+
+    @property
+    def metrics(self) -> List[Metric]:
+        return [value for value in vars(self).values() if isinstance(value, Metric)]
+
+    def record_placement(self, status_code: Optional[int]) -> None:
+        """Counts a placement response by outcome, None standing for a request that got no response"""
+        if status_code is not None and HTTPStatus.is_success(status_code):
+            outcome = "success"
+        elif status_code == HTTPStatus.TOO_EARLY.value:
+            outcome = "too_early"
+        elif status_code == HTTPStatus.TOKEN_EXPIRED.value:
+            outcome = "token_expired"
+        else:
+            outcome = "error"
+        self.placements.inc(outcome=outcome)
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format"""
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+DEFAULT_METRICS = BotMetrics()
+
+
+def serve_metrics(metrics: BotMetrics, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serves the metrics on http://host:port/metrics from a background thread, returns the server to shut it down"""
+    logger = logging.getLogger(__name__)
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802
+            if self.path.split("?")[0] not in {"/", "/metrics"}:
+                self.send_error(404)
+                return
+            content = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+            logger.debug(format, *args)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info("Metrics served on http://%s:%d/metrics", host, server.server_address[1])
+    return server
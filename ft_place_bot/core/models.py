@@ -1,5 +1,17 @@
-from dataclasses import dataclass
-from typing import Any, List
+import time
+from dataclasses import dataclass, field
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+
+def extract_timers(data: Any) -> List[str]:
+    """Returns the cooldown timers (ISO 8601) found in an API response payload"""
+    if not isinstance(data, dict):
+        return []
+    user_infos = data.get("userInfos")
+    timers = data.get("timers", user_infos.get("timers", []) if isinstance(user_infos, dict) else [])
+    return [timer for timer in timers if isinstance(timer, str)] if isinstance(timers, list) else []
 
 
 @dataclass
@@ -38,3 +50,66 @@ class UserProfile:
             iat=user_infos.get("iat", 0),
             exp=user_infos.get("exp", 0),
         )
+
+
+@dataclass(frozen=True)
+class BoardRegion:
+    """Rectangular area of the board, starting at (x, y)"""
+
+    x: int
+    y: int
+    width: int
+    height: int
+
+    def __post_init__(self) -> None:
+        if self.x < 0 or self.y < 0 or self.width < 0 or self.height < 0:
+            raise ValueError(f"Invalid board region: {self}")
+
+    @classmethod
+    def for_target(cls, target_shape: Tuple[int, ...], origin_x: int, origin_y: int) -> "BoardRegion":
+        """Returns the part of the board covered by a target placed at (origin_x, origin_y)"""
+        x, y = max(0, origin_x), max(0, origin_y)
+        return cls(
+            x=x,
+            y=y,
+            width=max(0, origin_x + target_shape[0] - x),
+            height=max(0, origin_y + target_shape[1] - y),
+        )
+
+    @classmethod
+    def union(cls, regions: List["BoardRegion"]) -> "BoardRegion":
+        """Returns the bounding box of several regions"""
+        if not regions:
+            raise ValueError("Cannot build the union of no regions")
+        x = min(region.x for region in regions)
+        y = min(region.y for region in regions)
+        return cls(
+            x=x,
+            y=y,
+            width=max(region.x + region.width for region in regions) - x,
+            height=max(region.y + region.height for region in regions) - y,
+        )
+
+
+@dataclass
+class BoardSnapshot:
+    """Board fetched from the API, with whether it differs from the previous fetch"""
+
+    board: np.ndarray[Any, np.dtype[np.uint8]]
+    changed: bool
+    # time.monotonic() at which the response holding the board arrived
+    received_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class PlacementResult:
+    """Outcome of a pixel placement"""
+
+    status_code: int
+    success: bool
+    # Cooldown timers sent back by the server (ISO 8601), when it gave any
+    timers: List[str]
+    # Date header of the response, with the local time.time() at which the request was sent and answered
+    server_date: Optional[str] = None
+    sent_at: float = 0.0
+    received_at: float = 0.0
@@ -0,0 +1,72 @@
+from dataclasses import dataclass, replace
+from typing import Any, List
+
+import numpy as np
+
+from ft_place_bot.core.board_diff import BoardDiff, BoardDiffTracker, overlap_slices
+from ft_place_bot.core.color_config import LOOKUP_SIZE, ColorConfig, ColorTables
+from ft_place_bot.core.models import BoardRegion
+
+
+@dataclass
+class MonitoredTarget:
+    """Target image maintained at an origin, with its own color configuration"""
+
+    target_colors: np.ndarray[Any, Any]
+    origin_x: int
+    origin_y: int
+    color_config: ColorConfig
+    weight: float = 1.0
+
+    @property
+    def region(self) -> BoardRegion:
+        return BoardRegion.for_target(self.target_colors.shape, self.origin_x, self.origin_y)
+
+
+class TargetComposite:
+    """Several targets merged into one raster over the bounding box of their regions.
+
+    Each pixel belongs to at most one target: where targets overlap, the highest weight wins and equal weights go
+    to the target registered first. Pixels a target ignores are left to the targets below it. Every pixel is
+    checked with the color tables of its owner, so all targets are diffed in a single pass.
+    """
+
+    def __init__(self, targets: List[MonitoredTarget]) -> None:
+        if not targets:
+            raise ValueError("No target to maintain")
+        self.targets = targets
+        self.region = BoardRegion.union([target.region for target in targets])
+        self.weights = np.array([target.weight for target in targets], dtype=np.float64)
+        tables = [target.color_config.compile() for target in targets]
+        self.tables = ColorTables.concatenate(tables)
+
+        shape = (self.region.width, self.region.height)
+        self.owner = np.full(shape, len(targets), dtype=np.int32)
+        colors = np.zeros(shape, dtype=np.int32)
+        # Paint from the lowest to the highest precedence so that the winner is painted last
+        for index in sorted(range(len(targets)), key=lambda i: (targets[i].weight, -i)):
+            target = targets[index]
+            target_x, target_y, region_x, region_y = overlap_slices(
+                target.target_colors.shape, shape, target.origin_x - self.region.x, target.origin_y - self.region.y
+            )
+            piece = target.target_colors[target_x, target_y]
+            painted = ~tables[index].ignore_source[piece]
+            self.owner[region_x, region_y][painted] = index
+            colors[region_x, region_y][painted] = piece[painted]
+        self.table_offsets = self.owner * LOOKUP_SIZE
+        self.target_keys = self.table_offsets + colors
+
+    def tracker(self) -> BoardDiffTracker:
+        """Returns a tracker diffing all the targets at once"""
+        return BoardDiffTracker(
+            self.target_keys, self.region.x, self.region.y, self.tables, table_offsets=self.table_offsets
+        )
+
+    def owners(self, diff: BoardDiff) -> np.ndarray[Any, Any]:
+        """Returns the index of the target each pixel of the diff belongs to"""
+        owners: np.ndarray[Any, Any] = self.owner[diff.x - self.region.x, diff.y - self.region.y]
+        return owners
+
+    def with_weights(self, diff: BoardDiff) -> BoardDiff:
+        """Returns the diff with the weight of the owning target of each pixel"""
+        return replace(diff, weight=self.weights[self.owners(diff)])
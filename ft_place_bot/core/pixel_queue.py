@@ -0,0 +1,167 @@
+from dataclasses import dataclass
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from numpy.typing import NDArray
+
+from ft_place_bot.core.board_diff import BoardDiff
+
+
+# Pixels sorted ahead of time by top(), so that successive small requests reuse the same selection
+DEFAULT_PREFETCH = 64
+# Sort key of the pixels removed from the queue, after every other
+_REMOVED = np.uint64(np.iinfo(np.uint64).max)
+# Steps per priority level of the score in the sort key, so that a penalty can rank pixels between two levels
+SCORE_STEPS = 16
+SCORE_BITS = 20
+WEIGHT_RANK_BITS = 12
+
+
+@dataclass
+class PixelToFix:
+    x: int
+    y: int
+    current_color: int
+    target_color: int
+    priority: int
+
+
+class PixelQueue:
+    """Pixels to fix kept as arrays, handing out the highest priority ones without sorting all of them.
+
+    Pixels are ordered by score, then by weight of the target they belong to, then at random. The score is the
+    priority, plus an optional penalty in priority levels (such as how contested the pixel is). The order is a
+    single 64 bit key per pixel (score, weight rank, random draw from a seedable generator), so the best k
+    pixels come from a partition in linear time and only those are sorted and turned into PixelToFix.
+    Given the tiles that changed, an update keeps the draws of the pixels in the other tiles, and their whole key
+    when no penalty moves the scores, so that a refresh neither reshuffles ties nor recomputes unchanged pixels.
+    """
+
+    def __init__(self, seed: Optional[int] = None, prefetch: int = DEFAULT_PREFETCH) -> None:
+        self.rng = np.random.default_rng(seed)
+        self.prefetch = prefetch
+        self.x: NDArray[np.intp] = np.empty(0, dtype=np.intp)
+        self.y: NDArray[np.intp] = np.empty(0, dtype=np.intp)
+        self.current_color: NDArray[Any] = np.empty(0, dtype=np.int16)
+        self.target_color: NDArray[Any] = np.empty(0, dtype=np.int16)
+        self.priority: NDArray[Any] = np.empty(0, dtype=np.int16)
+        self.keys: NDArray[np.uint64] = np.empty(0, dtype=np.uint64)
+        self._size = 0
+        # Random draw and tracker tile of each pixel, and the distinct weights the ranks were computed from
+        self._tiebreak: NDArray[np.uint64] = np.empty(0, dtype=np.uint64)
+        self._tile: Optional[NDArray[np.intp]] = None
+        self._weight_levels: NDArray[np.float64] = np.empty(0, dtype=np.float64)
+        # Indices of the best pixels, in order, computed by the last top() call
+        self._prefix: NDArray[np.intp] = np.empty(0, dtype=np.intp)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self) -> None:
+        self.keys = np.empty(0, dtype=np.uint64)
+        self._size = 0
+        self._prefix = np.empty(0, dtype=np.intp)
+        self._tiebreak = np.empty(0, dtype=np.uint64)
+        self._tile = None
+
+    def _kept(
+        self, diff: BoardDiff, changed_tiles: Optional[NDArray[np.bool_]]
+    ) -> Optional[Tuple[NDArray[np.bool_], NDArray[np.bool_]]]:
+        """Returns the masks of the previous and new pixels in unchanged tiles, None when nothing can be kept.
+
+        Both diffs list the pixels tile by tile in the same order, and an unchanged tile has the same pixels in
+        both, so the two masks select the same pixels in the same order.
+        """
+        if changed_tiles is None or diff.tile is None or self._tile is None:
+            return None
+        changed = changed_tiles.reshape(-1)
+        if int(max(self._tile.max(initial=-1), diff.tile.max(initial=-1))) >= changed.size:
+            return None
+        kept_before, kept_now = ~changed[self._tile], ~changed[diff.tile]
+        if np.count_nonzero(kept_before) != np.count_nonzero(kept_now):
+            return None
+        return kept_before, kept_now
+
+    def update(
+        self, diff: BoardDiff, penalty: Optional[NDArray[Any]] = None, changed_tiles: Optional[NDArray[Any]] = None
+    ) -> None:
+        """Replaces the queue content with the pixels of a diff, each one ranked after its penalty if any is given.
+
+        changed_tiles flags the tracker tiles that changed since the diff of the previous update, None when all did.
+        """
+        size = int(diff.x.shape[0])
+        kept = self._kept(diff, changed_tiles)
+        tiebreak = np.empty(size, dtype=np.uint64)
+        keys = np.empty(size, dtype=np.uint64)
+        stale = np.ones(size, dtype=np.bool_)
+        if diff.weight is not None and diff.weight.size:
+            weight_levels = np.unique(-diff.weight)
+        else:
+            weight_levels = np.empty(0, dtype=np.float64)
+        if kept is not None:
+            kept_before, kept_now = kept
+            tiebreak[kept_now] = self._tiebreak[kept_before]
+            if penalty is None and np.array_equal(weight_levels, self._weight_levels):
+                keys[kept_now] = self.keys[kept_before]
+                # Pixels placed meanwhile are still to fix on this board, they come back
+                stale[kept_now] = keys[kept_now] == _REMOVED
+            drawn = ~kept_now
+            tiebreak[drawn] = self.rng.integers(0, 1 << 32, size=int(np.count_nonzero(drawn)), dtype=np.uint64)
+        else:
+            tiebreak[:] = self.rng.integers(0, 1 << 32, size=size, dtype=np.uint64)
+
+        score = diff.priority[stale].astype(np.float64)
+        if penalty is not None:
+            score = score + penalty[stale]
+        score = np.clip(np.rint(score * SCORE_STEPS) + (1 << (SCORE_BITS - 1)), 0, (1 << SCORE_BITS) - 1)
+        if diff.weight is not None and diff.weight.size:
+            # Heaviest target first: rank 0 goes to the largest weight
+            weight_rank = np.searchsorted(weight_levels, -diff.weight[stale])
+            weight_rank = np.minimum(weight_rank, (1 << WEIGHT_RANK_BITS) - 1).astype(np.uint64)
+        else:
+            weight_rank = np.zeros(int(np.count_nonzero(stale)), dtype=np.uint64)
+        keys[stale] = (
+            (score.astype(np.uint64) << np.uint64(32 + WEIGHT_RANK_BITS))
+            | (weight_rank << np.uint64(32))
+            | tiebreak[stale]
+        )
+
+        self.x, self.y = diff.x, diff.y
+        self.current_color, self.target_color, self.priority = diff.current_color, diff.target_color, diff.priority
+        self.keys, self._tiebreak, self._tile, self._weight_levels = keys, tiebreak, diff.tile, weight_levels
+        self._size = size
+        self._prefix = np.empty(0, dtype=np.intp)
+
+    def discard(self, x: int, y: int) -> None:
+        """Removes the pixel at (x, y), once placed"""
+        indices = np.flatnonzero((self.x == x) & (self.y == y) & (self.keys != _REMOVED))
+        self.keys[indices] = _REMOVED
+        self._size -= int(indices.size)
+        self._prefix = self._prefix[self.keys[self._prefix] != _REMOVED]
+
+    def _select(self, count: int) -> NDArray[np.intp]:
+        if count < self.keys.size:
+            indices = np.argpartition(self.keys, count - 1)[:count]
+        else:
+            indices = np.arange(self.keys.size)
+        ordered = indices[np.argsort(self.keys[indices], kind="stable")]
+        kept: NDArray[np.intp] = ordered[self.keys[ordered] != _REMOVED]
+        return kept
+
+    def top(self, count: int) -> List[PixelToFix]:
+        """Returns the count highest priority pixels, best first"""
+        count = min(count, self._size)
+        if count <= 0:
+            return []
+        if self._prefix.size < count:
+            self._prefix = self._select(max(count, self.prefetch))
+        return [
+            PixelToFix(x=x, y=y, current_color=current_color, target_color=target_color, priority=priority)
+            for x, y, current_color, target_color, priority in zip(
+                self.x[self._prefix[:count]].tolist(),
+                self.y[self._prefix[:count]].tolist(),
+                self.current_color[self._prefix[:count]].tolist(),
+                self.target_color[self._prefix[:count]].tolist(),
+                self.priority[self._prefix[:count]].tolist(),
+            )
+        ]
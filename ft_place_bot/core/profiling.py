@@ -0,0 +1,163 @@
+import cProfile
+import json
+import logging
+import signal
+import time
+import tracemalloc
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+DEFAULT_PROFILE_DIR = Path.home() / ".ft_place_bot_profiles"
+# Creating this file starts a capture, it may hold the number of cycles to capture
+DEFAULT_CONTROL_FILE = Path.home() / ".ft_place_bot_profile"
+DEFAULT_CAPTURE_CYCLES = 10
+# Seconds between two checks of the control file
+CONTROL_POLL_INTERVAL = 1.0
+# Lines of the tracemalloc summary written next to the snapshot
+TRACEMALLOC_TOP_LINES = 50
+
+# Span handed out while no capture runs, entering it costs next to nothing
+_DISABLED_SPAN: AbstractContextManager[None] = nullcontext()
+
+
+class Profiler:
+    """Named timing spans and on-demand cProfile/tracemalloc captures of the monitor cycles.
+
+    Nothing is recorded until a capture is requested, by request(), by the signal set up with install_signal() or
+    by creating the control file. The next cycles are then profiled, their spans written as one JSON line per
+    cycle, and the cProfile stats and a tracemalloc snapshot are dumped to the output directory once they are over.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path = DEFAULT_PROFILE_DIR,
+        control_file: Optional[Path] = DEFAULT_CONTROL_FILE,
+        default_cycles: int = DEFAULT_CAPTURE_CYCLES,
+    ) -> None:
+        self.output_dir = output_dir
+        self.control_file = control_file
+        self.default_cycles = default_cycles
+        self.logger = logging.getLogger(__name__)
+        self._requested = 0
+        self._remaining = 0
+        self._next_poll = 0.0
+        self._spans: List[Dict[str, Any]] = []
+        self._cycle = 0
+        self._cycle_start = 0.0
+        self._capture_path: Optional[Path] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._started_tracemalloc = False
+
+    @property
+    def enabled(self) -> bool:
+        return self._remaining > 0
+
+    def request(self, cycles: Optional[int] = None) -> None:
+        """Captures the next cycles, only setting a flag so that it is safe from a signal handler"""
+        self._requested = cycles if cycles and cycles > 0 else self.default_cycles
+
+    def install_signal(self, signum: Optional[int] = None) -> bool:
+        """Requests a capture on the given signal, SIGUSR1 by default. Returns False where it does not exist"""
+        if signum is None:
+            signum = getattr(signal, "SIGUSR1", None)
+            if signum is None:
+                return False
+        signal.signal(signum, lambda *_: self.request())
+        return True
+
+    def span(self, name: str) -> AbstractContextManager[None]:
+        """Times the with block under the given name while a capture runs"""
+        if not self._remaining:
+            return _DISABLED_SPAN
+        return self._timed_span(name)
+
+    @contextmanager
+    def _timed_span(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._spans.append(
+                {
+                    "name": name,
+                    "start_ms": (start - self._cycle_start) * 1000,
+                    "duration_ms": (end - start) * 1000,
+                }
+            )
+
+    @contextmanager
+    def cycle(self) -> Iterator[None]:
+        """Delimits one monitor cycle, starting a requested capture and ending it after its last cycle"""
+        self._poll_control_file()
+        if self._requested and not self._remaining:
+            self._start_capture()
+        if not self._remaining:
+            yield
+            return
+        self._cycle_start = time.perf_counter()
+        started_at = time.time()
+        try:
+            yield
+        finally:
+            self._end_cycle(started_at)
+
+    def _poll_control_file(self) -> None:
+        if self.control_file is None or time.monotonic() < self._next_poll:
+            return
+        self._next_poll = time.monotonic() + CONTROL_POLL_INTERVAL
+        try:
+            content = self.control_file.read_text().strip()
+            self.control_file.unlink()
+        except OSError:
+            return
+        self.request(int(content) if content.isdigit() else None)
+
+    def _start_capture(self) -> None:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._capture_path = self.output_dir / time.strftime("%Y%m%d-%H%M%S")
+        self._remaining, self._requested = self._requested, 0
+        self._cycle = 0
+        self._spans = []
+        self._started_tracemalloc = not tracemalloc.is_tracing()
+        if self._started_tracemalloc:
+            tracemalloc.start()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        self.logger.info("Profiling the next %d cycles to %s.*", self._remaining, self._capture_path)
+
+    def _end_cycle(self, started_at: float) -> None:
+        if self._capture_path is None:
+            return
+        record = {
+            "cycle": self._cycle,
+            "started_at": started_at,
+            "duration_ms": (time.perf_counter() - self._cycle_start) * 1000,
+            "spans": self._spans,
+        }
+        with self._capture_path.with_suffix(".spans.jsonl").open("a") as f:
+            f.write(json.dumps(record) + "\n")
+        self._spans = []
+        self._cycle += 1
+        self._remaining -= 1
+        if not self._remaining:
+            self._finish_capture()
+
+    def _finish_capture(self) -> None:
+        if self._profile is None or self._capture_path is None:
+            return
+        self._profile.disable()
+        self._profile.dump_stats(self._capture_path.with_suffix(".prof"))
+        snapshot = tracemalloc.take_snapshot()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        snapshot.dump(str(self._capture_path.with_suffix(".tracemalloc")))
+        top = snapshot.statistics("lineno")[:TRACEMALLOC_TOP_LINES]
+        self._capture_path.with_suffix(".tracemalloc.txt").write_text("\n".join(str(stat) for stat in top) + "\n")
+        self.logger.info("Profile written to %s.*", self._capture_path)
+        self._profile = None
+
+
+DEFAULT_PROFILER = Profiler()
@@ -0,0 +1,35 @@
+import time
+from collections import deque
+from typing import Deque, Dict
+
+import numpy as np
+
+
+# Samples kept by LatencyStats, older ones are dropped
+DEFAULT_LATENCY_SAMPLES = 1000
+
+
+def sleep_until(deadline: float) -> None:
+    """Sleeps until the given time.monotonic() value, returns at once when it is already past"""
+    delay = deadline - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+
+
+class LatencyStats:
+    """Latencies of the most recent events, summarized as percentiles"""
+
+    def __init__(self, max_samples: int = DEFAULT_LATENCY_SAMPLES) -> None:
+        self.samples: Deque[float] = deque(maxlen=max_samples)
+        self.count = 0
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentiles(self) -> Dict[str, float]:
+        """Returns the p50 and p99 latencies in milliseconds, 0 without samples"""
+        if not self.samples:
+            return {"p50_ms": 0.0, "p99_ms": 0.0}
+        p50, p99 = np.percentile(np.fromiter(self.samples, dtype=np.float64), [50, 99]) * 1000
+        return {"p50_ms": float(p50), "p99_ms": float(p99)}
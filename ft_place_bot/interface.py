@@ -1,9 +1,10 @@
 from pathlib import Path
-from typing import Dict, List, Set, Tuple, TypedDict, cast
+from typing import Dict, List, Optional, Set, Tuple, TypedDict, cast
 
 import questionary
 
-from ft_place_bot.config import ColorID, UserConfiguration
+from ft_place_bot.config import ColorID
+from ft_place_bot.user_config import UserConfiguration
 
 
 class PriorityConfig(TypedDict):
@@ -17,9 +18,10 @@ class SimilarColorConfig(TypedDict):
 
 
 class Interface:
+    """Interactive prompts, reading and saving answers in the configuration loaded once by the caller"""
+
     @staticmethod
-    def get_tokens() -> Tuple[str, str]:
-        config = UserConfiguration.load()
+    def get_tokens(config: UserConfiguration) -> Tuple[str, str]:
         if config.access_token is not None and config.refresh_token is not None:
             use_saved = questionary.confirm("Use saved tokens?", default=True).ask()
             if use_saved:
@@ -37,8 +39,7 @@ class Interface:
         return access_token, refresh_token
 
     @staticmethod
-    def get_image_path() -> str:
-        config = UserConfiguration.load()
+    def get_image_path(config: UserConfiguration) -> str:
         if config.last_image_path:
             use_last = questionary.confirm(f"Use the last image ({config.last_image_path})?", default=True).ask()
             if use_last:
@@ -49,8 +50,11 @@ class Interface:
         return image_path
 
     @staticmethod
-    def get_origin() -> Tuple[int, int]:
-        config = UserConfiguration.load()
+    def get_origin(config: UserConfiguration, template_origin: Optional[Tuple[int, int]] = None) -> Tuple[int, int]:
+        if template_origin is not None:
+            use_template = questionary.confirm(f"Use the template position {template_origin}?", default=True).ask()
+            if use_template:
+                return template_origin
         if config.last_origin_x is not None and config.last_origin_y is not None:
             use_last = questionary.confirm(
                 f"Use the last position ({config.last_origin_x}, {config.last_origin_y})?", default=True
@@ -65,8 +69,9 @@ class Interface:
         return int(origin_x), int(origin_y)
 
     @staticmethod
-    def configure_colors() -> Tuple[List[PriorityConfig], Set[int], Set[int], List[SimilarColorConfig]]:
-        config = UserConfiguration.load()
+    def configure_colors(
+        config: UserConfiguration,
+    ) -> Tuple[List[PriorityConfig], Set[int], Set[int], List[SimilarColorConfig]]:
         if config.color_priorities:
             use_saved = questionary.confirm("Use saved color configuration?", default=True).ask()
             if use_saved:
@@ -0,0 +1,141 @@
+import argparse
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Set
+
+from ft_place_bot.utils.template import TEMPLATE_EXTENSION
+
+
+DEFAULT_BASE_URL = "https://ftplace.42lwatch.ch"
+# Same file as UserConfiguration, read without pydantic so that a headless start does not import it
+DEFAULT_PROFILE = Path.home() / ".ft_place_bot_config.json"
+DEFAULT_HISTORY_SIZE = 64
+
+ENV_PREFIX = "FT_PLACE_BOT_"
+# Environment variables read in headless mode, after the command line and before the profile file
+BASE_URL_ENV = f"{ENV_PREFIX}BASE_URL"
+METRICS_PORT_ENV = f"{ENV_PREFIX}METRICS_PORT"
+HISTORY_ENV = f"{ENV_PREFIX}HISTORY"
+HEADLESS_ENV = f"{ENV_PREFIX}HEADLESS"
+PROFILE_ENV = f"{ENV_PREFIX}PROFILE"
+IMAGE_ENV = f"{ENV_PREFIX}IMAGE"
+ORIGIN_X_ENV = f"{ENV_PREFIX}ORIGIN_X"
+ORIGIN_Y_ENV = f"{ENV_PREFIX}ORIGIN_Y"
+ACCESS_TOKEN_ENV = f"{ENV_PREFIX}ACCESS_TOKEN"
+REFRESH_TOKEN_ENV = f"{ENV_PREFIX}REFRESH_TOKEN"
+
+# Positional arguments of the command line, each of them switches to headless mode
+POSITIONAL_ARGUMENTS = ("img_path", "origin_x", "origin_y", "access_token", "refresh_token")
+
+
+@dataclass
+class BotSettings:
+    """Everything a run needs, gathered once from the prompts or from the headless sources"""
+
+    image_path: str
+    # Board position of the image, None to use the origin stored in a template file
+    origin_x: Optional[int]
+    origin_y: Optional[int]
+    access_token: str
+    refresh_token: str
+    base_url: str = DEFAULT_BASE_URL
+    metrics_port: Optional[int] = None
+    # Directory the fetched boards are recorded to, and its size limit in MB
+    history_path: Optional[str] = None
+    history_size: int = DEFAULT_HISTORY_SIZE
+    # Priority levels lost per recent overwrite of a pixel by others, the monitor default when None
+    heat_weight: Optional[float] = None
+    color_priorities: List[Dict[str, Any]] = field(default_factory=list)
+    ignored_source_colors: Set[int] = field(default_factory=set)
+    ignored_board_colors: Set[int] = field(default_factory=set)
+    similar_colors: List[Dict[str, Any]] = field(default_factory=list)
+    extra_accounts: List[Dict[str, str]] = field(default_factory=list)
+
+
+def is_headless(args: argparse.Namespace, environ: Mapping[str, str]) -> bool:
+    """Whether the run must not prompt: asked explicitly, or given settings on the command line"""
+    if args.headless or environ.get(HEADLESS_ENV, "").lower() in {"1", "true", "yes"}:
+        return True
+    return any(getattr(args, name) is not None for name in POSITIONAL_ARGUMENTS)
+
+
+def load_profile(path: Path) -> Dict[str, Any]:
+    """Reads a profile: the fields of the saved configuration, plus base_url, metrics_port, history and heat_weight"""
+    try:
+        profile = json.loads(path.read_text())
+    except (OSError, ValueError) as e:
+        raise ValueError(f"Unable to read the profile {path}: {e}") from e
+    if not isinstance(profile, dict):
+        raise ValueError(f"The profile {path} must hold a JSON object")
+    return profile
+
+
+def server_settings(args: argparse.Namespace, environ: Mapping[str, str]) -> Dict[str, Any]:
+    """Returns the server and recording settings given on the command line or in the environment, in both modes"""
+    metrics_port = args.metrics_port if args.metrics_port is not None else environ.get(METRICS_PORT_ENV)
+    return {
+        "base_url": args.base_url or environ.get(BASE_URL_ENV) or DEFAULT_BASE_URL,
+        "metrics_port": int(metrics_port) if metrics_port else None,
+        "history_path": args.history or environ.get(HISTORY_ENV) or None,
+        "history_size": args.history_size or DEFAULT_HISTORY_SIZE,
+        "heat_weight": args.heat_weight,
+    }
+
+
+def headless_settings(args: argparse.Namespace, environ: Mapping[str, str]) -> BotSettings:
+    """Resolves the settings from the command line, then the environment, then the profile file"""
+    profile_path = args.profile or environ.get(PROFILE_ENV)
+    if profile_path:
+        profile = load_profile(Path(profile_path))
+    else:
+        profile = load_profile(DEFAULT_PROFILE) if DEFAULT_PROFILE.exists() else {}
+
+    def explicit(argument: Optional[Any], env: str) -> Optional[Any]:
+        for value in (argument, environ.get(env)):
+            if value is not None and value != "":
+                return value
+        return None
+
+    def resolve(argument: Optional[Any], env: str, key: str) -> Any:
+        value = explicit(argument, env)
+        if value is not None:
+            return value
+        if profile.get(key) is not None and profile[key] != "":
+            return profile[key]
+        raise ValueError(f"Missing setting: pass it on the command line, set {env} or add {key!r} to the profile")
+
+    def resolve_origin(argument: Optional[int], env: str, key: str) -> Optional[int]:
+        # A template file holds its own origin, which the last position of the profile does not override
+        if Path(image_path).suffix.lower() == TEMPLATE_EXTENSION:
+            value = explicit(argument, env)
+            return None if value is None else int(value)
+        return int(resolve(argument, env, key))
+
+    server = server_settings(args, environ)
+    if args.base_url is None and BASE_URL_ENV not in environ and profile.get("base_url"):
+        server["base_url"] = profile["base_url"]
+    # A port of 0 given on the command line or in the environment turns the endpoint off, whatever the profile says
+    if args.metrics_port is None and METRICS_PORT_ENV not in environ and profile.get("metrics_port"):
+        server["metrics_port"] = int(profile["metrics_port"])
+    if server["history_path"] is None and profile.get("history"):
+        server["history_path"] = str(profile["history"])
+    if server["heat_weight"] is None and profile.get("heat_weight") is not None:
+        server["heat_weight"] = float(profile["heat_weight"])
+    image_path = str(resolve(args.img_path, IMAGE_ENV, "last_image_path"))
+    try:
+        return BotSettings(
+            image_path=image_path,
+            origin_x=resolve_origin(args.origin_x, ORIGIN_X_ENV, "last_origin_x"),
+            origin_y=resolve_origin(args.origin_y, ORIGIN_Y_ENV, "last_origin_y"),
+            access_token=str(resolve(args.access_token, ACCESS_TOKEN_ENV, "access_token")),
+            refresh_token=str(resolve(args.refresh_token, REFRESH_TOKEN_ENV, "refresh_token")),
+            color_priorities=list(profile.get("color_priorities", [])),
+            ignored_source_colors=set(profile.get("ignored_source_colors", [])),
+            ignored_board_colors=set(profile.get("ignored_board_colors", [])),
+            similar_colors=list(profile.get("similar_colors", [])),
+            extra_accounts=list(profile.get("extra_accounts", [])),
+            **server,
+        )
+    except TypeError as e:
+        raise ValueError(f"Invalid profile: {e}") from e
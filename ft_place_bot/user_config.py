@@ -0,0 +1,53 @@
+from pathlib import Path
+from typing import Any, ClassVar, List, Optional, Set
+
+from pydantic import BaseModel, Field
+
+
+class UserConfiguration(BaseModel):
+    """Settings saved between interactive runs, kept apart from config.py so that headless starts skip pydantic"""
+
+    access_token: Optional[str] = None
+    refresh_token: Optional[str] = None
+    last_image_path: Optional[str] = None
+    last_origin_x: Optional[int] = None
+    last_origin_y: Optional[int] = None
+    color_priorities: List[dict[str, Any]] = Field(default_factory=list)
+    ignored_source_colors: Set[int] = Field(default_factory=set)
+    ignored_board_colors: Set[int] = Field(default_factory=set)
+    similar_colors: List[dict[str, Any]] = Field(default_factory=list)
+    # Token pairs ({"access_token": ..., "refresh_token": ...}) of additional accounts placing pixels too
+    extra_accounts: List[dict[str, str]] = Field(default_factory=list)
+    _config_file: ClassVar[str] = ".ft_place_bot_config.json"
+
+    @classmethod
+    def path(cls) -> Path:
+        return Path.home() / cls._config_file
+
+    @classmethod
+    def load(cls) -> "UserConfiguration":
+        config_path = cls.path()
+        if config_path.exists():
+            return cls.parse_raw(config_path.read_text())
+        return cls()  # Create empty configuration without hardcoded credentials
+
+    def save(self) -> None:
+        self.path().write_text(self.json())
+
+    @classmethod
+    def persist_tokens(cls, previous_refresh_token: str, access_token: str, refresh_token: str) -> bool:
+        """Replaces the saved tokens of the account holding previous_refresh_token, returns whether one did"""
+        if not cls.path().exists():
+            return False
+        config = cls.load()
+        if config.refresh_token == previous_refresh_token:
+            config.access_token, config.refresh_token = access_token, refresh_token
+        else:
+            for account in config.extra_accounts:
+                if account.get("refresh_token") == previous_refresh_token:
+                    account.update(access_token=access_token, refresh_token=refresh_token)
+                    break
+            else:
+                return False
+        config.save()
+        return True
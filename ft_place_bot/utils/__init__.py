@@ -1,4 +1,7 @@
+from ft_place_bot.utils.palette import Palette
+from ft_place_bot.utils.target_cache import TargetCache
+from ft_place_bot.utils.template import Template
 from ft_place_bot.utils.utils import ColorManager, parse_args, setup_logging
 
 
-__all__ = ["ColorManager", "setup_logging", "parse_args"]
+__all__ = ["ColorManager", "Palette", "TargetCache", "Template", "setup_logging", "parse_args"]
@@ -0,0 +1,92 @@
+import hashlib
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+from numpy.typing import NDArray
+
+
+# Pixels compared against the palette at once, bounds the (pixels x colors) distance matrix
+DEFAULT_CHUNK_SIZE = 1 << 16
+# Color used when the palette is empty, same as ColorManager.find_closest_color
+DEFAULT_COLOR_ID = 1
+
+
+class Palette:
+    """FTPlace palette compiled into arrays for vectorized nearest color lookups"""
+
+    def __init__(self, color_ids: Sequence[int], rgb: Sequence[Sequence[int]]) -> None:
+        self.color_ids = np.asarray(color_ids, dtype=np.int32)
+        self.rgb = np.asarray(rgb, dtype=np.int32).reshape(-1, 3)
+        if self.color_ids.shape[0] != self.rgb.shape[0]:
+            raise ValueError("Palette needs one RGB value per color id")
+        self._lookup_cube: Optional[NDArray[Any]] = None
+
+    @classmethod
+    def from_board_data(cls, board_data: Dict[str, Any]) -> "Palette":
+        """Builds the palette from the colors listed in the /api/get payload"""
+        colors = board_data["colors"]
+        return cls(
+            color_ids=[color["id"] for color in colors],
+            rgb=[(color["red"], color["green"], color["blue"]) for color in colors],
+        )
+
+    @property
+    def digest(self) -> str:
+        """Hash identifying the palette content and order"""
+        return hashlib.sha256(self.color_ids.tobytes() + self.rgb.tobytes()).hexdigest()
+
+    def squared_distances(self, pixels: NDArray[Any]) -> NDArray[np.float32]:
+        """Returns the squared distance of each (N, 3) RGB pixel to each palette color, shaped (N, colors).
+
+        Expanded as |p|^2 - 2 p.c + |c|^2 to run as a matrix product. Every intermediate value is an integer
+        below 2^24, so float32 holds them exactly and the results compare exactly like the per-pixel distances.
+        """
+        pixels = pixels.astype(np.float32)
+        pixel_norms: NDArray[np.float32] = np.einsum("ij,ij->i", pixels, pixels)
+        return pixel_norms[:, None] + self._scores(pixels)
+
+    def _scores(self, pixels: NDArray[np.float32]) -> NDArray[np.float32]:
+        """Squared distances minus the pixel norm, which does not change the closest color"""
+        colors = self.rgb.astype(np.float32)
+        color_norms: NDArray[np.float32] = np.einsum("ij,ij->i", colors, colors)
+        scores: NDArray[np.float32] = color_norms[None, :] - 2 * (pixels @ colors.T)
+        return scores
+
+    def nearest(self, pixels: NDArray[Any], chunk_size: int = DEFAULT_CHUNK_SIZE) -> NDArray[np.int32]:
+        """Returns the closest color id of each (N, 3) RGB pixel.
+
+        Ties go to the color listed first, like ColorManager.find_closest_color.
+        """
+        if self.color_ids.size == 0:
+            return np.full(pixels.shape[0], DEFAULT_COLOR_ID, dtype=np.int32)
+        result = np.empty(pixels.shape[0], dtype=np.int32)
+        for start in range(0, pixels.shape[0], chunk_size):
+            chunk = pixels[start : start + chunk_size].astype(np.float32)
+            result[start : start + chunk_size] = self.color_ids[np.argmin(self._scores(chunk), axis=1)]
+        return result
+
+    @property
+    def has_lookup_cube(self) -> bool:
+        return self._lookup_cube is not None
+
+    def lookup_cube(self) -> NDArray[Any]:
+        """Returns (and caches) the closest color id of every possible RGB value, indexed as [red, green, blue]"""
+        if self._lookup_cube is None:
+            channel = np.arange(256)
+            plane = np.stack(np.meshgrid(channel, channel, indexing="ij"), axis=-1).reshape(-1, 2)
+            # 16 MB as uint8, which holds every FTPlace color id
+            fits_uint8 = self.color_ids.size == 0 or int(self.color_ids.max()) <= np.iinfo(np.uint8).max
+            cube = np.empty((256, 256 * 256), dtype=np.uint8 if fits_uint8 else np.int32)
+            for red in range(256):
+                pixels = np.column_stack((np.full(plane.shape[0], red), plane))
+                cube[red] = self.nearest(pixels)
+            self._lookup_cube = cube.reshape(256, 256, 256)
+        return self._lookup_cube
+
+    def quantize(self, image: NDArray[Any], *, use_lookup_cube: bool = False) -> NDArray[np.int32]:
+        """Maps each pixel of an (height, width, 3) RGB image to its closest color id, shaped (height, width)"""
+        if use_lookup_cube:
+            cube = self.lookup_cube()
+            rgb = image.astype(np.intp)
+            return cube[rgb[..., 0], rgb[..., 1], rgb[..., 2]].astype(np.int32)
+        return self.nearest(image.reshape(-1, 3)).reshape(image.shape[:2])
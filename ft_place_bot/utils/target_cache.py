@@ -0,0 +1,84 @@
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from ft_place_bot.utils.palette import Palette
+from ft_place_bot.utils.utils import ColorManager
+
+
+DEFAULT_CACHE_DIR = Path.home() / ".ft_place_bot_cache"
+DEFAULT_MAX_ENTRIES = 16
+
+
+class TargetCache:
+    """On-disk cache of converted target images, keyed by image content and palette.
+
+    Entries are plain .npy files loaded memory-mapped, so a restart gets its target back without reconverting.
+    Only the most recently used entries are kept.
+    """
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.directory = directory
+        self.max_entries = max_entries
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def key(image_path: str, palette: Palette) -> str:
+        """Returns the cache key of an image file converted with a palette"""
+        image_hash = hashlib.sha256(Path(image_path).read_bytes()).hexdigest()
+        return f"{image_hash[:32]}-{palette.digest[:16]}"
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.npy"
+
+    def load(self, key: str) -> Optional[NDArray[np.int32]]:
+        path = self._path(key)
+        try:
+            target_colors: NDArray[np.int32] = np.load(path, mmap_mode="r", allow_pickle=False)
+            path.touch()  # Marks the entry as recently used
+            return target_colors
+        except (OSError, ValueError):
+            return None
+
+    def store(self, key: str, target_colors: NDArray[np.int32]) -> None:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # Written aside then renamed, so a crash never leaves a truncated entry behind
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as tmp_file:
+                np.save(tmp_file, target_colors, allow_pickle=False)
+            os.replace(tmp_path, self._path(key))
+            self.evict()
+        except OSError as e:
+            self.logger.warning("Unable to cache converted image: %s", str(e))
+
+    def evict(self) -> None:
+        """Removes the least recently used entries beyond max_entries"""
+        entries = sorted(self.directory.glob("*.npy"), key=lambda path: path.stat().st_mtime, reverse=True)
+        for path in entries[self.max_entries :]:
+            path.unlink(missing_ok=True)
+
+    def get_or_convert(
+        self, image_path: str, board_data: Dict[str, Any], palette: Optional[Palette] = None
+    ) -> NDArray[np.int32]:
+        """Returns the converted image from the cache, converting and storing it on a miss"""
+        if palette is None:
+            palette = Palette.from_board_data(board_data)
+        key = self.key(image_path, palette)
+        cached = self.load(key)
+        if cached is not None:
+            self.logger.info("Converted image loaded from cache")
+            return cached
+
+        image_data = ColorManager.load_image(image_path)
+        if image_data is None:
+            raise ValueError(f"Unable to load image: {image_path}")
+        target_colors = ColorManager.convert_to_ftplace_colors(image_data, board_data, palette)
+        self.store(key, target_colors)
+        return target_colors
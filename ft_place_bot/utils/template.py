@@ -0,0 +1,109 @@
+import json
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+from numpy.typing import NDArray
+
+from ft_place_bot.core import TRANSPARENT_COLOR_ID, FTPlaceError
+from ft_place_bot.utils.palette import Palette
+
+
+TEMPLATE_EXTENSION = ".ftpt"
+TEMPLATE_MAGIC = b"FTPT"
+TEMPLATE_VERSION = 1
+# magic, version, width, height, origin_x, origin_y
+TEMPLATE_HEADER = struct.Struct("<4sHIIii")
+# Alpha below which a PNG pixel is considered transparent
+ALPHA_THRESHOLD = 128
+
+
+@dataclass
+class Template:
+    """Target image as a (width, height) raster of color ids, TRANSPARENT_COLOR_ID marking pixels to leave alone.
+
+    On disk it is a small header followed by the raw uint8 raster, so loading only maps the file.
+    """
+
+    target_colors: NDArray[np.uint8]
+    origin_x: int = 0
+    origin_y: int = 0
+
+    @property
+    def width(self) -> int:
+        return int(self.target_colors.shape[0])
+
+    @property
+    def height(self) -> int:
+        return int(self.target_colors.shape[1])
+
+    def save(self, path: str) -> None:
+        header = TEMPLATE_HEADER.pack(
+            TEMPLATE_MAGIC, TEMPLATE_VERSION, self.width, self.height, self.origin_x, self.origin_y
+        )
+        with open(path, "wb") as template_file:
+            template_file.write(header)
+            template_file.write(np.ascontiguousarray(self.target_colors, dtype=np.uint8).tobytes())
+
+    @classmethod
+    def load(cls, path: str) -> "Template":
+        """Memory-maps a template file"""
+        try:
+            with open(path, "rb") as template_file:
+                header = template_file.read(TEMPLATE_HEADER.size)
+            magic, version, width, height, origin_x, origin_y = TEMPLATE_HEADER.unpack(header)
+        except (OSError, struct.error) as err:
+            raise FTPlaceError(f"Failed to read template: {path}") from err
+        if magic != TEMPLATE_MAGIC or version != TEMPLATE_VERSION:
+            raise FTPlaceError(f"Not a template file: {path}")
+        target_colors: NDArray[np.uint8] = np.memmap(
+            path, dtype=np.uint8, mode="r", offset=TEMPLATE_HEADER.size, shape=(width, height)
+        )
+        return cls(target_colors=target_colors, origin_x=origin_x, origin_y=origin_y)
+
+    @classmethod
+    def from_image(cls, image_path: str, palette: Palette, origin_x: int = 0, origin_y: int = 0) -> "Template":
+        """Converts an image, pixels with a low alpha becoming transparent"""
+        from PIL import Image, UnidentifiedImageError  # noqa: PLC0415
+
+        try:
+            with Image.open(image_path) as img:
+                rgba = np.array(img.convert("RGBA"))
+        except (OSError, UnidentifiedImageError, ValueError) as err:
+            raise FTPlaceError("Failed to load image") from err
+        color_ids = palette.quantize(rgba[..., :3])
+        color_ids[rgba[..., 3] < ALPHA_THRESHOLD] = TRANSPARENT_COLOR_ID
+        return cls(
+            target_colors=np.ascontiguousarray(color_ids.T, dtype=np.uint8), origin_x=origin_x, origin_y=origin_y
+        )
+
+    @classmethod
+    def from_pattern(cls, pattern_path: str, origin_x: int = 0, origin_y: int = 0) -> "Template":
+        """Converts a sparse pattern JSON ({"width", "height", "pattern": [{"x", "y", "color"}]})"""
+        try:
+            data: Any = json.loads(Path(pattern_path).read_text())
+            target_colors = np.full((data["width"], data["height"]), TRANSPARENT_COLOR_ID, dtype=np.uint8)
+            pattern = data["pattern"]
+            if pattern:
+                xs = np.fromiter((pixel["x"] for pixel in pattern), dtype=np.intp, count=len(pattern))
+                ys = np.fromiter((pixel["y"] for pixel in pattern), dtype=np.intp, count=len(pattern))
+                target_colors[xs, ys] = np.fromiter(
+                    (pixel["color"] for pixel in pattern), dtype=np.uint8, count=len(pattern)
+                )
+        except (OSError, KeyError, TypeError, ValueError, IndexError, OverflowError) as err:
+            raise FTPlaceError(f"Invalid pattern file: {pattern_path}") from err
+        return cls(target_colors=target_colors, origin_x=origin_x, origin_y=origin_y)
+
+    @classmethod
+    def open(cls, path: str, palette: Optional[Palette] = None) -> "Template":
+        """Loads a template file, a pattern JSON, or an image (which needs the palette)"""
+        suffix = Path(path).suffix.lower()
+        if suffix == TEMPLATE_EXTENSION:
+            return cls.load(path)
+        if suffix == ".json":
+            return cls.from_pattern(path)
+        if palette is None:
+            raise FTPlaceError("A palette is needed to convert an image")
+        return cls.from_image(path, palette)
@@ -1,13 +1,13 @@
 import argparse
 import logging
 import math
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 from numpy.typing import NDArray
-from PIL import Image, UnidentifiedImageError
 
 from ft_place_bot.core import FTPlaceError
+from ft_place_bot.utils.palette import Palette
 
 
 class ColorManager:
@@ -30,6 +30,9 @@ class ColorManager:
 
     @staticmethod
     def load_image(image_path: str) -> Optional[NDArray[np.uint8]]:
+        # Imported on use, starting from a template does not need Pillow
+        from PIL import Image, UnidentifiedImageError  # noqa: PLC0415
+
         try:
             with Image.open(image_path) as img:
                 return np.array(img.convert("RGB"))
@@ -37,14 +40,17 @@ class ColorManager:
             raise FTPlaceError("Failed to load image") from err
 
     @staticmethod
-    def convert_to_ftplace_colors(image: NDArray[np.uint8], board_data: Dict[str, Any]) -> NDArray[np.int32]:
-        height, width, _ = image.shape
-        color_map = np.zeros((width, height), dtype=np.int32)
-        for y in range(height):
-            for x in range(width):
-                rgb: Tuple[int, int, int] = (int(image[y, x][0]), int(image[y, x][1]), int(image[y, x][2]))
-                color_map[x][y] = ColorManager.find_closest_color(rgb, board_data)
-        return color_map
+    def convert_to_ftplace_colors(
+        image: NDArray[np.uint8], board_data: Dict[str, Any], palette: Optional[Palette] = None
+    ) -> NDArray[np.int32]:
+        """Converts an RGB image to a (width, height) array of the closest FTPlace color ids.
+
+        A palette with a precomputed lookup cube can be passed to speed up repeated conversions.
+        """
+        if palette is None:
+            palette = Palette.from_board_data(board_data)
+        color_ids = palette.quantize(image, use_lookup_cube=palette.has_lookup_cube)
+        return np.ascontiguousarray(color_ids.T)
 
 
 def setup_logging() -> logging.Logger:
@@ -57,11 +63,23 @@ def setup_logging() -> logging.Logger:
     return logger
 
 
-def parse_args() -> argparse.Namespace:
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parses the command line. Without any argument the bot asks for its settings interactively"""
     parser = argparse.ArgumentParser(description="FTPlace Image Maintainer")
-    parser.add_argument("img_path", help="Path to the image to maintain")
-    parser.add_argument("origin_x", type=int, help="X coordinate of the origin")
-    parser.add_argument("origin_y", type=int, help="Y coordinate of the origin")
-    parser.add_argument("access_token", help="Access token")
-    parser.add_argument("refresh_token", help="Refresh token")
-    return parser.parse_args()
+    parser.add_argument("img_path", nargs="?", help="Path to the image to maintain")
+    parser.add_argument("origin_x", nargs="?", type=int, help="X coordinate of the origin")
+    parser.add_argument("origin_y", nargs="?", type=int, help="Y coordinate of the origin")
+    parser.add_argument("access_token", nargs="?", help="Access token")
+    parser.add_argument("refresh_token", nargs="?", help="Refresh token")
+    parser.add_argument(
+        "--headless", action="store_true", help="Never prompt, settings come from arguments, environment and profile"
+    )
+    parser.add_argument("--profile", help="JSON profile file holding the settings (defaults to the saved config)")
+    parser.add_argument("--base-url", help="FTPlace server to connect to")
+    parser.add_argument("--metrics-port", type=int, help="Port of the local Prometheus metrics endpoint")
+    parser.add_argument("--history", help="Directory to record the fetched boards to, for later analysis")
+    parser.add_argument("--history-size", type=int, help="Disk space of the board history, in MB")
+    parser.add_argument(
+        "--heat-weight", type=float, help="Priority levels a pixel loses per recent overwrite by others (0 disables)"
+    )
+    return parser.parse_args(argv)
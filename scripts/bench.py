@@ -0,0 +1,245 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from itertools import product
+
+import numpy as np
+from PIL import Image
+
+from scripts.png_to_cores_json import COLORS, convert_image
+
+from ft_place_bot.client.board_decoder import BoardDecoder
+from ft_place_bot.core import ColorConfig, ImageMonitor
+from ft_place_bot.core.models import BoardSnapshot
+from ft_place_bot.utils import ColorManager
+
+
+logging.basicConfig(level=logging.INFO, format="%(message)s", force=True)
+logger = logging.getLogger(__name__)
+
+CASES = ("decode", "stats", "pixels_to_fix", "convert_colors", "convert_image", "monitor_cycle")
+# Pixels placed per monitor cycle, a full pixel buffer
+CYCLE_PLACEMENTS = 3
+BASELINE_VERSION = 1
+
+
+def measure(func, repeat):
+    """Returns the best of repeat timings and the peak memory of one more run, traced"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak
+
+
+class Workload:
+    """Board, target and derived inputs for one point of the sweep.
+
+    The target is a square centered on the board, drawn at random, and the board holds it with a mismatch fraction
+    of its pixels set to another color.
+    """
+
+    def __init__(self, board_size, template_size, mismatch, seed=0):
+        rng = np.random.default_rng(seed)
+        self.board_size = board_size
+        self.template_size = template_size
+        self.mismatch = mismatch
+        self.color_ids = np.array([color["id"] for color in COLORS])
+        self.origin = (board_size - template_size) // 2
+        self.target = rng.choice(self.color_ids, (template_size, template_size)).astype(np.uint8)
+        board = rng.choice(self.color_ids, (board_size, board_size)).astype(np.uint8)
+        window = board[self.origin : self.origin + template_size, self.origin : self.origin + template_size]
+        window[...] = self.target
+        wrong = rng.random(window.shape) < mismatch
+        window[wrong] = np.where(window[wrong] == self.color_ids[0], self.color_ids[1], self.color_ids[0])
+        self.board = board
+        self.payload = self._payload(board)
+        self.image = rng.integers(0, 256, (template_size, template_size, 3), dtype=np.uint8)
+
+    @staticmethod
+    def _payload(board):
+        rows = [
+            [{"color_id": color_id, "username": "user", "set_time": "2025-01-01T00:00:00.000Z"} for color_id in row]
+            for row in board.tolist()
+        ]
+        return json.dumps({"board": rows, "colors": COLORS}, separators=(",", ":")).encode()
+
+    @property
+    def params(self):
+        return {"board": self.board_size, "template": self.template_size, "mismatch": self.mismatch}
+
+
+def new_monitor():
+    return ImageMonitor(
+        None, None, ColorConfig(priorities=[], ignored_source_colors=set(), ignored_board_colors=set(), color_sets=[])
+    )
+
+
+def run_case(case, workload, repeat, directory):
+    """Returns (seconds, peak bytes, pixels processed) of one case"""
+    monitor = new_monitor()
+    origin, target, board = workload.origin, workload.target, workload.board
+    if case == "decode":
+        decoder = BoardDecoder()
+        return (*measure(lambda: decoder.decode(workload.payload), repeat), workload.board_size**2)
+    if case == "stats":
+        return (*measure(lambda: monitor.get_image_stats(board, target, origin, origin), repeat), target.size)
+    if case == "pixels_to_fix":
+        pixels_to_fix = lambda: monitor._get_pixels_to_fix(board, target, origin, origin)  # noqa: SLF001
+        return (*measure(pixels_to_fix, repeat), target.size)
+    if case == "convert_colors":
+        board_data = {"colors": COLORS}
+        convert = lambda: ColorManager.convert_to_ftplace_colors(workload.image, board_data)
+        return (*measure(convert, repeat), target.size)
+    if case == "convert_image":
+        image_path = os.path.join(directory, f"{workload.template_size}.png")
+        if not os.path.exists(image_path):
+            Image.fromarray(workload.image).save(image_path)
+        output_path = os.path.join(directory, "pattern.json")
+        return (*measure(lambda: convert_image(image_path, output_path), repeat), target.size)
+    if case == "monitor_cycle":
+        # Decode the region of the board, update the diff and take the pixels of a burst
+        monitor.add_target(target, origin, origin)
+        region = monitor.region
+        decoder = BoardDecoder()
+
+        def cycle():
+            snapshot = BoardSnapshot(board=decoder.decode(workload.payload, region), changed=True)
+            monitor.apply_snapshot(snapshot).top(CYCLE_PLACEMENTS)
+
+        return (*measure(cycle, repeat), workload.board_size**2)
+    raise ValueError(f"Unknown case: {case}")
+
+
+def sweep(args):
+    """Runs every case over the grid of sizes and mismatch ratios, returns the result records"""
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for board_size, template_ratio, mismatch in product(args.sizes, args.template_ratios, args.mismatch):
+            template_size = max(1, int(board_size * template_ratio))
+            workload = Workload(board_size, template_size, mismatch)
+            for case in args.cases:
+                seconds, peak, pixels = run_case(case, workload, args.repeat, directory)
+                record = {
+                    "case": case,
+                    "params": workload.params,
+                    "pixels": pixels,
+                    "seconds": seconds,
+                    "pixels_per_second": pixels / seconds if seconds > 0 else float("inf"),
+                    "peak_bytes": peak,
+                }
+                results.append(record)
+                logger.info(
+                    "%-15s board %5d template %5d mismatch %.2f: %9.2f ms  %8.2f Mpx/s  %8.2f MB peak",
+                    case,
+                    board_size,
+                    template_size,
+                    mismatch,
+                    seconds * 1000,
+                    record["pixels_per_second"] / 1e6,
+                    peak / 1e6,
+                )
+    return results
+
+
+def result_key(record):
+    params = record["params"]
+    return record["case"], params["board"], params["template"], params["mismatch"]
+
+
+def log_scaling(results):
+    """Logs how the time of each case grows with the pixels processed, as the exponent of a power law fit"""
+    curves = {}
+    for record in results:
+        key = (record["case"], record["params"]["mismatch"])
+        curves.setdefault(key, []).append((record["pixels"], record["seconds"]))
+    for (case, mismatch), points in sorted(curves.items()):
+        pixels, seconds = np.array(sorted(set(points))).T
+        if np.unique(pixels).size < 2 or (seconds <= 0).any():  # noqa: PLR2004
+            continue
+        exponent = np.polyfit(np.log(pixels), np.log(seconds), 1)[0]
+        logger.info("%-15s mismatch %.2f: time grows as pixels^%.2f", case, mismatch, exponent)
+
+
+def compare(results, baseline, tolerance):
+    """Logs the changes against a baseline, returns the number of regressions beyond the tolerance"""
+    previous = {result_key(record): record for record in baseline["results"]}
+    regressions = 0
+    for record in results:
+        old = previous.get(result_key(record))
+        if old is None:
+            continue
+        time_ratio = record["seconds"] / old["seconds"] if old["seconds"] > 0 else 1.0
+        memory_ratio = record["peak_bytes"] / old["peak_bytes"] if old["peak_bytes"] > 0 else 1.0
+        regressed = time_ratio > 1 + tolerance or memory_ratio > 1 + tolerance
+        regressions += regressed
+        logger.log(
+            logging.WARNING if regressed else logging.INFO,
+            "%s %-15s board %5d template %5d mismatch %.2f: time x%.2f, peak memory x%.2f",
+            "REGRESSION" if regressed else "ok        ",
+            *result_key(record),
+            time_ratio,
+            memory_ratio,
+        )
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths over board sizes and mismatch ratios")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES), help="Cases to run")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 200, 400], help="Board side lengths")
+    parser.add_argument(
+        "--template-ratios", type=float, nargs="+", default=[0.25, 1.0], help="Template side, relative to the board"
+    )
+    parser.add_argument(
+        "--mismatch", type=float, nargs="+", default=[0.01, 0.2], help="Fractions of template pixels to fix"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement, best one is kept")
+    parser.add_argument("--output", help="JSON file the results are saved to, as a baseline")
+    parser.add_argument("--baseline", help="JSON file of a previous run to compare the results with")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Relative slowdown or memory growth reported as a regression"
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    logging.getLogger("ft_place_bot").setLevel(logging.WARNING)
+    results = sweep(args)
+    log_scaling(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "version": BASELINE_VERSION,
+                    "python": platform.python_version(),
+                    "numpy": np.__version__,
+                    "machine": platform.machine(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        logger.info("Results saved to %s", args.output)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            logger.warning("%d regressions beyond %.0f%%", regressions, args.tolerance * 100)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
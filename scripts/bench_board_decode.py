@@ -0,0 +1,94 @@
+import argparse
+import json
+import logging
+import time
+import tracemalloc
+from functools import partial
+
+import numpy as np
+
+from ft_place_bot.client.board_decoder import BoardDecoder
+from ft_place_bot.core import BoardRegion
+
+
+logging.basicConfig(level=logging.INFO, format="%(message)s")
+logger = logging.getLogger(__name__)
+
+
+def make_payload(width, height, seed=0):
+    """Build a /api/get-like payload with random color ids."""
+    rng = np.random.default_rng(seed)
+    colors = rng.integers(1, 19, (width, height))
+    board = [
+        [{"color_id": int(color_id), "username": "user", "set_time": "2025-01-01T00:00:00.000Z"} for color_id in row]
+        for row in colors
+    ]
+    payload = json.dumps({"board": board, "colors": []}, separators=(",", ":")).encode()
+    return payload, colors
+
+
+def decode_legacy(payload):
+    """Decoding path used before BoardDecoder: response.json() then a nested comprehension."""
+    board_data = json.loads(payload)
+    return np.array([[cell["color_id"] for cell in row] for row in board_data["board"]])
+
+
+def measure(func, payload, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(payload)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    result = func(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak, result
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark board decoding against the legacy path")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 200, 400], help="Board side lengths")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement, best one is kept")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    decoder = BoardDecoder()
+    for size in args.sizes:
+        payload, colors = make_payload(size, size)
+        legacy_time, legacy_peak, legacy = measure(decode_legacy, payload, args.repeat)
+        fast_time, fast_peak, fast = measure(decoder.decode, payload, args.repeat)
+        if not np.array_equal(legacy, fast) or not np.array_equal(colors, fast):
+            raise ValueError(f"Decoders disagree on a {size}x{size} board")
+        logger.info(
+            "%dx%d (%.1f MB): legacy %.1f ms / %.1f MB peak / %d B array | decoder %.1f ms / %.1f MB peak / %d B array"
+            " | x%.1f",
+            size,
+            size,
+            len(payload) / 1e6,
+            legacy_time * 1000,
+            legacy_peak / 1e6,
+            legacy.nbytes,
+            fast_time * 1000,
+            fast_peak / 1e6,
+            fast.nbytes,
+            legacy_time / fast_time,
+        )
+        region = BoardRegion(x=size // 4, y=size // 4, width=size // 4, height=size // 4)
+        region_time, region_peak, cropped = measure(partial(decoder.decode, region=region), payload, args.repeat)
+        if not np.array_equal(cropped, colors[region.x : region.x + region.width, region.y : region.y + region.height]):
+            raise ValueError(f"Region decoding is wrong on a {size}x{size} board")
+        logger.info(
+            "%dx%d region of it: decoder %.1f ms / %.1f MB peak | x%.1f vs legacy",
+            region.width,
+            region.height,
+            region_time * 1000,
+            region_peak / 1e6,
+            legacy_time / region_time,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+import argparse
+import json
+import logging
+import random
+import secrets
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import formatdate
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import numpy as np
+
+from scripts.png_to_cores_json import COLORS
+
+from ft_place_bot.config import HTTPStatus
+
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+SERVER_ERRORS = (500, 502, 503)
+
+
+def iso_time(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+class Account:
+    """Account of the stand-in server, with its tokens and the timers of its pixel buffer slots."""
+
+    def __init__(self, account_id, pixel_buffer):
+        self.id = account_id
+        self.username = f"bot{account_id}"
+        self.access_token = f"access-{account_id}-{secrets.token_hex(4)}"
+        self.refresh_token = f"refresh-{account_id}-{secrets.token_hex(4)}"
+        self.issued_at = 0.0
+        self.slots = [0.0] * pixel_buffer
+
+    def timers(self):
+        return [iso_time(slot) for slot in self.slots]
+
+    def user_infos(self, pixel_timer, token_ttl):
+        return {
+            "id": self.id,
+            "username": self.username,
+            "timers": self.timers(),
+            "pixel_buffer": len(self.slots),
+            "pixel_timer": pixel_timer,
+            "soft_is_admin": False,
+            "soft_is_banned": False,
+            "iat": int(self.issued_at),
+            "exp": int(self.issued_at + token_ttl),
+        }
+
+
+class LocalFTPlace:
+    """State of a local FTPlace stand-in: board, accounts, fault injection and griefers.
+
+    Times are taken from the server clock, which can be skewed from the local one to exercise clock estimation.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.board = np.ones((args.width, args.height), dtype=np.uint8)
+        self.usernames = np.zeros((args.width, args.height), dtype=np.int32)
+        self.set_times = np.zeros((args.width, args.height), dtype=np.float64)
+        self.version = 0
+        self.accounts = [Account(account_id, args.pixel_buffer) for account_id in range(1, args.accounts + 1)]
+        self.by_access = {account.access_token: account for account in self.accounts}
+        self.by_refresh = {account.refresh_token: account for account in self.accounts}
+        self.color_ids = [color["id"] for color in COLORS]
+        self.stats = Counter()
+        self.lock = threading.Lock()
+        self.rng = random.Random(args.seed)  # noqa: S311
+        now = self.now()
+        for account in self.accounts:
+            account.issued_at = now
+
+    def now(self):
+        return time.time() + self.args.clock_skew
+
+    def rotate_tokens(self, account):
+        """Issues new tokens to an account, the old ones stop working"""
+        del self.by_access[account.access_token]
+        del self.by_refresh[account.refresh_token]
+        account.access_token = f"access-{account.id}-{secrets.token_hex(4)}"
+        account.refresh_token = f"refresh-{account.id}-{secrets.token_hex(4)}"
+        account.issued_at = self.now()
+        self.by_access[account.access_token] = account
+        self.by_refresh[account.refresh_token] = account
+
+    def authenticate(self, cookies):
+        """Returns (status, account, new tokens), rotating the tokens once the access token expired"""
+        account = self.by_access.get(cookies.get("token"))
+        if account is not None:
+            # Expires at the whole second given as exp in the profile, like a JWT
+            if self.now() < int(account.issued_at + self.args.token_ttl):
+                return HTTPStatus.SUCCESS_200.value, account, None
+            if cookies.get("refresh") == account.refresh_token:
+                self.rotate_tokens(account)
+                return HTTPStatus.TOKEN_EXPIRED.value, account, (account.access_token, account.refresh_token)
+        return 401, None, None
+
+    def board_payload(self):
+        board = [
+            [
+                {
+                    "color_id": int(color_id),
+                    "username": f"bot{user}" if user else "",
+                    "set_time": iso_time(set_time),
+                }
+                for color_id, user, set_time in zip(colors, users, set_times)
+            ]
+            for colors, users, set_times in zip(self.board.tolist(), self.usernames.tolist(), self.set_times.tolist())
+        ]
+        return json.dumps({"board": board, "colors": COLORS, "type": "board"}, separators=(",", ":")).encode()
+
+    def place(self, account, x, y, color):
+        """Returns (status, body) of a placement"""
+        now = self.now()
+        if not (0 <= x < self.board.shape[0] and 0 <= y < self.board.shape[1]) or color not in self.color_ids:
+            return 400, {"message": "Invalid pixel"}
+        slot = min(range(len(account.slots)), key=account.slots.__getitem__)
+        if account.slots[slot] > now:
+            return 425, {"message": "Too early", "timers": account.timers()}
+        account.slots[slot] = now + self.args.pixel_timer
+        self.board[x, y] = color
+        self.usernames[x, y] = account.id
+        self.set_times[x, y] = now
+        self.version += 1
+        return 201, {"timers": account.timers()}
+
+    def grief(self):
+        """Overwrites one random pixel of the griefed area with a random color"""
+        area_x, area_y, area_width, area_height = self.args.grief_area or (0, 0) + self.board.shape
+        x = area_x + self.rng.randrange(max(1, area_width))
+        y = area_y + self.rng.randrange(max(1, area_height))
+        if 0 <= x < self.board.shape[0] and 0 <= y < self.board.shape[1]:
+            self.board[x, y] = self.rng.choice(self.color_ids)
+            self.usernames[x, y] = 0
+            self.set_times[x, y] = self.now()
+            self.version += 1
+            self.stats["griefed"] += 1
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # noqa: A002
+            logger.debug(format, *args)
+
+        def date_time_string(self, timestamp=None):
+            return formatdate(state.now() if timestamp is None else timestamp, usegmt=True)
+
+        def send_json(self, status, body=None, headers=(), raw=None):
+            content = raw if raw is not None else json.dumps(body if body is not None else {}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(content)
+            state.stats[f"{self.command} {urlparse(self.path).path} {status}"] += 1
+
+        def inject_faults(self):
+            """Adds the configured latency, returns True when the request gets a server error instead"""
+            delay = state.args.latency + state.rng.uniform(0, state.args.jitter)
+            if delay > 0:
+                time.sleep(delay)
+            if state.rng.random() < state.args.error_rate:
+                self.send_json(state.rng.choice(SERVER_ERRORS), {"message": "Injected error"})
+                return True
+            return False
+
+        def cookies(self):
+            cookie = SimpleCookie(self.headers.get("Cookie", ""))
+            return {name: morsel.value for name, morsel in cookie.items()}
+
+        def authenticated(self):
+            """Returns the account of the request, or None once the response was sent"""
+            status, account, tokens = state.authenticate(self.cookies())
+            if status == HTTPStatus.TOKEN_EXPIRED.value:
+                cookies = [("Set-Cookie", f"token={tokens[0]}; Path=/"), ("Set-Cookie", f"refresh={tokens[1]}; Path=/")]
+                self.send_json(status, {"message": "Token expired"}, headers=cookies)
+                return None
+            if status != HTTPStatus.SUCCESS_200.value:
+                self.send_json(status, {"message": "Unauthorized"})
+                return None
+            return account
+
+        def do_GET(self):  # noqa: N802
+            if self.inject_faults():
+                return
+            path = urlparse(self.path).path
+            with state.lock:
+                account = self.authenticated()
+                if account is None:
+                    return
+                if path == "/api/profile":
+                    user_infos = account.user_infos(state.args.pixel_timer, state.args.token_ttl)
+                    self.send_json(200, {"userInfos": user_infos})
+                elif path == "/api/get":
+                    etag = f'"{state.version}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        self.send_json(304, raw=b"", headers=[("ETag", etag)])
+                        return
+                    payload = state.board_payload()
+                    self.send_json(200, raw=payload, headers=[("ETag", etag)])
+                else:
+                    self.send_json(404, {"message": "Not found"})
+
+        def do_POST(self):  # noqa: N802
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.inject_faults():
+                return
+            if urlparse(self.path).path != "/api/set":
+                self.send_json(404, {"message": "Not found"})
+                return
+            try:
+                pixel = json.loads(body)
+                x, y, color = int(pixel["x"]), int(pixel["y"]), int(pixel["color"])
+            except (KeyError, TypeError, ValueError):
+                self.send_json(400, {"message": "Invalid body"})
+                return
+            with state.lock:
+                account = self.authenticated()
+                if account is None:
+                    return
+                status, response = state.place(account, x, y, color)
+                self.send_json(status, response)
+
+    return Handler
+
+
+def run_griefers(state, stop):
+    """Overwrites pixels at grief_rate per second until stopped"""
+    interval = 1.0 / state.args.grief_rate
+    next_time = time.monotonic()
+    while not stop.wait(max(0.0, next_time - time.monotonic())):
+        with state.lock:
+            state.grief()
+        next_time += interval
+
+
+def start_server(args):
+    """Starts the server in background threads, returns (server, state, stop event)"""
+    state = LocalFTPlace(args)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    server.daemon_threads = True
+    stop = threading.Event()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    if args.grief_rate > 0:
+        threading.Thread(target=run_griefers, args=(state, stop), daemon=True).start()
+    return server, state, stop
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local FTPlace stand-in server for load and behavior testing")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=8420, help="Port to listen on, 0 picks a free one")
+    parser.add_argument("--width", type=int, default=200, help="Board width")
+    parser.add_argument("--height", type=int, default=200, help="Board height")
+    parser.add_argument("--accounts", type=int, default=4, help="Number of accounts to create")
+    parser.add_argument("--pixel-buffer", type=int, default=3, help="Pixels an account can bank")
+    parser.add_argument("--pixel-timer", type=float, default=10.0, help="Cooldown of a buffer slot, in seconds")
+    parser.add_argument("--token-ttl", type=float, default=300.0, help="Seconds before an access token expires")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 5xx")
+    parser.add_argument("--clock-skew", type=float, default=0.0, help="Seconds the server clock is ahead of ours")
+    parser.add_argument("--grief-rate", type=float, default=0.0, help="Pixels overwritten by griefers per second")
+    parser.add_argument(
+        "--grief-area", type=int, nargs=4, metavar=("X", "Y", "WIDTH", "HEIGHT"), help="Area griefers target"
+    )
+    parser.add_argument("--seed", type=int, help="Seed of the fault injection and griefers")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    server, state, stop = start_server(args)
+    host, port = server.server_address[:2]
+    logger.info("Local FTPlace listening on http://%s:%d", host, port)
+    for account in state.accounts:
+        logger.info(
+            "%s: access_token=%s refresh_token=%s", account.username, account.access_token, account.refresh_token
+        )
+    try:
+        while True:
+            time.sleep(10)
+            with state.lock:
+                logger.info("Requests: %s", dict(sorted(state.stats.items())))
+    except KeyboardInterrupt:
+        logger.info("Stopping")
+    finally:
+        stop.set()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
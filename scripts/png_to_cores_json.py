@@ -1,17 +1,50 @@
-import json
+import argparse
 import logging
 import math
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+import numpy as np
 from PIL import Image
 
+from ft_place_bot.utils.palette import Palette
+
 
 GREEN_ID = 11
 
 logging.basicConfig(level=logging.INFO)
 
 
+# Définition des couleurs
+COLORS = [
+    {"id": 1, "name": "white", "red": 236, "green": 240, "blue": 241},
+    {"id": 2, "name": "lightgray", "red": 165, "green": 180, "blue": 190},
+    {"id": 3, "name": "darkgray", "red": 105, "green": 121, "blue": 135},
+    {"id": 4, "name": "black", "red": 44, "green": 62, "blue": 80},
+    {"id": 5, "name": "pink", "red": 255, "green": 167, "blue": 209},
+    {"id": 18, "name": "darkred", "red": 190, "green": 0, "blue": 57},
+    {"id": 6, "name": "red", "red": 231, "green": 76, "blue": 60},
+    {"id": 7, "name": "orange", "red": 230, "green": 126, "blue": 34},
+    {"id": 8, "name": "brown", "red": 160, "green": 106, "blue": 66},
+    {"id": 17, "name": "beige", "red": 255, "green": 224, "blue": 180},
+    {"id": 9, "name": "yellow", "red": 241, "green": 196, "blue": 15},
+    {"id": 10, "name": "lime", "red": 54, "green": 222, "blue": 127},
+    {"id": 11, "name": "green", "red": 2, "green": 162, "blue": 1},
+    {"id": 12, "name": "cyan", "red": 0, "green": 211, "blue": 212},
+    {"id": 13, "name": "blue", "red": 0, "green": 152, "blue": 255},
+    {"id": 14, "name": "indigo", "red": 0, "green": 65, "blue": 176},
+    {"id": 15, "name": "magenta", "red": 207, "green": 110, "blue": 228},
+    {"id": 16, "name": "purple", "red": 155, "green": 28, "blue": 182},
+]
+
+# Id écrit pour les pixels ignorés (verts)
+SKIPPED_ID = 0
+# Nombre de lignes de l'image quantifiées puis écrites à la fois
+ROWS_PER_CHUNK = 256
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+
 def closest_color(pixel_rgb, colors):
     r, g, b = pixel_rgb
     min_distance = float("inf")
@@ -33,67 +66,90 @@ def closest_color(pixel_rgb, colors):
     return closest_id
 
 
-def convert_image(image_path, output_path):
-    # Définition des couleurs
-    colors = [
-        {"id": 1, "name": "white", "red": 236, "green": 240, "blue": 241},
-        {"id": 2, "name": "lightgray", "red": 165, "green": 180, "blue": 190},
-        {"id": 3, "name": "darkgray", "red": 105, "green": 121, "blue": 135},
-        {"id": 4, "name": "black", "red": 44, "green": 62, "blue": 80},
-        {"id": 5, "name": "pink", "red": 255, "green": 167, "blue": 209},
-        {"id": 18, "name": "darkred", "red": 190, "green": 0, "blue": 57},
-        {"id": 6, "name": "red", "red": 231, "green": 76, "blue": 60},
-        {"id": 7, "name": "orange", "red": 230, "green": 126, "blue": 34},
-        {"id": 8, "name": "brown", "red": 160, "green": 106, "blue": 66},
-        {"id": 17, "name": "beige", "red": 255, "green": 224, "blue": 180},
-        {"id": 9, "name": "yellow", "red": 241, "green": 196, "blue": 15},
-        {"id": 10, "name": "lime", "red": 54, "green": 222, "blue": 127},
-        {"id": 11, "name": "green", "red": 2, "green": 162, "blue": 1},
-        {"id": 12, "name": "cyan", "red": 0, "green": 211, "blue": 212},
-        {"id": 13, "name": "blue", "red": 0, "green": 152, "blue": 255},
-        {"id": 14, "name": "indigo", "red": 0, "green": 65, "blue": 176},
-        {"id": 15, "name": "magenta", "red": 207, "green": 110, "blue": 228},
-        {"id": 16, "name": "purple", "red": 155, "green": 28, "blue": 182},
-    ]
-
-    # Charger l'image
-    img = Image.open(image_path)
-
-    # Convertir en RGB si nécessaire
-    if img.mode != "RGB":
-        img = img.convert("RGB")
-
-    # Récupérer les dimensions de l'image source
-    width, height = img.size
-
-    # Préparer le résultat
-    result = {"width": width, "height": height, "pattern": []}
-
-    # Parcourir chaque pixel
-    for y in range(height):
-        for x in range(width):
-            pixel = img.getpixel((x, y))
-            color_id = closest_color(pixel, colors)
-
-            # Ajouter seulement si une couleur valide est trouvée (non verte)
-            if color_id is not None:
-                result["pattern"].append({"x": x, "y": y, "color": color_id})
+def closest_colors(pixels, palette, green_index):
+    """Version vectorisée de closest_color sur un tableau (N, 3), SKIPPED_ID remplaçant None."""
+    distances = palette.squared_distances(pixels)
+    color_ids = palette.color_ids[np.argmin(distances, axis=1)]
+    if green_index is not None:
+        # closest_color s'arrête dès que le vert devient le meilleur candidat, même si une couleur
+        # suivante est plus proche : le vert doit donc battre strictement toutes les couleurs d'avant
+        if green_index == 0:
+            skipped = np.ones(len(pixels), dtype=bool)
+        else:
+            skipped = distances[:, green_index] < distances[:, :green_index].min(axis=1)
+        color_ids[skipped] = SKIPPED_ID
+    return color_ids
+
+
+def write_pattern(output_file, width, height, rows):
+    """Écrit le JSON au fil de l'eau, un pixel par ligne, sans garder le motif entier en mémoire."""
+    output_file.write(f'{{"width": {width}, "height": {height}, "pattern": [')
+    separator = "\n"
+    for first_y, color_ids in rows:
+        ys, xs = np.nonzero(color_ids != SKIPPED_ID)
+        for x, y, color_id in zip(xs.tolist(), (ys + first_y).tolist(), color_ids[ys, xs].tolist()):
+            output_file.write(f'{separator}{{"x": {x}, "y": {y}, "color": {color_id}}}')
+            separator = ",\n"
+    output_file.write("\n]}\n")
+
+
+def convert_image(image_path, output_path, colors=None):
+    colors = COLORS if colors is None else colors
+    palette = Palette(
+        color_ids=[color["id"] for color in colors],
+        rgb=[(color["red"], color["green"], color["blue"]) for color in colors],
+    )
+    green_indexes = [index for index, color in enumerate(colors) if color["id"] == GREEN_ID]
+    green_index = green_indexes[0] if green_indexes else None
+
+    # Charger l'image et la convertir en RGB si nécessaire
+    with Image.open(image_path) as img:
+        pixels = np.asarray(img if img.mode == "RGB" else img.convert("RGB"))
+    height, width, _ = pixels.shape
+
+    def rows():
+        for first_y in range(0, height, ROWS_PER_CHUNK):
+            chunk = pixels[first_y : first_y + ROWS_PER_CHUNK]
+            yield first_y, closest_colors(chunk.reshape(-1, 3), palette, green_index).reshape(chunk.shape[:2])
 
     # Sauvegarder en JSON
     with open(output_path, "w") as f:
-        json.dump(result, f, indent=2)
+        write_pattern(f, width, height, rows())
+    return output_path
+
+
+def output_path_for(input_path):
+    return os.path.splitext(input_path)[0] + ".json"
+
+
+def convert_directory(directory, workers=None):
+    """Convertit toutes les images d'un dossier en parallèle."""
+    inputs = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory) if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(convert_image, path, output_path_for(path)): path for path in inputs}
+        for future in as_completed(futures):
+            logging.info("Conversion réussie ! Fichier de sortie : %s", future.result())
+    return len(inputs)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Convertit des images en motifs JSON FTPlace")
+    parser.add_argument("path", help="Image (PNG, JPG, JPEG) ou dossier d'images à convertir")
+    parser.add_argument("--workers", type=int, default=None, help="Nombre de processus en mode dossier")
+    return parser.parse_args()
 
 
 def main():
-    # Vérifier si un argument a été fourni
-    arg_count = 2
-    if len(sys.argv) != arg_count:
-        logging.info("Usage: python script.py <chemin_image.png>")
-        sys.exit(1)
+    args = parse_args()
+    input_path = args.path
 
-    # Récupérer le chemin de l'image source
-    file_argc = 1
-    input_path = sys.argv[file_argc]
+    # Mode dossier : conversion de toutes les images en parallèle
+    if os.path.isdir(input_path):
+        count = convert_directory(input_path, args.workers)
+        logging.info("%d image(s) converties", count)
+        return
 
     # Vérifier si le fichier existe
     if not os.path.exists(input_path):
@@ -101,12 +157,12 @@ def main():
         sys.exit(1)
 
     # Vérifier l'extension du fichier
-    if not input_path.lower().endswith((".png", ".jpg", ".jpeg")):
+    if not input_path.lower().endswith(IMAGE_EXTENSIONS):
         logging.info("Erreur: Le fichier doit être une image (PNG, JPG, JPEG)")
         sys.exit(1)
 
     # Créer le nom du fichier de sortie
-    output_path = os.path.splitext(input_path)[0] + ".json"
+    output_path = output_path_for(input_path)
 
     convert_image(input_path, output_path)
     logging.info("Conversion réussie ! Fichier de sortie : %s", output_path)
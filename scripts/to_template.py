@@ -0,0 +1,49 @@
+import argparse
+import logging
+import os
+import sys
+
+from scripts.png_to_cores_json import COLORS
+
+from ft_place_bot.core import FTPlaceError
+from ft_place_bot.utils import Palette, Template
+from ft_place_bot.utils.template import TEMPLATE_EXTENSION
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Convert an image or a pattern JSON to a compact template file")
+    parser.add_argument("input_path", help="Image (PNG, JPG, JPEG) or pattern JSON to convert")
+    parser.add_argument("--origin", type=int, nargs=2, default=(0, 0), metavar=("X", "Y"), help="Board origin")
+    parser.add_argument("--output", help=f"Output path, defaults to the input path with a {TEMPLATE_EXTENSION} suffix")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    output_path = args.output or os.path.splitext(args.input_path)[0] + TEMPLATE_EXTENSION
+    palette = Palette(
+        color_ids=[color["id"] for color in COLORS],
+        rgb=[(color["red"], color["green"], color["blue"]) for color in COLORS],
+    )
+    try:
+        template = Template.open(args.input_path, palette)
+    except FTPlaceError as e:
+        logger.error("Conversion failed: %s", str(e))
+        sys.exit(1)
+    template.origin_x, template.origin_y = args.origin
+    template.save(output_path)
+    logger.info(
+        "Template written to %s (%dx%d, %d bytes)",
+        output_path,
+        template.width,
+        template.height,
+        os.path.getsize(output_path),
+    )
+
+
+if __name__ == "__main__":
+    main()
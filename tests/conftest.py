@@ -0,0 +1,23 @@
+import pytest
+
+from ft_place_bot.core import UserProfile
+
+
+@pytest.fixture
+def make_profile():
+    """Factory for the UserProfile the server would return, one idle pixel and no token times by default"""
+
+    def make(pixel_buffer=1, timers=(), iat=0, exp=0):
+        return UserProfile(
+            timers=list(timers),
+            pixel_buffer=pixel_buffer,
+            pixel_timer=10,
+            id=1,
+            username="bot",
+            is_admin=False,
+            is_banned=False,
+            iat=iat,
+            exp=exp,
+        )
+
+    return make
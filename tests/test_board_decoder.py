@@ -0,0 +1,106 @@
+import json
+
+import numpy as np
+import pytest
+
+from scripts.bench_board_decode import decode_legacy, make_payload
+
+from ft_place_bot.client.board_decoder import BoardDecoder
+from ft_place_bot.core import BoardRegion
+
+
+@pytest.mark.parametrize(("width", "height"), [(1, 1), (7, 3), (40, 40)])
+def test_decode_matches_json(width, height):
+    payload, colors = make_payload(width, height, seed=width)
+
+    board = BoardDecoder().decode(payload)
+
+    np.testing.assert_array_equal(board, decode_legacy(payload))
+    np.testing.assert_array_equal(board, colors)
+
+
+@pytest.mark.parametrize("region", [BoardRegion(0, 0, 40, 40), BoardRegion(5, 7, 10, 3), BoardRegion(35, 30, 20, 20)])
+def test_decode_region_matches_json(region):
+    payload, _ = make_payload(40, 40)
+
+    board = BoardDecoder().decode(payload, region)
+
+    expected = decode_legacy(payload)[region.x : region.x + region.width, region.y : region.y + region.height]
+    np.testing.assert_array_equal(board, expected)
+
+
+def test_decode_pretty_printed_payload():
+    payload, colors = make_payload(5, 4)
+    pretty = json.dumps(json.loads(payload), indent=2).encode()
+
+    np.testing.assert_array_equal(BoardDecoder().decode(pretty), colors)
+
+
+@pytest.mark.parametrize("region", [None, BoardRegion(0, 0, 2, 2)])
+@pytest.mark.parametrize("username", ["x}]]", "x}]", "[{", "}],[{"])
+def test_decode_brackets_in_strings(username, region):
+    board = [[{"username": username, "color_id": 3}, {"username": "y", "color_id": 4}], [{"color_id": 5}] * 2]
+    payload = json.dumps({"board": board}, separators=(",", ":")).encode()
+
+    decoded = BoardDecoder().decode(payload, region)
+
+    np.testing.assert_array_equal(decoded, [[3, 4], [5, 5]])
+
+
+def test_decode_string_closing_the_board():
+    payload = b'{"board":[[{"username":"x}]]","color_id":3}]]}'
+
+    np.testing.assert_array_equal(BoardDecoder().decode(payload), [[3]])
+
+
+# Pieces of the fuzzed strings: JSON delimiters, keys and characters that need escaping
+STRING_PIECES = (
+    "[",
+    "]",
+    "{",
+    "}",
+    "[{",
+    "}]",
+    "}],",
+    '"color_id":',
+    '"color_id": 7',
+    '"board":[',
+    '"',
+    "\\",
+    ",",
+    "x",
+)
+FUZZ_CASES = 300
+
+
+def _fuzzed_payload(rng):
+    def text():
+        return "".join(rng.choice(STRING_PIECES, rng.integers(0, 6)).tolist())
+
+    width, height = rng.integers(1, 6, 2).tolist()
+    colors = rng.integers(0, 256, (width, height))
+    board = []
+    for row in colors.tolist():
+        cells = []
+        for color_id in row:
+            cell = {"username": text(), "color_id": color_id, "set_time": text()}
+            cells.append(dict(reversed(cell.items())) if rng.integers(2) else cell)
+        board.append(cells)
+    separators = (",", ":") if rng.integers(2) else (", ", ": ")
+    return json.dumps({"motd": text(), "board": board, "colors": [text()]}, separators=separators).encode(), colors
+
+
+def test_decode_fuzzed_strings():
+    rng = np.random.default_rng(0)
+    for _ in range(FUZZ_CASES):
+        payload, colors = _fuzzed_payload(rng)
+        # Regions may start past the last row or column
+        x, y = (rng.integers(0, size + 2).item() for size in colors.shape)
+        region = BoardRegion(x, y, *rng.integers(1, 7, 2).tolist())
+
+        np.testing.assert_array_equal(BoardDecoder().decode(payload), colors, err_msg=payload.decode())
+        np.testing.assert_array_equal(
+            BoardDecoder().decode(payload, region),
+            colors[region.x : region.x + region.width, region.y : region.y + region.height],
+            err_msg=f"{region} {payload.decode()}",
+        )
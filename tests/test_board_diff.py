@@ -0,0 +1,164 @@
+import numpy as np
+import pytest
+
+from ft_place_bot.core import BoardDiffTracker, ColorConfig, ColorPriority, ColorSet
+from ft_place_bot.core.board_diff import diff_board, overlap_slices
+from ft_place_bot.core.color_config import DEFAULT_PRIORITY, TRANSPARENT_COLOR_ID
+
+
+COLORS = 20
+BOARD_SHAPE = (40, 30)
+CASES = 50
+SNAPSHOTS = 15
+TILE_SIZE = 8
+# Every that many snapshots a whole block of the board is repainted
+REPAINT_INTERVAL = 5
+BLOCK = 10
+
+
+def _random_config(rng):
+    """Config with overlapping color sets and priorities, so the first matching entry has to win"""
+    return ColorConfig(
+        priorities=[
+            ColorPriority(priority_level=int(level), color_ids=set(rng.integers(0, COLORS, 5).tolist()))
+            for level in rng.integers(0, 4, 3)
+        ],
+        ignored_source_colors=set(rng.integers(0, COLORS, 2).tolist()),
+        ignored_board_colors=set(rng.integers(0, COLORS, 2).tolist()),
+        color_sets=[
+            ColorSet(main_color=int(main), similar_colors=set(rng.integers(0, COLORS, 4).tolist()))
+            for main in rng.integers(0, COLORS, 3)
+        ],
+    )
+
+
+def _reference_diff(board, target, origin_x, origin_y, config):
+    """Per cell loop over the ColorConfig methods, as the monitor compared boards before the lookup tables"""
+    total, incorrect = 0, []
+    for target_x in range(target.shape[0]):
+        for target_y in range(target.shape[1]):
+            x, y = origin_x + target_x, origin_y + target_y
+            if not (0 <= x < board.shape[0] and 0 <= y < board.shape[1]):
+                continue
+            wanted, current = int(target[target_x, target_y]), int(board[x, y])
+            if wanted == TRANSPARENT_COLOR_ID or config.should_ignore_source(wanted):
+                continue
+            if config.should_ignore_board(current):
+                continue
+            total += 1
+            if config.get_main_color(wanted) != config.get_main_color(current):
+                priority = config.get_priority_level(wanted) or DEFAULT_PRIORITY
+                incorrect.append((x, y, current, wanted, priority))
+    return total, sorted(incorrect)
+
+
+def _pixels(diff):
+    columns = (diff.x, diff.y, diff.current_color, diff.target_color, diff.priority)
+    return sorted(zip(*(column.tolist() for column in columns)))
+
+
+def _random_case(rng):
+    board = rng.integers(0, COLORS, BOARD_SHAPE, dtype=np.uint8)
+    target = rng.integers(0, COLORS, tuple(rng.integers(1, 25, 2)), dtype=np.uint8)
+    # Origins reaching past every edge of the board
+    origin_x = int(rng.integers(-target.shape[0], BOARD_SHAPE[0] + 2))
+    origin_y = int(rng.integers(-target.shape[1], BOARD_SHAPE[1] + 2))
+    return board, target, origin_x, origin_y
+
+
+@pytest.mark.parametrize("seed", range(CASES))
+def test_diff_board_matches_reference_loop(seed):
+    rng = np.random.default_rng(seed)
+    config = _random_config(rng)
+    board, target, origin_x, origin_y = _random_case(rng)
+
+    diff = diff_board(board, target, origin_x, origin_y, config.compile())
+
+    total, incorrect = _reference_diff(board, target, origin_x, origin_y, config)
+    assert (diff.total_pixels, diff.incorrect_pixels, diff.correct_pixels) == (
+        total,
+        len(incorrect),
+        total - len(incorrect),
+    )
+    assert _pixels(diff) == incorrect
+
+
+def test_priority_zero_falls_back_to_default():
+    config = ColorConfig([ColorPriority(0, {3}), ColorPriority(2, {3, 4})], set(), set(), [])
+    board = np.ones((2, 1), dtype=np.uint8)
+    target = np.array([[3], [4]], dtype=np.uint8)
+
+    diff = diff_board(board, target, 0, 0, config.compile())
+
+    assert diff.priority.tolist() == [DEFAULT_PRIORITY, 2]
+
+
+def _snapshots(rng, board):
+    """Successive boards, each a few cells or a whole block apart from the previous one"""
+    for index in range(SNAPSHOTS):
+        board = board.copy()
+        if (index + 1) % REPAINT_INTERVAL == 0:
+            x, y = rng.integers(0, BOARD_SHAPE[0] - BLOCK), rng.integers(0, BOARD_SHAPE[1] - BLOCK)
+            board[x : x + BLOCK, y : y + BLOCK] = rng.integers(0, COLORS, (BLOCK, BLOCK))
+        else:
+            changed = int(rng.integers(0, 6))
+            board.reshape(-1)[rng.choice(board.size, changed, replace=False)] = rng.integers(0, COLORS, changed)
+        yield board
+
+
+@pytest.mark.parametrize("seed", range(CASES // REPAINT_INTERVAL))
+def test_tracker_partial_updates_match_full_diff(seed):
+    rng = np.random.default_rng(seed)
+    config = _random_config(rng)
+    tables = config.compile()
+    board, target, origin_x, origin_y = _random_case(rng)
+    tracker = BoardDiffTracker(target, origin_x, origin_y, tables)
+    tracker.tile_size = TILE_SIZE
+    tracker.update(board)
+
+    for snapshot in _snapshots(rng, board):
+        diff = tracker.update(snapshot)
+
+        assert tracker.changed_tiles is not None
+        expected = diff_board(snapshot, target, origin_x, origin_y, tables)
+        assert (diff.total_pixels, diff.incorrect_pixels) == (expected.total_pixels, expected.incorrect_pixels)
+        assert _pixels(diff) == _pixels(expected)
+
+
+def _changed_tiles(previous, board, target, origin_x, origin_y):
+    """Tiles of the target window holding a cell that differs between two boards"""
+    _, _, board_x, board_y = overlap_slices(target.shape, board.shape, origin_x, origin_y)
+    xs, ys = np.nonzero(previous[board_x, board_y] != board[board_x, board_y])
+    tiles = (-(-(board_x.stop - board_x.start) // TILE_SIZE), -(-(board_y.stop - board_y.start) // TILE_SIZE))
+    changed = np.zeros(tiles, dtype=np.bool_)
+    changed[xs // TILE_SIZE, ys // TILE_SIZE] = True
+    return changed
+
+
+@pytest.mark.parametrize("seed", range(CASES // REPAINT_INTERVAL))
+def test_tracker_tiles_match_full_recompute(seed):
+    rng = np.random.default_rng(seed)
+    tables = _random_config(rng).compile()
+    board, target, origin_x, origin_y = _random_case(rng)
+    tracker = BoardDiffTracker(target, origin_x, origin_y, tables)
+    tracker.tile_size = TILE_SIZE
+    tracker.update(board)
+
+    previous = board
+    for snapshot in _snapshots(rng, board):
+        diff = tracker.update(snapshot)
+        fresh = BoardDiffTracker(target, origin_x, origin_y, tables)
+        fresh.tile_size = TILE_SIZE
+        fresh.update(snapshot)
+
+        np.testing.assert_array_equal(
+            tracker.changed_tiles, _changed_tiles(previous, snapshot, target, origin_x, origin_y)
+        )
+        np.testing.assert_array_equal(tracker.tile_total, fresh.tile_total)
+        np.testing.assert_array_equal(tracker.tile_incorrect, fresh.tile_incorrect)
+        assert tracker.tile_stats() == fresh.tile_stats()
+        _, _, board_x, board_y = overlap_slices(target.shape, snapshot.shape, origin_x, origin_y)
+        tile_x, tile_y = (diff.x - board_x.start) // TILE_SIZE, (diff.y - board_y.start) // TILE_SIZE
+        tiles = tile_x * tracker.tiles[1] + tile_y
+        np.testing.assert_array_equal(diff.tile, tiles)
+        previous = snapshot
@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from ft_place_bot.core import BoardHistory, BoardRegion, FTPlaceError
+
+
+REGION = BoardRegion(3, 4, 32, 24)
+# Every that many frames half of the board is repainted, which is stored as a XOR delta
+REPAINT_INTERVAL = 7
+MAX_FRAMES = 10
+
+
+def _boards(count, seed=0, shape=(32, 24)):
+    """Successive boards, mostly a few changed cells apart and sometimes a large repaint"""
+    rng = np.random.default_rng(seed)
+    board = rng.integers(1, 19, shape, dtype=np.uint8)
+    boards = []
+    for index in range(count):
+        board = board.copy()
+        changed = board.size // 2 if (index + 1) % REPAINT_INTERVAL == 0 else 5
+        board.reshape(-1)[rng.choice(board.size, changed, replace=False)] = rng.integers(1, 19, changed)
+        boards.append(board)
+    return boards
+
+
+def _record(history, boards, start=0.0):
+    for index, board in enumerate(boards):
+        history.append(board, REGION, start + index)
+
+
+def test_replay_returns_every_frame(tmp_path):
+    boards = _boards(20)
+    history = BoardHistory(tmp_path, keyframe_interval=8)
+    _record(history, boards)
+
+    frames = list(history)
+
+    assert len(history) == len(boards)
+    assert [timestamp for timestamp, _, _ in frames] == list(range(len(boards)))
+    assert all(region == REGION for _, region, _ in frames)
+    for (_, _, board), expected in zip(frames, boards):
+        np.testing.assert_array_equal(board, expected)
+    history.close()
+
+
+def test_frame_and_at_rebuild_from_keyframe(tmp_path):
+    boards = _boards(20)
+    history = BoardHistory(tmp_path, keyframe_interval=8)
+    _record(history, boards, start=100.0)
+
+    np.testing.assert_array_equal(history.frame(13)[2], boards[13])
+    np.testing.assert_array_equal(history.frame(-1)[2], boards[-1])
+    np.testing.assert_array_equal(history.at(105.5)[2], boards[5])
+    assert history.at(99.0) is None
+    with pytest.raises(IndexError):
+        history.frame(len(boards))
+    history.close()
+
+
+def test_eviction_by_frame_count_keeps_replayable_frames(tmp_path):
+    boards = _boards(30)
+    history = BoardHistory(tmp_path, max_frames=MAX_FRAMES, keyframe_interval=4)
+    _record(history, boards)
+
+    frames = list(history)
+
+    assert 0 < len(frames) <= MAX_FRAMES
+    first = int(frames[0][0])
+    for timestamp, _, board in frames:
+        np.testing.assert_array_equal(board, boards[int(timestamp)])
+    assert [int(timestamp) for timestamp, _, _ in frames] == list(range(first, len(boards)))
+    history.close()
+
+
+def test_data_wrap_keeps_replayable_frames(tmp_path):
+    boards = _boards(60)
+    history = BoardHistory(tmp_path, max_bytes=8 << 10, keyframe_interval=5)
+    _record(history, boards)
+
+    frames = list(history)
+
+    assert 0 < len(frames) < len(boards)
+    for timestamp, _, board in frames:
+        np.testing.assert_array_equal(board, boards[int(timestamp)])
+    assert int(frames[-1][0]) == len(boards) - 1
+    history.close()
+
+
+def test_reopen_resumes_after_last_frame(tmp_path):
+    boards = _boards(12)
+    history = BoardHistory(tmp_path, max_frames=MAX_FRAMES * 2, max_bytes=1 << 20)
+    _record(history, boards[:6])
+    history.close()
+
+    reopened = BoardHistory(tmp_path, max_frames=MAX_FRAMES)
+    _record(reopened, boards[6:], start=6.0)
+
+    assert reopened.max_frames == MAX_FRAMES * 2
+    for timestamp, _, board in reopened:
+        np.testing.assert_array_equal(board, boards[int(timestamp)])
+    reopened.close()
+
+
+def test_shape_change_starts_a_keyframe(tmp_path):
+    history = BoardHistory(tmp_path)
+    small, large = _boards(1, shape=(8, 8))[0], _boards(1, shape=(16, 8))[0]
+    history.append(small, BoardRegion(0, 0, 8, 8), 1.0)
+    history.append(large, BoardRegion(0, 0, 16, 8), 2.0)
+
+    frames = list(history)
+
+    np.testing.assert_array_equal(frames[0][2], small)
+    np.testing.assert_array_equal(frames[1][2], large)
+    history.close()
+
+
+def test_region_change_starts_a_keyframe(tmp_path):
+    history = BoardHistory(tmp_path, max_frames=2)
+    first, second = _boards(2, shape=(8, 8))
+    history.append(first, BoardRegion(0, 0, 8, 8), 1.0)
+    history.append(second, BoardRegion(4, 0, 8, 8), 2.0)
+    # Evicts the first frame, the second one only survives it as a keyframe
+    history.append(second, BoardRegion(4, 0, 8, 8), 3.0)
+
+    frames = list(history)
+
+    assert [timestamp for timestamp, _, _ in frames] == [2.0, 3.0]
+    np.testing.assert_array_equal(frames[0][2], second)
+    history.close()
+
+
+def test_not_a_history(tmp_path):
+    (tmp_path / "index.bin").write_bytes(b"\0" * 64)
+
+    with pytest.raises(FTPlaceError):
+        BoardHistory(tmp_path)
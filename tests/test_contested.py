@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from ft_place_bot.core import BoardRegion, ContestedPixels
+
+
+REGION = BoardRegion(10, 20, 4, 3)
+HALF_LIFE = 60.0
+WINDOW = 30.0
+COLOR = 7
+
+
+def _heat(contested, x, y):
+    return float(contested.heat_at(np.array([x]), np.array([y]))[0])
+
+
+def test_overwrites_heat_up_and_decay():
+    contested = ContestedPixels(half_life=HALF_LIFE)
+    board = np.ones((4, 3), dtype=np.uint8)
+    contested.update(board, REGION, 0.0)
+
+    board = board.copy()
+    board[1, 2] = COLOR
+    contested.update(board, REGION, 0.0)
+    assert _heat(contested, 11, 22) == 1.0
+    assert _heat(contested, 10, 20) == 0.0
+
+    contested.update(board, REGION, HALF_LIFE)
+    assert _heat(contested, 11, 22) == pytest.approx(0.5)
+    assert contested.mean_lifetime == pytest.approx(HALF_LIFE / np.log(2))
+
+
+def test_own_placements_are_not_overwrites():
+    contested = ContestedPixels()
+    board = np.ones((4, 3), dtype=np.uint8)
+    contested.update(board, REGION, 0.0)
+
+    contested.mark_placed(12, 21, COLOR, 1.0)
+    board = board.copy()
+    board[2, 1] = COLOR
+    board[0, 0] = COLOR
+    contested.update(board, REGION, 2.0)
+
+    assert _heat(contested, 12, 21) == 0.0
+    assert _heat(contested, 10, 20) == 1.0
+
+
+def test_heat_is_zero_outside_and_resets_on_region_change():
+    contested = ContestedPixels()
+    contested.update(np.ones((4, 3), dtype=np.uint8), REGION, 0.0)
+    contested.update(np.full((4, 3), COLOR, dtype=np.uint8), REGION, 1.0)
+
+    assert _heat(contested, 0, 0) == 0.0
+    assert _heat(contested, 10, 20) == 1.0
+
+    contested.update(np.ones((4, 3), dtype=np.uint8), BoardRegion(11, 20, 4, 3), 2.0)
+    assert _heat(contested, 11, 20) == 0.0
+
+
+def test_survival_counts_placements_once_the_window_is_over():
+    contested = ContestedPixels(survival_window=WINDOW)
+    board = np.ones((4, 3), dtype=np.uint8)
+    contested.update(board, REGION, 0.0)
+    contested.mark_placed(10, 20, COLOR, 1.0)
+    contested.mark_placed(11, 20, COLOR, 1.0)
+    # Outside of the region, never checked
+    contested.mark_placed(0, 0, COLOR, 1.0)
+    board = board.copy()
+    board[0, 0] = board[1, 0] = COLOR
+
+    assert contested.update(board, REGION, 2.0) == (0, 0)
+    assert contested.survival_ratio is None
+
+    board = board.copy()
+    board[1, 0] = 1
+    assert contested.update(board, REGION, 1.0 + WINDOW) == (2, 1)
+    assert contested.survival_ratio == pytest.approx(0.5)
+    assert contested.update(board, REGION, 2 * WINDOW) == (0, 0)
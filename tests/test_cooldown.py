@@ -0,0 +1,115 @@
+import math
+import time
+from datetime import datetime, timezone
+from email.utils import formatdate
+
+import pytest
+
+from ft_place_bot.config import HTTPStatus
+from ft_place_bot.core import ClockOffset, CooldownTracker, PlacementResult
+
+
+# Seconds the server clock is ahead of ours in the clock tests
+SKEW = 100.3
+BUFFER = 3
+
+
+def _timer(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def test_clock_offset_intersects_bounds():
+    clock = ClockOffset()
+    assert clock.bounds() is None
+    assert clock.offset == 0.0
+
+    # Date headers name the whole second, requests take 0.2 s
+    for local in (1000.0, 1000.45, 1000.9):
+        clock.observe(formatdate(math.floor(local + SKEW), usegmt=True), local, local + 0.2)
+
+    lower, upper = clock.bounds()
+    assert lower <= SKEW <= upper
+    assert upper - lower < 1.0
+
+
+def test_clock_offset_ignores_missing_or_invalid_dates():
+    clock = ClockOffset()
+    clock.observe(None, 0.0, 0.1)
+    clock.observe("not a date", 0.0, 0.1)
+
+    assert clock.bounds() is None
+
+
+def test_clock_offset_keeps_latest_after_a_jump():
+    clock = ClockOffset()
+    clock.observe(formatdate(2000, usegmt=True), 1000.0, 1000.1)
+    clock.observe(formatdate(5000, usegmt=True), 1001.0, 1001.1)
+
+    lower, upper = clock.bounds()
+    assert lower == pytest.approx(5000 - 1001.1)
+    assert upper == pytest.approx(5001 - 1001.0)
+
+
+def test_monotonic_deadline_uses_lowest_offset():
+    clock = ClockOffset()
+    now = time.time()
+    clock.observe(formatdate(math.floor(now + 50), usegmt=True), now, now)
+    lower, _ = clock.bounds()
+
+    deadline = clock.monotonic_deadline(now + 60)
+
+    assert deadline - time.monotonic() == pytest.approx(60 - lower, abs=0.05)
+
+
+def test_profile_without_timers_has_whole_buffer(make_profile):
+    tracker = CooldownTracker()
+    tracker.observe_profile(make_profile(BUFFER))
+
+    assert tracker.available_pixels() == BUFFER
+    assert tracker.known
+    assert tracker.ready_at() <= time.monotonic()
+
+
+def test_placements_use_buffer_slots(make_profile):
+    tracker = CooldownTracker()
+    tracker.observe_profile(make_profile(2))
+    later = _timer(time.time() + 30)
+
+    tracker.observe_placement(PlacementResult(HTTPStatus.SUCCESS_201.value, True, [later]))
+    assert tracker.available_pixels() == 1
+
+    tracker.observe_placement(PlacementResult(HTTPStatus.SUCCESS_201.value, True, [later, later]))
+    assert tracker.available_pixels() == 0
+    assert tracker.ready_at() - time.monotonic() == pytest.approx(30, abs=1.5)
+
+
+def test_placement_without_timers_is_unknown(make_profile):
+    tracker = CooldownTracker()
+    tracker.observe_profile(make_profile(1))
+
+    tracker.observe_placement(PlacementResult(HTTPStatus.SUCCESS_201.value, True, []))
+
+    assert tracker.available_pixels() == 0
+    assert not tracker.known
+
+
+def test_too_early_fills_the_buffer(make_profile):
+    tracker = CooldownTracker()
+    tracker.observe_profile(make_profile(BUFFER))
+    soon, later = _timer(time.time() + 5), _timer(time.time() + 20)
+
+    tracker.observe_placement(PlacementResult(HTTPStatus.TOO_EARLY.value, False, [later, soon]))
+
+    assert tracker.available_pixels() == 0
+    assert tracker.ready_at() - time.monotonic() == pytest.approx(5, abs=1.5)
+
+
+def test_ready_at_reads_the_server_clock_once(make_profile, monkeypatch):
+    tracker = CooldownTracker()
+    now = time.time()
+    tracker.observe_profile(make_profile(1, timers=[_timer(now + 5)]))
+    # The timer runs out between a first and a second reading
+    readings = iter([now, now + 10])
+    monkeypatch.setattr(tracker.clock, "server_time", lambda: next(readings))
+
+    assert tracker.ready_at() - time.monotonic() == pytest.approx(5, abs=1.5)
@@ -0,0 +1,85 @@
+import pytest
+import requests
+
+from ft_place_bot.config import HTTPStatus
+from ft_place_bot.core import BotMetrics, serve_metrics
+from ft_place_bot.core.metrics import PROMETHEUS_CONTENT_TYPE, Counter, Gauge, Histogram
+
+
+NOT_FOUND = 404
+WAITS = (0.2, 0.5, 0.7, 3.0)
+
+
+def test_counter_renders_one_sample_per_label_set():
+    counter = Counter("requests_total", "Requests by path", ["path"])
+    counter.inc(path="/b")
+    counter.inc(2.5, path='/a"\n')
+
+    assert counter.render().splitlines() == [
+        "# HELP requests_total Requests by path",
+        "# TYPE requests_total counter",
+        'requests_total{path="/a\\"\\n"} 2.5',
+        'requests_total{path="/b"} 1',
+    ]
+
+
+def test_labels_must_match_the_label_names():
+    counter = Counter("requests_total", "Requests by path", ["path"])
+
+    with pytest.raises(ValueError, match="expects labels"):
+        counter.inc(method="GET")
+
+
+def test_gauge_keeps_the_last_value():
+    gauge = Gauge("depth", "Queue depth")
+    gauge.set(3)
+    gauge.set(1.25)
+
+    assert gauge.render().splitlines()[1:] == ["# TYPE depth gauge", "depth 1.25"]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("wait_seconds", "Waits", buckets=(1.0, 0.5))
+    for value in WAITS:
+        histogram.observe(value)
+
+    assert histogram.count == len(WAITS)
+    assert histogram.samples() == [
+        'wait_seconds_bucket{le="0.5"} 2',
+        'wait_seconds_bucket{le="1"} 3',
+        'wait_seconds_bucket{le="+Inf"} 4',
+        "wait_seconds_sum 4.4",
+        "wait_seconds_count 4",
+    ]
+
+
+def test_placements_are_counted_by_outcome():
+    metrics = BotMetrics()
+    for status_code in (HTTPStatus.SUCCESS_201.value, HTTPStatus.TOO_EARLY.value, None, HTTPStatus.TOKEN_EXPIRED.value):
+        metrics.record_placement(status_code)
+
+    outcomes = ("success", "too_early", "error", "token_expired")
+    assert [metrics.placements.value(outcome=outcome) for outcome in outcomes] == [1, 1, 1, 1]
+    metrics.record_placement(HTTPStatus.SUCCESS_204.value)
+    assert 'ftplace_placements_total{outcome="success"} 2' in metrics.render()
+
+
+def test_endpoint_serves_every_metric():
+    metrics = BotMetrics()
+    metrics.queue_depth.set(12)
+    server = serve_metrics(metrics, 0)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        response = requests.get(f"{url}/metrics", timeout=5)
+        missing = requests.get(f"{url}/other", timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    body = response.text
+    assert response.headers["Content-Type"] == PROMETHEUS_CONTENT_TYPE
+    assert body == metrics.render()
+    assert body.endswith("\n")
+    assert "ftplace_queue_depth 12\n" in body
+    assert all(f"# TYPE {metric.name} {metric.kind}" in body for metric in metrics.metrics)
+    assert missing.status_code == NOT_FOUND
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from ft_place_bot.core import BoardRegion, ColorConfig, ColorSet, MonitoredTarget, TargetComposite
+
+
+SIZE = 4
+# Colors of the two targets, and a shade the first one accepts in place of its own
+FIRST, SECOND, SHADE = 2, 3, 5
+
+
+def _config(color_sets=()):
+    return ColorConfig([], set(), set(), list(color_sets))
+
+
+def _target(color, origin, weight=1.0, color_sets=()):
+    colors = np.full((SIZE, SIZE), color, dtype=np.uint8)
+    return MonitoredTarget(colors, origin[0], origin[1], _config(color_sets), weight)
+
+
+def test_highest_weight_owns_the_overlap():
+    composite = TargetComposite([_target(FIRST, (0, 0)), _target(SECOND, (2, 2), weight=2.0)])
+
+    assert composite.region == BoardRegion(0, 0, 6, 6)
+    assert (composite.owner[2:4, 2:4] == 1).all()
+    assert composite.owner[1, 1] == 0
+    # Cells outside both targets belong to the block ignoring every color
+    assert composite.owner[0, 5] == len(composite.targets)
+
+
+def test_equal_weights_go_to_the_first_target():
+    composite = TargetComposite([_target(SECOND, (2, 2)), _target(FIRST, (0, 0))])
+
+    assert (composite.owner[2:4, 2:4] == 0).all()
+
+
+def test_ignored_pixels_fall_through_to_the_target_below():
+    below, above = _target(FIRST, (0, 0)), _target(SECOND, (2, 2), weight=2.0)
+    above.target_colors[0, 0] = 0
+
+    composite = TargetComposite([below, above])
+
+    assert composite.owner[2, 2] == 0
+    assert composite.owner[3, 3] == 1
+
+
+def test_diff_uses_the_tables_and_weight_of_each_owner():
+    composite = TargetComposite(
+        [_target(FIRST, (0, 0), color_sets=[ColorSet(FIRST, {SHADE})]), _target(SECOND, (2, 2), weight=2.0)]
+    )
+    board = np.full((8, 8), SHADE, dtype=np.uint8)
+
+    diff = composite.with_weights(composite.tracker().update(board))
+
+    # The shade only passes on the first target, whose overlap with the second one is lost
+    assert diff.total_pixels == 2 * SIZE * SIZE - SIZE
+    assert diff.incorrect_pixels == SIZE * SIZE
+    assert set(diff.target_color.tolist()) == {SECOND}
+    assert set(zip(diff.x.tolist(), diff.y.tolist())) == {(x, y) for x in range(2, 6) for y in range(2, 6)}
+    assert set(diff.weight.tolist()) == {2.0}
+    assert set(composite.owners(diff).tolist()) == {1}
+
+
+def test_no_target():
+    with pytest.raises(ValueError, match="No target"):
+        TargetComposite([])
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from ft_place_bot.utils import ColorManager, Palette
+
+
+PIXELS = 3000
+PALETTES = 20
+
+
+def _board_data(rgb, color_ids=None):
+    color_ids = range(1, len(rgb) + 1) if color_ids is None else color_ids
+    colors = [
+        {"id": color_id, "red": red, "green": green, "blue": blue}
+        for color_id, (red, green, blue) in zip(color_ids, rgb)
+    ]
+    return {"colors": colors}
+
+
+def _reference(image, board_data):
+    rows = [[ColorManager.find_closest_color(tuple(pixel), board_data) for pixel in row] for row in image.tolist()]
+    return np.array(rows, dtype=np.int32).reshape(image.shape[:2])
+
+
+def _random_palette(rng):
+    """Palette with duplicated colors under other ids, and pairs of colors some pixels lie halfway between"""
+    rgb = rng.integers(0, 256, (int(rng.integers(2, 12)), 3))
+    rgb = np.concatenate([rgb, rgb[rng.integers(0, rgb.shape[0], 2)]])
+    rgb[-1] = np.minimum(rgb[0] + 2 * rng.integers(0, 3, 3), 255)
+    color_ids = rng.permutation(np.arange(1, 50))[: rgb.shape[0]]
+    return _board_data(rgb.tolist(), color_ids.tolist())
+
+
+def _pixels(rng, board_data, count=PIXELS):
+    rgb = np.array([(color["red"], color["green"], color["blue"]) for color in board_data["colors"]])
+    pairs = rng.integers(0, rgb.shape[0], (count // 3, 2))
+    # Halfway between two palette colors, an exact tie when their sum is even
+    halfway = (rgb[pairs[:, 0]] + rgb[pairs[:, 1]]) // 2
+    pixels = np.concatenate([rng.integers(0, 256, (count - halfway.shape[0] - rgb.shape[0], 3)), halfway, rgb])
+    return pixels.reshape(-1, 1, 3).astype(np.uint8)
+
+
+@pytest.mark.parametrize("seed", range(PALETTES))
+def test_quantize_matches_find_closest_color(seed):
+    rng = np.random.default_rng(seed)
+    board_data = _random_palette(rng)
+    image = _pixels(rng, board_data)
+
+    quantized = Palette.from_board_data(board_data).quantize(image)
+
+    np.testing.assert_array_equal(quantized, _reference(image, board_data))
+
+
+def test_ties_go_to_the_first_color():
+    board_data = _board_data([(0, 0, 0), (2, 0, 0), (2, 0, 0)], [7, 3, 5])
+    image = np.array([[[1, 0, 0], [2, 0, 0], [0, 0, 0]]], dtype=np.uint8)
+
+    quantized = Palette.from_board_data(board_data).quantize(image)
+
+    np.testing.assert_array_equal(quantized, [[7, 3, 7]])
+    np.testing.assert_array_equal(quantized, _reference(image, board_data))
+
+
+def test_lookup_cube_matches_find_closest_color():
+    rng = np.random.default_rng(PALETTES)
+    board_data = _random_palette(rng)
+    image = np.concatenate([_pixels(rng, board_data), rng.integers(0, 256, (PIXELS, 1, 3), dtype=np.uint8)])
+    palette = Palette.from_board_data(board_data)
+
+    quantized = palette.quantize(image, use_lookup_cube=True)
+
+    assert palette.has_lookup_cube
+    np.testing.assert_array_equal(quantized, _reference(image, board_data))
+    np.testing.assert_array_equal(quantized, palette.quantize(image))
+
+
+def test_empty_palette_matches_find_closest_color():
+    board_data = _board_data([])
+    image = np.zeros((2, 2, 3), dtype=np.uint8)
+
+    np.testing.assert_array_equal(Palette.from_board_data(board_data).quantize(image), _reference(image, board_data))
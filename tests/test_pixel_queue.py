@@ -0,0 +1,90 @@
+import numpy as np
+
+from ft_place_bot.core import BoardDiffTracker, ColorConfig, PixelQueue
+from ft_place_bot.core.board_diff import BoardDiff
+
+
+def _diff(priority, weight=None):
+    priority = np.asarray(priority, dtype=np.int16)
+    size = priority.size
+    return BoardDiff(
+        total_pixels=size,
+        correct_pixels=0,
+        incorrect_pixels=size,
+        x=np.arange(size, dtype=np.intp),
+        y=np.zeros(size, dtype=np.intp),
+        current_color=np.ones(size, dtype=np.int16),
+        target_color=np.full(size, 2, dtype=np.int16),
+        priority=priority,
+        weight=None if weight is None else np.asarray(weight, dtype=np.float64),
+    )
+
+
+def _tiebreaks(queue):
+    tiebreaks = queue.keys & np.uint64(0xFFFFFFFF)
+    return dict(zip(zip(queue.x.tolist(), queue.y.tolist()), tiebreaks.tolist()))
+
+
+def test_top_orders_by_priority_then_weight():
+    queue = PixelQueue(seed=0)
+    queue.update(_diff([3, 1, 2, 1, 1], weight=[1.0, 1.0, 5.0, 5.0, 1.0]))
+
+    order = [pixel.x for pixel in queue.top(5)]
+    assert order[:1] == [3]
+    assert set(order[1:3]) == {1, 4}
+    assert order[3:] == [2, 0]
+
+
+def test_penalty_ranks_between_levels():
+    queue = PixelQueue(seed=0)
+    queue.update(_diff([1, 2]), penalty=np.array([1.5, 0.0]))
+
+    assert [pixel.x for pixel in queue.top(2)] == [1, 0]
+
+
+def test_same_seed_same_order():
+    orders = []
+    for _ in range(2):
+        queue = PixelQueue(seed=42, prefetch=4)
+        queue.update(_diff([1] * 100))
+        orders.append([pixel.x for pixel in queue.top(100)])
+
+    assert orders[0] == orders[1]
+
+
+def test_discard_removes_pixel():
+    queue = PixelQueue(seed=0)
+    queue.update(_diff([1, 1, 1]))
+    best = queue.top(1)[0]
+
+    queue.discard(best.x, best.y)
+
+    assert sorted(pixel.x for pixel in queue.top(3)) == sorted({0, 1, 2} - {best.x})
+
+
+def test_update_keeps_tiebreaks_of_unchanged_tiles():
+    rng = np.random.default_rng(1)
+    target = rng.integers(1, 5, (200, 130)).astype(np.uint8)
+    board = rng.integers(1, 5, (200, 130)).astype(np.uint8)
+    tracker = BoardDiffTracker(target, 0, 0, ColorConfig([], set(), set(), []).compile())
+    queue = PixelQueue(seed=3)
+    queue.update(tracker.update(board), changed_tiles=tracker.changed_tiles)
+    before = _tiebreaks(queue)
+    placed = queue.top(1)[0]
+    queue.discard(placed.x, placed.y)
+    before.pop((placed.x, placed.y))
+
+    board[5:20, 5:20] = target[5:20, 5:20]
+    board[150, 100] = 9
+    diff = tracker.update(board)
+    queue.update(diff, changed_tiles=tracker.changed_tiles)
+
+    after = _tiebreaks(queue)
+    changed = tracker.changed_tiles
+    assert changed.tolist() == [[True, False, False], [False, False, False], [False, True, False], [False] * 3]
+    kept = [cell for cell in before if not changed[cell[0] // tracker.tile_size, cell[1] // tracker.tile_size]]
+    assert kept
+    assert all(after[cell] == before[cell] for cell in kept)
+    # Same pixels as the diff, placed ones included since the board still shows them wrong
+    assert len(queue) == diff.x.size
+    assert sorted(after) == sorted(zip(diff.x.tolist(), diff.y.tolist()))
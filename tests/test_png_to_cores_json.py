@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from scripts.png_to_cores_json import COLORS, GREEN_ID, SKIPPED_ID, closest_color, closest_colors
+
+from ft_place_bot.utils.palette import Palette
+
+
+def _reference(pixels, colors):
+    ids = [closest_color(tuple(pixel), colors) for pixel in pixels.tolist()]
+    return np.array([SKIPPED_ID if color_id is None else color_id for color_id in ids])
+
+
+def _vectorized(pixels, colors):
+    palette = Palette(
+        color_ids=[color["id"] for color in colors],
+        rgb=[(color["red"], color["green"], color["blue"]) for color in colors],
+    )
+    green_indexes = [index for index, color in enumerate(colors) if color["id"] == GREEN_ID]
+    return closest_colors(pixels, palette, green_indexes[0] if green_indexes else None)
+
+
+@pytest.mark.parametrize(
+    "colors",
+    [
+        COLORS,
+        [color for color in COLORS if color["id"] == GREEN_ID] + [c for c in COLORS if c["id"] != GREEN_ID],
+        [color for color in COLORS if color["id"] != GREEN_ID],
+    ],
+    ids=["palette order", "green first", "no green"],
+)
+def test_closest_colors_matches_closest_color(colors):
+    rng = np.random.default_rng(0)
+    palette_rgb = np.array([(color["red"], color["green"], color["blue"]) for color in colors])
+    pixels = np.concatenate([rng.integers(0, 256, size=(5000, 3)), palette_rgb, palette_rgb + 1])
+    pixels = np.clip(pixels, 0, 255)
+
+    np.testing.assert_array_equal(_vectorized(pixels, colors), _reference(pixels, colors))
+
+
+def test_closest_colors_skips_pixels_green_wins_early():
+    colors = [
+        {"id": 6, "name": "red", "red": 255, "green": 0, "blue": 0},
+        {"id": GREEN_ID, "name": "green", "red": 0, "green": 160, "blue": 0},
+        {"id": 10, "name": "lime", "red": 0, "green": 200, "blue": 0},
+    ]
+    # Closer to lime, but green beats every color listed before it
+    pixels = np.array([[0, 195, 0], [250, 10, 0]])
+    assert _reference(pixels, colors).tolist() == [SKIPPED_ID, 6]
+    assert _vectorized(pixels, colors).tolist() == [SKIPPED_ID, 6]
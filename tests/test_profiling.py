@@ -0,0 +1,65 @@
+import json
+import os
+import signal
+
+import pytest
+
+from ft_place_bot.core.profiling import Profiler
+
+
+CYCLES = 3
+SUFFIXES = {".spans.jsonl", ".prof", ".tracemalloc", ".tracemalloc.txt"}
+
+
+def _run_cycles(profiler, count):
+    for _ in range(count):
+        with profiler.cycle(), profiler.span("fetch"):
+            pass
+
+
+def _capture(output_dir):
+    """Returns the span records of the only capture in output_dir, checking that all its files were written"""
+    files = sorted(output_dir.iterdir())
+    stem = files[0].name.split(".")[0]
+    assert {file.name[len(stem) :] for file in files} == SUFFIXES
+    with (output_dir / f"{stem}.spans.jsonl").open() as f:
+        return [json.loads(line) for line in f]
+
+
+def test_nothing_is_recorded_until_requested(tmp_path):
+    profiler = Profiler(tmp_path / "profiles", control_file=tmp_path / "control")
+
+    _run_cycles(profiler, CYCLES)
+
+    assert not profiler.enabled
+    assert not (tmp_path / "profiles").exists()
+
+
+def test_control_file_captures_the_cycles_it_names(tmp_path):
+    control = tmp_path / "control"
+    control.write_text(f"{CYCLES}\n")
+    profiler = Profiler(tmp_path / "profiles", control_file=control)
+
+    _run_cycles(profiler, CYCLES + 2)
+
+    records = _capture(tmp_path / "profiles")
+    assert not control.exists()
+    assert [record["cycle"] for record in records] == list(range(CYCLES))
+    assert all([span["name"] for span in record["spans"]] == ["fetch"] for record in records)
+    assert not profiler.enabled
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGUSR1"), reason="No SIGUSR1 on this platform")
+def test_signal_captures_the_default_cycles(tmp_path):
+    profiler = Profiler(tmp_path / "profiles", control_file=None, default_cycles=CYCLES)
+    previous = signal.getsignal(signal.SIGUSR1)
+    try:
+        assert profiler.install_signal()
+        os.kill(os.getpid(), signal.SIGUSR1)
+        _run_cycles(profiler, 1)
+        assert profiler.enabled
+        _run_cycles(profiler, CYCLES)
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
+
+    assert len(_capture(tmp_path / "profiles")) == CYCLES
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+from ft_place_bot.settings import (
+    ACCESS_TOKEN_ENV,
+    BASE_URL_ENV,
+    HEADLESS_ENV,
+    IMAGE_ENV,
+    METRICS_PORT_ENV,
+    ORIGIN_X_ENV,
+    REFRESH_TOKEN_ENV,
+    headless_settings,
+    is_headless,
+)
+from ft_place_bot.utils import parse_args
+
+
+METRICS_PORT = 9100
+PROFILE = {
+    "last_image_path": "profile.png",
+    "last_origin_x": 1,
+    "last_origin_y": 2,
+    "access_token": "profile-access",
+    "refresh_token": "profile-refresh",
+    "base_url": "http://profile",
+    "metrics_port": METRICS_PORT,
+    "ignored_board_colors": [3],
+}
+
+
+@pytest.fixture
+def profile(tmp_path):
+    path = tmp_path / "profile.json"
+    path.write_text(json.dumps(PROFILE))
+    return str(path)
+
+
+def test_profile_fills_every_setting(profile):
+    settings = headless_settings(parse_args(["--headless", "--profile", profile]), {})
+
+    assert (settings.image_path, settings.origin_x, settings.origin_y) == ("profile.png", 1, 2)
+    assert (settings.access_token, settings.refresh_token) == ("profile-access", "profile-refresh")
+    assert (settings.base_url, settings.metrics_port) == ("http://profile", METRICS_PORT)
+    assert settings.ignored_board_colors == {3}
+
+
+def test_environment_overrides_the_profile(profile):
+    environ = {IMAGE_ENV: "env.png", ORIGIN_X_ENV: "10", ACCESS_TOKEN_ENV: "env-access", BASE_URL_ENV: "http://env"}
+
+    settings = headless_settings(parse_args(["--headless", "--profile", profile]), environ)
+
+    assert (settings.image_path, settings.origin_x, settings.origin_y) == ("env.png", 10, 2)
+    assert (settings.access_token, settings.refresh_token) == ("env-access", "profile-refresh")
+    assert settings.base_url == "http://env"
+
+
+def test_command_line_overrides_the_environment(profile):
+    environ = {IMAGE_ENV: "env.png", ORIGIN_X_ENV: "10", REFRESH_TOKEN_ENV: "env-refresh", METRICS_PORT_ENV: "9200"}
+    argv = [
+        "cli.png",
+        "20",
+        "30",
+        "cli-access",
+        "--profile",
+        profile,
+        "--base-url",
+        "http://cli",
+        "--metrics-port",
+        "0",
+    ]
+
+    settings = headless_settings(parse_args(argv), environ)
+
+    assert (settings.image_path, settings.origin_x, settings.origin_y) == ("cli.png", 20, 30)
+    assert (settings.access_token, settings.refresh_token) == ("cli-access", "env-refresh")
+    assert (settings.base_url, settings.metrics_port) == ("http://cli", None)
+
+
+def test_template_keeps_its_own_origin(profile):
+    settings = headless_settings(parse_args(["target.ftpt", "--profile", profile]), {})
+
+    assert (settings.origin_x, settings.origin_y) == (None, None)
+
+
+def test_missing_setting_names_its_sources(tmp_path):
+    path = tmp_path / "profile.json"
+    path.write_text(json.dumps({key: value for key, value in PROFILE.items() if key != "refresh_token"}))
+
+    with pytest.raises(ValueError, match=REFRESH_TOKEN_ENV):
+        headless_settings(parse_args(["--headless", "--profile", str(path)]), {})
+
+
+def test_headless_when_asked_or_given_arguments():
+    assert not is_headless(parse_args([]), {})
+    assert is_headless(parse_args([]), {HEADLESS_ENV: "true"})
+    assert is_headless(parse_args(["--headless"]), {})
+    assert is_headless(parse_args(["image.png"]), {})
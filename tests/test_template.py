@@ -0,0 +1,74 @@
+import json
+
+import numpy as np
+import pytest
+
+from ft_place_bot.core import TRANSPARENT_COLOR_ID, FTPlaceError
+from ft_place_bot.utils import Palette, Template
+from ft_place_bot.utils.template import TEMPLATE_HEADER
+
+
+def test_save_then_open_round_trip(tmp_path):
+    path = str(tmp_path / "target.ftpt")
+    colors = np.random.default_rng(0).integers(0, 19, (37, 21), dtype=np.uint8)
+    Template(target_colors=colors, origin_x=-5, origin_y=120).save(path)
+
+    template = Template.open(path)
+
+    np.testing.assert_array_equal(template.target_colors, colors)
+    assert (template.width, template.height) == colors.shape
+    assert (template.origin_x, template.origin_y) == (-5, 120)
+
+
+def test_file_is_header_then_raster(tmp_path):
+    path = tmp_path / "target.ftpt"
+    colors = np.arange(12, dtype=np.uint8).reshape(4, 3)
+    Template(target_colors=colors, origin_x=1, origin_y=2).save(str(path))
+
+    content = path.read_bytes()
+
+    assert TEMPLATE_HEADER.unpack(content[: TEMPLATE_HEADER.size]) == (b"FTPT", 1, 4, 3, 1, 2)
+    assert content[TEMPLATE_HEADER.size :] == colors.tobytes()
+
+
+@pytest.mark.parametrize("content", [b"", b"FTPT", b"XXXX" + bytes(TEMPLATE_HEADER.size)])
+def test_open_rejects_other_files(tmp_path, content):
+    path = tmp_path / "broken.ftpt"
+    path.write_bytes(content)
+
+    with pytest.raises(FTPlaceError):
+        Template.open(str(path))
+
+
+def test_open_pattern(tmp_path):
+    path = tmp_path / "pattern.json"
+    pattern = [{"x": 0, "y": 1, "color": 5}, {"x": 2, "y": 0, "color": 7}]
+    path.write_text(json.dumps({"width": 3, "height": 2, "pattern": pattern}))
+
+    template = Template.open(str(path))
+
+    expected = np.full((3, 2), TRANSPARENT_COLOR_ID, dtype=np.uint8)
+    expected[0, 1], expected[2, 0] = 5, 7
+    np.testing.assert_array_equal(template.target_colors, expected)
+
+
+def test_open_image_needs_palette(tmp_path):
+    with pytest.raises(FTPlaceError):
+        Template.open(str(tmp_path / "image.png"))
+
+
+def test_from_image_marks_transparent_pixels(tmp_path):
+    image = pytest.importorskip("PIL.Image")
+    path = tmp_path / "image.png"
+    rgba = np.zeros((2, 3, 4), dtype=np.uint8)
+    rgba[..., 0], rgba[..., 3] = 255, 255
+    rgba[1, 2, 3] = 0
+    image.fromarray(rgba, "RGBA").save(path)
+    palette = Palette(color_ids=[4, 9], rgb=[(255, 0, 0), (0, 0, 255)])
+
+    template = Template.open(str(path), palette)
+
+    # Stored as (width, height): the transparent pixel at row 1, column 2 lands at [2, 1]
+    assert template.target_colors.shape == (3, 2)
+    assert template.target_colors[2, 1] == TRANSPARENT_COLOR_ID
+    assert set(template.target_colors.reshape(-1).tolist()) == {TRANSPARENT_COLOR_ID, 4}
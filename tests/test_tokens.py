@@ -0,0 +1,99 @@
+import logging
+import time
+
+import pytest
+
+from scripts.local_server import parse_args, start_server
+
+from ft_place_bot.client import FTPlaceAPI
+from ft_place_bot.client.tokens import EXPIRY_MARGIN, REFRESH_RETRY_DELAY, TokenManager
+from ft_place_bot.config import APIConfig
+from ft_place_bot.core import Pixel
+
+
+LIFETIME = 60
+
+
+def _config(base_url="http://127.0.0.1", tokens=("access", "refresh")):
+    return APIConfig(base_url=base_url, access_token=tokens[0], refresh_token=tokens[1])
+
+
+def test_unknown_expiry_is_read_at_once():
+    tokens = TokenManager(_config())
+
+    assert tokens.refresh_in() == 0.0
+    assert tokens.expired()
+    assert not tokens.expiring()
+
+    tokens.refresh_failed()
+
+    assert tokens.refresh_in() == pytest.approx(REFRESH_RETRY_DELAY, abs=0.1)
+    assert not tokens.expired()
+
+
+def test_profile_sets_expiry_and_lifetime(make_profile):
+    tokens = TokenManager(_config(), refresh_delay=0.0)
+    now = time.time()
+    tokens.observe_profile(make_profile(iat=int(now) - 10, exp=int(now) + 50))
+
+    assert tokens.lifetime == LIFETIME
+    assert tokens.refresh_in() == pytest.approx(int(now) + 50 - now, abs=0.1)
+    assert not tokens.expiring()
+
+
+def test_expiring_within_margin(make_profile):
+    tokens = TokenManager(_config())
+    now = time.time()
+    tokens.observe_profile(make_profile(iat=int(now) - 100, exp=int(now + EXPIRY_MARGIN / 2)))
+
+    assert tokens.expiring()
+
+
+def test_rotate_notifies_listeners_and_keeps_lifetime(make_profile):
+    config = _config()
+    tokens = TokenManager(config)
+    now = time.time()
+    tokens.observe_profile(make_profile(iat=int(now) - 30, exp=int(now)))
+    rotations = []
+    tokens.listeners.append(lambda *rotation: rotations.append(rotation))
+
+    tokens.rotate("access-2", "refresh-2")
+
+    assert rotations == [("refresh", "access-2", "refresh-2")]
+    assert (config.access_token, config.refresh_token) == ("access-2", "refresh-2")
+    assert tokens.expires_at == pytest.approx(int(now) + 30, abs=1)
+
+
+def test_rotate_without_lifetime_forgets_expiry():
+    tokens = TokenManager(_config())
+    tokens.rotate("access-2", "refresh-2")
+
+    assert tokens.expires_at is None
+    assert tokens.expired()
+
+
+@pytest.fixture
+def local_server():
+    args = parse_args(["--port", "0", "--width", "8", "--height", "8", "--pixel-timer", "0", "--token-ttl", "2"])
+    server, state, stop = start_server(args)
+    yield f"http://127.0.0.1:{server.server_address[1]}", state
+    stop.set()
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_rotates_tokens_ahead_of_placements(local_server):
+    base_url, state = local_server
+    account = state.accounts[0]
+    api = FTPlaceAPI(_config(base_url, (account.access_token, account.refresh_token)))
+    api.logger.setLevel(logging.WARNING)
+
+    assert api.refresh_tokens() is False
+    assert api.tokens.expires_at is not None
+
+    time.sleep(max(0.0, api.tokens.refresh_in()))
+    assert api.refresh_tokens() is True
+    assert api.config.access_token == account.access_token
+
+    assert api.set_pixel(Pixel(x=1, y=2, color=3)).success
+    assert state.stats["POST /api/set 426"] == 0